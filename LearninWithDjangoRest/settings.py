@@ -40,21 +40,114 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'rest_framework',
     'rest_framework.authtoken',
-    'drf_yasg',
+    'django_filters',
     'api',
 ]
 
+# Swagger/ReDoc endpoints and the drf-yasg annotations in api/views.py.
+# API_DOCS=0 leaves drf-yasg (and the pkg_resources import it pulls in)
+# out of the worker entirely, which shortens startup.
+API_DOCS = os.environ.get('API_DOCS', '1') == '1'
+if API_DOCS:
+    INSTALLED_APPS.insert(INSTALLED_APPS.index('django_filters'), 'drf_yasg')
+
 
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        # JSONRenderer that writes cached profile fragments as they are.
+        'api.renderers.FragmentJSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+        'api.authentication.SignedTokenAuthentication',
     ],
+    # Reverse proxies in front of the app that append to X-Forwarded-For.
+    # 0 keys throttles on REMOTE_ADDR; behind e.g. one nginx, set NUM_PROXIES=1.
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', '0')),
+}
+
+# In-process LRU in front of the authtoken lookup. Set CACHE_ALIAS to a shared
+# cache (e.g. redis) to share entries between workers. Every hit is checked
+# against a per-token version key in VERSION_ALIAS, so deleting a token or
+# changing its user takes effect in all workers on the next request.
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+    'CACHE_ALIAS': None,
+    'VERSION_ALIAS': 'token_versions',
+}
+
+# Profile list pagination: 'page' (PageNumberPagination) or 'cursor' (keyset on
+# created_at, id). Clients can override per request with ?pagination=cursor.
+PROFILE_PAGINATION_MODE = 'page'
+PROFILE_PAGE_SIZE = 10
+PROFILE_MAX_PAGE_SIZE = 100
+# Serve profile list pages from .values() rows (api.readers) instead of
+# instantiating models for ProfileSerializer. The JSON output is the same.
+PROFILE_LIST_FAST_PATH = True
+
+# Rows validated and written per transaction by the bulk profile import.
+PROFILE_IMPORT_CHUNK_SIZE = 1000
+
+# Profiles loaded per query by the streaming export.
+PROFILE_EXPORT_CHUNK_SIZE = 500
+
+# Profiles deleted per transaction by the bulk delete endpoint.
+PROFILE_BULK_DELETE_CHUNK_SIZE = 500
+
+# Profiles accepted per request by the upsert endpoint.
+PROFILE_UPSERT_MAX_ROWS = 1000
+
+# Rows per upsert request that may set a password. Each one is hashed inline
+# (PBKDF2, a few hundred ms), so the request time is bounded by this.
+PROFILE_UPSERT_MAX_PASSWORDS = 10
+
+# Per-worker LRU of rendered profile JSON keyed by id and updated_at, used by
+# the profile list, detail and login responses (api/fragments.py).
+PROFILE_FRAGMENT_CACHE = {
+    'ENABLED': True,
+    'MAX_BYTES': 32 * 1024 * 1024,
+}
+
+# Token buckets per IP and per username for login and register, kept in a
+# SQLite file shared by all workers on the host (api/throttling.py).
+AUTH_THROTTLE = {
+    'ENABLED': os.environ.get('AUTH_THROTTLE', '1') == '1',
+    'PATH': BASE_DIR / '.throttle.sqlite3',
+    'RATES': {
+        'login': {'ip': '30/min', 'username': '5/min'},
+        'register': {'ip': '10/hour'},
+    },
+}
+
+# Stateless access tokens (api/signed_tokens.py): login and register return an
+# HMAC-signed, short-lived 'Bearer' token plus a refresh token instead of an
+# authtoken key. Verifying one needs no query; logout, deactivation and
+# deletion go through a small revocation list cached per worker.
+SIGNED_TOKENS = {
+    'ENABLED': os.environ.get('SIGNED_TOKENS', '0') == '1',
+    'ACCESS_TTL': 300,
+    'REFRESH_TTL': 14 * 86400,
+}
+
+# ModelBackend plus an async path (api.authentication.aauthenticate) that the
+# async login view uses to check passwords on PASSWORD_HASH_POOL.
+AUTHENTICATION_BACKENDS = ['api.authentication.HashPoolModelBackend']
+
+# Process pool used by the async login/register views for password hashing.
+# When WORKERS + MAX_QUEUE hash jobs are in flight, new requests get a 503.
+PASSWORD_HASH_POOL = {
+    'WORKERS': 2,
+    'MAX_QUEUE': 32,
+}
+
+# Separate process pool for the plain passwords of bulk profile imports, so an
+# import never holds the workers the login views wait for.
+PROFILE_IMPORT_HASH_POOL = {
+    'WORKERS': 2,
 }
 
 SWAGGER_SETTINGS = {
@@ -68,7 +161,24 @@ SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': False,
 }
 
+# OpenAPI schema behind swagger<format>/, swagger/ and redoc/. 'dynamic'
+# rebuilds it from every view on each hit; 'stored' serves the file written by
+# `manage.py generate_openapi_schema` (or on first use) with ETag and gzip,
+# regenerated only when CODE_VERSION (default: a hash of the sources) changes.
+API_SCHEMA = {
+    'MODE': os.environ.get('API_SCHEMA_MODE', 'dynamic' if DEBUG else 'stored'),
+    'DIR': BASE_DIR / '.schema',
+    'CODE_VERSION': os.environ.get('CODE_VERSION'),
+}
+
+if API_SCHEMA['MODE'] == 'stored':
+    # Point the UI pages at the stored document instead of their own URL.
+    SWAGGER_SETTINGS['SPEC_URL'] = ('schema-json', {'format': '.json'})
+    REDOC_SETTINGS = {'SPEC_URL': ('schema-json', {'format': '.json'})}
+
 MIDDLEWARE = [
+    'api.middleware.QueryInstrumentationMiddleware',
+    'api.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -78,6 +188,24 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request query counting, Server-Timing headers, N+1 and slow request
+# logging. Toggle per environment with SQL_INSTRUMENTATION=0/1.
+SQL_INSTRUMENTATION = {
+    'ENABLED': os.environ.get('SQL_INSTRUMENTATION', '1' if DEBUG else '0') == '1',
+    'SERVER_TIMING': True,
+    'SLOW_REQUEST_MS': int(os.environ.get('SLOW_REQUEST_MS', 500)),
+    'N_PLUS_ONE_THRESHOLD': 5,
+}
+
+# Content-negotiated response compression (api/compression.py). br and zstd
+# are offered only when the brotli / zstandard packages are installed.
+RESPONSE_COMPRESSION = {
+    'ENABLED': os.environ.get('RESPONSE_COMPRESSION', '1') == '1',
+    'MIN_SIZE': 1024,
+    'ENCODINGS': ('zstd', 'br', 'gzip'),
+    'LEVELS': {'gzip': 6, 'br': 4, 'zstd': 3},
+}
+
 ROOT_URLCONF = 'LearninWithDjangoRest.urls'
 
 TEMPLATES = [
@@ -104,13 +232,75 @@ WSGI_APPLICATION = 'LearninWithDjangoRest.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Connection pooling for threaded/ASGI deployments (DB_POOL=1). Pooled
+# connections go back to the pool when Django closes them at the end of a
+# request, so CONN_MAX_AGE defaults to 0 in that mode.
+DB_POOL = os.environ.get('DB_POOL') == '1'
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'api.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Keep each worker thread's connection open between requests.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0 if DB_POOL else 60)),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock when an atomic block starts instead of on
+            # its first write, so concurrent writers queue on busy_timeout.
+            'transaction_mode': 'IMMEDIATE',
+            'pool': {
+                'max_size': int(os.environ.get('DB_POOL_SIZE', 8)),
+                'timeout': 10,
+            } if DB_POOL else False,
+        },
     }
 }
 
+# Applied to every new SQLite connection (api.signals.apply_sqlite_pragmas).
+SQLITE_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+}
+
+# Stored in the database file itself, so only the servers apply them
+# (wsgi.py/asgi.py call api.signals.enable_database_pragmas); management
+# commands, checks and tests leave the database file as it is.
+SQLITE_DATABASE_PRAGMAS = {
+    'journal_mode': 'WAL',
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Shared by every worker on the host. Holds small keys such as the
+    # UserType/UserRole table versions.
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache',
+    },
+    # Per-token version keys of TOKEN_AUTH_CACHE: one per active token, so
+    # they get their own directory and cull limits and can never push the
+    # reference versions out of 'shared'. A culled or expired version only
+    # costs a cache miss. Point this at memcached or redis in production.
+    'token_versions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / '.cache-token-versions',
+        'OPTIONS': {'MAX_ENTRIES': 20000, 'CULL_FREQUENCY': 4},
+    },
+}
+
+REFERENCE_CACHE = {
+    'ALIAS': 'shared',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -152,6 +342,36 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Derivatives generated for every uploaded profile picture, written next to
+# the original under profile_pictures/derivatives/.
+PROFILE_PICTURE_DERIVATIVES = (
+    {'name': 'thumb_64', 'size': 64, 'format': 'JPEG'},
+    {'name': 'thumb_256', 'size': 256, 'format': 'JPEG'},
+    {'name': 'webp_256', 'size': 256, 'format': 'WEBP'},
+)
+# Background threads generating derivatives after an upload.
+PROFILE_PICTURE_WORKERS = 2
+
+# Logging
+# https://docs.djangoproject.com/en/5.1/topics/logging/
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.performance': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -18,28 +18,35 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from rest_framework import permissions
-from drf_yasg.views import get_schema_view
-from drf_yasg import openapi
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Django REST API",
-        default_version='v1',
-        description="API documentation for your Django REST project",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@example.com"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
-    # Swagger URLs
-    path('swagger<format>/', schema_view.without_ui(cache_timeout=0), name='schema-json'),
-    path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
-    path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# Swagger URLs, only with API_DOCS on so that workers without them never
+# import drf-yasg.
+if settings.API_DOCS:
+    from rest_framework import permissions
+    from drf_yasg.views import get_schema_view
+
+    from api.schema import StoredSchemaView, get_api_info, is_stored_mode
+
+    schema_view = get_schema_view(
+        get_api_info(),
+        public=True,
+        permission_classes=(permissions.AllowAny,),
+    )
+
+    # In stored mode the spec comes from the file written for the current code
+    # version; the UI pages only render HTML that points at it.
+    if is_stored_mode():
+        schema_document_view = StoredSchemaView.as_view()
+    else:
+        schema_document_view = schema_view.without_ui(cache_timeout=0)
+
+    urlpatterns += [
+        path('swagger<format>/', schema_document_view, name='schema-json'),
+        path('swagger/', schema_view.with_ui('swagger', cache_timeout=0), name='schema-swagger-ui'),
+        path('redoc/', schema_view.with_ui('redoc', cache_timeout=0), name='schema-redoc'),
+    ]
@@ -14,3 +14,14 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'LearninWithDjangoRest.settings')
 
 application = get_wsgi_application()
+
+# Switch the database file to WAL (SQLITE_DATABASE_PRAGMAS); commands and
+# checks leave it alone.
+from api.signals import enable_database_pragmas  # noqa: E402
+enable_database_pragmas()
+
+# Load the stored OpenAPI schema (generating it once per code version) before
+# the first request; does nothing when API_SCHEMA['MODE'] is 'dynamic'.
+from api.schema import warm_stored_schema  # noqa: E402
+
+warm_stored_schema()
@@ -0,0 +1,257 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import AuthenticationFailed, NotFound, ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api.authentication import CachedTokenAuthentication, SignedTokenAuthentication, aauthenticate
+from api.cache import user_type_cache, user_role_cache
+from api.filters import ProfileFilter
+from api.hashing import HashPoolFull, password_hash_pool
+from api.models import Profile, UserType, UserRole
+from api.pagination import AsyncProfileCursorPagination, get_async_profile_paginator
+from api.readers import ProfileValuesReader
+from api.signed_tokens import aissue_credentials
+from api.throttling import AuthThrottled, auth_throttle_wait
+from api.serializers import (
+    ProfileSerializer, RegisterSerializer, UserTypeSerializer, UserRoleSerializer, parse_fieldset,
+)
+
+
+class RenderedJsonResponse(HttpResponse):
+    """
+    JSON response rendered with DRF's JSONRenderer rather than
+    django.http.JsonResponse, so the async views send the same bytes as the
+    sync APIViews they mirror.
+    """
+
+    def __init__(self, data, status=200):
+        super().__init__(JSONRenderer().render(data), status=status, content_type='application/json')
+
+
+def _request_data(request):
+    if request.content_type == 'application/json':
+        try:
+            return json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+    return request.POST
+
+
+def _bad_request_response():
+    return RenderedJsonResponse({'error': 'Geçersiz istek gövdesi'}, status=400)
+
+
+def _busy_response():
+    response = RenderedJsonResponse({
+        'error': 'Sunucu şu anda yoğun, lütfen daha sonra tekrar deneyin'
+    }, status=503)
+    response['Retry-After'] = '1'
+    return response
+
+
+def _throttled_response(wait):
+    exc = AuthThrottled(wait)
+    response = RenderedJsonResponse({'detail': exc.detail}, status=exc.status_code)
+    response['Retry-After'] = str(exc.wait)
+    return response
+
+
+def _profile_data(user):
+    try:
+        profile = Profile.objects.select_related('user', 'user_type').prefetch_related('user_roles').get(user=user)
+    except Profile.DoesNotExist:
+        return None
+    return ProfileSerializer(profile).data
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncLoginView(View):
+    """
+    Async counterpart of LoginView. Credentials go through the configured
+    auth backends via aauthenticate(); HashPoolModelBackend checks the
+    password on the hash process pool, so a login burst cannot starve the
+    rest of the API.
+    """
+
+    async def post(self, request):
+        data = _request_data(request)
+        if data is None:
+            return _bad_request_response()
+
+        username = data.get('username')
+        password = data.get('password')
+
+        wait = await sync_to_async(auth_throttle_wait)(request, 'login', username)
+        if wait is not None:
+            return _throttled_response(wait)
+
+        if username is None or password is None:
+            return RenderedJsonResponse({
+                'error': 'Lütfen kullanıcı adı ve şifre giriniz'
+            }, status=400)
+
+        try:
+            user = await aauthenticate(request, username=username, password=password)
+        except HashPoolFull:
+            return _busy_response()
+
+        if user is None:
+            return RenderedJsonResponse({
+                'error': 'Geçersiz kullanıcı adı veya şifre'
+            }, status=401)
+
+        credentials = await aissue_credentials(user)
+        profile = await sync_to_async(_profile_data)(user)
+        return RenderedJsonResponse({
+            **credentials,
+            'user_id': user.id,
+            'username': user.username,
+            'profile': profile
+        })
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncRegisterView(View):
+    """
+    Async counterpart of RegisterView; the password is hashed on the hash
+    process pool before the user row is written.
+    """
+
+    async def post(self, request):
+        data = _request_data(request)
+        if data is None:
+            return _bad_request_response()
+
+        wait = await sync_to_async(auth_throttle_wait)(request, 'register', data.get('username'))
+        if wait is not None:
+            return _throttled_response(wait)
+
+        serializer = RegisterSerializer(data=data)
+        if not await sync_to_async(serializer.is_valid)():
+            return RenderedJsonResponse(serializer.errors, status=400)
+
+        try:
+            password_hash = await password_hash_pool.make_password(serializer.validated_data['password'])
+        except HashPoolFull:
+            return _busy_response()
+
+        user = await sync_to_async(serializer.save)(password_hash=password_hash)
+        return RenderedJsonResponse({
+            **await aissue_credentials(user),
+            'user_id': user.id,
+            'username': user.username,
+            'message': 'Kayıt başarılı'
+        }, status=201)
+
+
+class AsyncAuthenticatedView(View):
+    """
+    Base for read-only async views under ASGI. Authenticates the token with
+    the async ORM (CachedTokenAuthentication.aauthenticate, or
+    SignedTokenAuthentication.aauthenticate for Bearer tokens) and answers
+    like DRF's IsAuthenticated would.
+    """
+
+    authentication = CachedTokenAuthentication()
+    authenticators = (authentication, SignedTokenAuthentication())
+
+    async def dispatch(self, request, *args, **kwargs):
+        credentials = None
+        try:
+            for authenticator in self.authenticators:
+                credentials = await authenticator.aauthenticate(request)
+                if credentials is not None:
+                    break
+        except AuthenticationFailed as exc:
+            return self.unauthorized(exc.detail)
+        if credentials is None:
+            return self.unauthorized('Authentication credentials were not provided.')
+        request.user, request.auth = credentials
+        return await super().dispatch(request, *args, **kwargs)
+
+    def unauthorized(self, detail):
+        response = RenderedJsonResponse({'detail': str(detail)}, status=401)
+        response['WWW-Authenticate'] = self.authentication.authenticate_header(request=None)
+        return response
+
+
+class AsyncProfileView(AsyncAuthenticatedView):
+    """Async ProfileView.get: same filters, pagination and fieldsets."""
+
+    async def get(self, request):
+        query_params = request.GET
+        try:
+            fields, expand = parse_fieldset(query_params)
+        except ValidationError as exc:
+            return RenderedJsonResponse(exc.detail, status=400)
+        reader = ProfileValuesReader(fields, expand)
+        filterset = ProfileFilter(query_params, queryset=reader.get_queryset().order_by('created_at', 'id'))
+        if not filterset.is_valid():
+            return RenderedJsonResponse({
+                'error': 'Geçersiz filtre',
+                'details': filterset.errors
+            }, status=400)
+
+        drf_request = Request(request)
+        paginator = get_async_profile_paginator(drf_request)
+        ordering = filterset.get_ordering()
+        if ordering and isinstance(paginator, AsyncProfileCursorPagination):
+            paginator.ordering = ordering
+        try:
+            rows = await paginator.apaginate_queryset(filterset.qs, drf_request)
+        except NotFound as exc:
+            return RenderedJsonResponse({'detail': str(exc.detail)}, status=404)
+        return RenderedJsonResponse(paginator.get_paginated_data(await reader.aserialize(rows)))
+
+
+class AsyncProfileDetailView(AsyncAuthenticatedView):
+
+    async def get(self, request, pk):
+        try:
+            fields, expand = parse_fieldset(request.GET)
+        except ValidationError as exc:
+            return RenderedJsonResponse(exc.detail, status=400)
+        reader = ProfileValuesReader(fields, expand)
+        rows = [row async for row in reader.get_queryset().filter(pk=pk)]
+        if not rows:
+            return RenderedJsonResponse({'error': 'Profil bulunamadı'}, status=404)
+        data = await reader.aserialize(rows)
+        return RenderedJsonResponse(data[0])
+
+
+class AsyncUserTypeView(AsyncAuthenticatedView):
+
+    async def get(self, request):
+        return RenderedJsonResponse(UserTypeSerializer(await user_type_cache.aall(), many=True).data)
+
+
+class AsyncUserTypeDetailView(AsyncAuthenticatedView):
+
+    async def get(self, request, pk):
+        try:
+            user_type = await user_type_cache.aget(pk)
+        except UserType.DoesNotExist:
+            return RenderedJsonResponse({'error': 'Kullanıcı tipi bulunamadı'}, status=404)
+        return RenderedJsonResponse(UserTypeSerializer(user_type).data)
+
+
+class AsyncUserRoleView(AsyncAuthenticatedView):
+
+    async def get(self, request):
+        return RenderedJsonResponse(UserRoleSerializer(await user_role_cache.aall(), many=True).data)
+
+
+class AsyncUserRoleDetailView(AsyncAuthenticatedView):
+
+    async def get(self, request, pk):
+        try:
+            user_role = await user_role_cache.aget(pk)
+        except UserRole.DoesNotExist:
+            return RenderedJsonResponse({'error': 'Kullanıcı rolü bulunamadı'}, status=404)
+        return RenderedJsonResponse(UserRoleSerializer(user_role).data)
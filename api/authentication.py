@@ -0,0 +1,370 @@
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import _clean_credentials, get_backends, get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.hashers import get_hasher, identify_hasher
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import caches
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from django.views.decorators.debug import sensitive_variables
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
+
+from api.cache import aget_version, bump_version, get_version
+from api.hashing import password_hash_pool
+
+
+TOKEN_AUTH_CACHE_DEFAULTS = {
+    'MAX_SIZE': 10000,
+    'TTL': 300,
+    # Name of a Django cache alias to share entries between workers, or None
+    # to keep the cache purely in-process.
+    'CACHE_ALIAS': None,
+    # Cache alias holding the per-token version keys that every hit is
+    # checked against. Use a backend shared by all workers, so a deleted
+    # token or a changed user is dropped everywhere at once, and keep it
+    # apart from REFERENCE_CACHE: there is one key per active token. Version
+    # keys live for TTL seconds, like the entries they guard.
+    'VERSION_ALIAS': 'default',
+    'KEY_PREFIX': 'authtoken',
+}
+
+
+def get_token_auth_cache_settings():
+    return {**TOKEN_AUTH_CACHE_DEFAULTS, **getattr(settings, 'TOKEN_AUTH_CACHE', {})}
+
+
+class TokenCache:
+    """
+    Bounded LRU of authenticated (user, token) pairs keyed by token key,
+    with a per-entry TTL and an optional Django cache behind it.
+
+    Each entry is tagged with the token key's version from the shared
+    VERSION_ALIAS cache, read before the database lookup. A hit only counts
+    if the version is unchanged; invalidate() and invalidate_user() bump it,
+    so other workers drop their copies on the next request.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._user_keys = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def config(self):
+        return get_token_auth_cache_settings()
+
+    def _shared_cache(self):
+        alias = self.config['CACHE_ALIAS']
+        return caches[alias] if alias else None
+
+    def _versions(self):
+        return caches[self.config['VERSION_ALIAS']]
+
+    def _shared_key(self, key):
+        return f"{self.config['KEY_PREFIX']}:{key}"
+
+    def _version_key(self, key):
+        return f"{self.config['KEY_PREFIX']}:{key}:version"
+
+    def version(self, key):
+        """Current version of key; read it before loading the token it guards."""
+        return get_version(self._versions(), self._version_key(key), self.config['TTL'])
+
+    async def aversion(self, key):
+        return await aget_version(self._versions(), self._version_key(key), self.config['TTL'])
+
+    def _bump(self, keys):
+        versions = self._versions()
+        timeout = self.config['TTL']
+        for key in keys:
+            bump_version(versions, self._version_key(key), timeout)
+
+    def get(self, key, version):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                token, expires_at, entry_version = entry
+                if expires_at > now and entry_version == version:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return token
+                self._remove(key)
+
+        shared = self._shared_cache()
+        if shared is not None:
+            entry = shared.get(self._shared_key(key))
+            if entry is not None and entry[1] == version:
+                self._store_local(key, entry[0], version)
+                with self._lock:
+                    self.hits += 1
+                return entry[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, token, version):
+        self._store_local(key, token, version)
+        shared = self._shared_cache()
+        if shared is not None:
+            shared.set(self._shared_key(key), (token, version), self.config['TTL'])
+
+    def _store_local(self, key, token, version):
+        config = self.config
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (token, time.monotonic() + config['TTL'], version)
+            self._user_keys.setdefault(token.user_id, set()).add(key)
+            while len(self._entries) > config['MAX_SIZE']:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        token, _, _ = self._entries.pop(key)
+        keys = self._user_keys.get(token.user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[token.user_id]
+
+    def invalidate(self, key):
+        self.invalidate_many([key])
+
+    def invalidate_many(self, keys):
+        """
+        Drops keys in all workers. Versions are bumped now and again after
+        commit, so a worker that read the old row before the commit cannot
+        cache it under the new version.
+        """
+        keys = list(keys)
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+        self._bump(keys)
+        transaction.on_commit(lambda: self._bump(keys))
+
+    def invalidate_user(self, user_id):
+        self.invalidate_users([user_id])
+
+    def invalidate_users(self, user_ids):
+        """
+        Drops every token of user_ids in all workers. The keys come from the
+        database, since other workers may hold tokens this one never saw;
+        callers deleting tokens with raw SQL pass the keys to
+        invalidate_many() instead.
+        """
+        from rest_framework.authtoken.models import Token
+
+        user_ids = list(user_ids)
+        with self._lock:
+            keys = {key for user_id in user_ids for key in self._user_keys.get(user_id, ())}
+        keys.update(Token.objects.filter(user_id__in=user_ids).values_list('key', flat=True))
+        self.invalidate_many(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.config['MAX_SIZE'],
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+token_cache = TokenCache()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication that skips the authtoken_token JOIN auth_user query
+    for tokens seen recently. Entries are dropped in every worker by the
+    signal handlers in api.signals when the token is deleted or its user
+    changes.
+    """
+
+    def authenticate_credentials(self, key):
+        version = token_cache.version(key)
+        token = token_cache.get(key, version)
+        if token is not None:
+            return (token.user, token)
+
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, token, version)
+        return (user, token)
+
+    async def aauthenticate(self, request):
+        """
+        Async counterpart of authenticate() for plain Django async views: same
+        header parsing and errors, with the token lookup done by the async ORM.
+        """
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        if len(auth) > 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. Token string should not contain invalid characters.')
+            )
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        version = await token_cache.aversion(key)
+        token = token_cache.get(key, version)
+        if token is not None:
+            return (token.user, token)
+
+        model = self.get_model()
+        try:
+            token = await model.objects.select_related('user').aget(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        token_cache.set(key, token, version)
+        return (token.user, token)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    Authenticates 'Authorization: Bearer <token>' with the HMAC-signed access
+    tokens of api.signed_tokens. Verification needs no database query; the
+    user is a TokenUser built from the token's claims.
+    """
+
+    keyword = 'Bearer'
+
+    def get_token(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+        try:
+            return auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(
+                _('Invalid token header. Token string should not contain invalid characters.')
+            )
+
+    def authenticate(self, request):
+        from api.signed_tokens import InvalidToken, TokenUser, verify_token
+
+        value = self.get_token(request)
+        if value is None:
+            return None
+        try:
+            token = verify_token(value)
+        except InvalidToken:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return (TokenUser(token), token)
+
+    async def aauthenticate(self, request):
+        from api.signed_tokens import InvalidToken, TokenUser, averify_token
+
+        value = self.get_token(request)
+        if value is None:
+            return None
+        try:
+            token = await averify_token(value)
+        except InvalidToken:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return (TokenUser(token), token)
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+class HashPoolModelBackend(ModelBackend):
+    """
+    ModelBackend that async views can await: the user is read with the async
+    ORM and the password checked on the hash process pool, with the same
+    is_active check and hasher upgrade as ModelBackend. The sync
+    authenticate() is ModelBackend's own. Raises HashPoolFull when the pool
+    queue is full.
+    """
+
+    async def aauthenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = await UserModel._default_manager.aget(**{UserModel.USERNAME_FIELD: username})
+        except UserModel.DoesNotExist:
+            # Hash anyway so unknown usernames take as long as wrong passwords.
+            await password_hash_pool.make_password(password)
+            return None
+        if await self.acheck_password(user, password) and self.user_can_authenticate(user):
+            return user
+        return None
+
+    async def acheck_password(self, user, password):
+        if not await password_hash_pool.check_password(password, user.password):
+            return False
+        # What User.check_password's setter does: rehash with the preferred
+        # hasher when the stored one is outdated.
+        preferred = get_hasher('default')
+        if identify_hasher(user.password).algorithm != preferred.algorithm or preferred.must_update(user.password):
+            user.password = await password_hash_pool.make_password(password)
+            await user.asave(update_fields=['password'])
+        return True
+
+
+@sensitive_variables('credentials')
+async def aauthenticate(request=None, **credentials):
+    """
+    django.contrib.auth.authenticate() for async views: every backend in
+    AUTHENTICATION_BACKENDS is tried in order, PermissionDenied stops the
+    search and user_login_failed is sent when none accepts the credentials.
+    Backends with an aauthenticate method are awaited, the others run through
+    sync_to_async.
+    """
+    for backend, backend_path in zip(get_backends(), settings.AUTHENTICATION_BACKENDS):
+        try:
+            inspect.signature(backend.authenticate).bind(request, **credentials)
+        except TypeError:
+            continue
+        method = getattr(backend, 'aauthenticate', None) or sync_to_async(backend.authenticate)
+        try:
+            user = await method(request, **credentials)
+        except PermissionDenied:
+            break
+        if user is None:
+            continue
+        user.backend = backend_path
+        return user
+
+    await user_login_failed.asend(
+        sender='django.contrib.auth', credentials=_clean_credentials(credentials), request=request
+    )
+    return None
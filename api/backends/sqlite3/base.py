@@ -0,0 +1,83 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+
+from api.backends.sqlite3.pool import get_pool
+
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+POOL_DEFAULTS = {
+    'max_size': 8,
+    'timeout': 10.0,
+}
+
+
+class DatabaseWrapper(SQLiteDatabaseWrapper):
+    """
+    SQLite backend that understands OPTIONS['transaction_mode'] (as Django
+    5.1 does). With IMMEDIATE, atomic blocks take the write lock up front, so
+    a read-then-write transaction waits on busy_timeout instead of failing
+    with "database is locked" when it tries to upgrade its lock.
+
+    OPTIONS['pool'] (True or {'max_size': ..., 'timeout': ...}) hands out
+    connections from a process-wide pool, and close() returns them to it
+    instead of closing them. That is meant for threaded and ASGI deployments
+    that would otherwise open a connection per request.
+
+    The per-connection pragmas are applied by the connection_created handler
+    in api.signals; it skips connections reused from the pool.
+    """
+
+    # True when the current connection was reused from the pool.
+    reused_connection = False
+
+    def get_connection_params(self):
+        kwargs = super().get_connection_params()
+        kwargs.pop('transaction_mode', None)
+        kwargs.pop('pool', None)
+        return kwargs
+
+    @property
+    def pool(self):
+        options = self.settings_dict['OPTIONS'].get('pool')
+        if not options or self.is_in_memory_db():
+            return None
+        if options is True:
+            options = {}
+        options = {**POOL_DEFAULTS, **options}
+        return get_pool((self.alias, str(self.settings_dict['NAME'])), options['max_size'], options['timeout'])
+
+    def get_new_connection(self, conn_params):
+        pool = self.pool
+        if pool is None:
+            self.reused_connection = False
+            return super().get_new_connection(conn_params)
+        connection, self.reused_connection = pool.acquire(
+            lambda: super(DatabaseWrapper, self).get_new_connection(conn_params)
+        )
+        return connection
+
+    def _close(self):
+        pool = self.pool
+        if pool is None or self.connection is None:
+            return super()._close()
+        pool.release(self.connection)
+
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        if mode is None:
+            return None
+        mode = mode.upper()
+        if mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f"settings.DATABASES['{self.alias}']['OPTIONS']['transaction_mode'] "
+                f"must be one of {', '.join(TRANSACTION_MODES)}"
+            )
+        return mode
+
+    def _start_transaction_under_autocommit(self):
+        if self.transaction_mode is None:
+            super()._start_transaction_under_autocommit()
+        else:
+            self.cursor().execute(f'BEGIN {self.transaction_mode}')
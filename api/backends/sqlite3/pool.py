@@ -0,0 +1,136 @@
+import os
+import queue
+import threading
+import time
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """
+    Process-wide pool of raw DB-API connections. Connections are handed out
+    LIFO so the warmest one is reused first, checked with a cheap query
+    before use, and rolled back before they go back to the pool.
+    """
+
+    def __init__(self, max_size=8, timeout=10.0):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self.created = 0
+        self.discarded = 0
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_time = 0.0
+        self.timeouts = 0
+        self.in_use = 0
+
+    def acquire(self, connect):
+        """Returns (connection, reused) from the pool or a new one from connect()."""
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                connection = None
+
+            if connection is None:
+                with self._lock:
+                    can_create = self.created - self.discarded < self.max_size
+                    if can_create:
+                        self.created += 1
+                if can_create:
+                    try:
+                        connection = connect()
+                    except Exception:
+                        with self._lock:
+                            self.created -= 1
+                        raise
+                    self._checked_out()
+                    return connection, False
+                connection = self._wait()
+
+            if self._is_usable(connection):
+                self._checked_out()
+                return connection, True
+            self._discard(connection)
+
+    def _wait(self):
+        started = time.perf_counter()
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            with self._lock:
+                self.timeouts += 1
+            raise PoolTimeout(f'No database connection available after {self.timeout}s')
+        finally:
+            with self._lock:
+                self.waits += 1
+                self.wait_time += time.perf_counter() - started
+
+    def _checked_out(self):
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+
+    def _is_usable(self, connection):
+        try:
+            connection.execute('SELECT 1')
+        except Exception:
+            return False
+        return True
+
+    def _discard(self, connection):
+        with self._lock:
+            self.discarded += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def release(self, connection):
+        with self._lock:
+            self.in_use -= 1
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except Exception:
+            self._discard(connection)
+            return
+        self._idle.put(connection)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_size': self.max_size,
+                'size': self.created - self.discarded,
+                'idle': self._idle.qsize(),
+                'in_use': self.in_use,
+                'checkouts': self.checkouts,
+                'created': self.created,
+                'discarded': self.discarded,
+                'waits': self.waits,
+                'wait_ms_total': round(self.wait_time * 1000, 3),
+                'timeouts': self.timeouts,
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, max_size, timeout):
+    # Keyed by pid as well: a forked worker must not share its parent's connections.
+    key = (os.getpid(), key)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(max_size=max_size, timeout=timeout)
+        return _pools[key]
+
+
+def all_pools():
+    pid = os.getpid()
+    with _pools_lock:
+        return {key: pool for (owner, key), pool in _pools.items() if owner == pid}
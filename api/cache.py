@@ -0,0 +1,181 @@
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+from api.models import TokenRevocation, UserType, UserRole
+
+
+REFERENCE_CACHE_DEFAULTS = {
+    # Cache alias holding the per-table version keys. Use a backend shared by
+    # all workers (file, memcached, redis) so writes are seen everywhere.
+    'ALIAS': 'default',
+    'KEY_PREFIX': 'refcache',
+}
+
+
+def get_reference_cache_settings():
+    return {**REFERENCE_CACHE_DEFAULTS, **getattr(settings, 'REFERENCE_CACHE', {})}
+
+
+def get_version(cache, key, timeout=None):
+    """Current value of the version key, starting it if it is missing."""
+    version = cache.get(key)
+    if version is None:
+        # Start from a fresh value so a cleared cache never reuses an old version.
+        cache.add(key, time.time_ns(), timeout)
+        version = cache.get(key)
+    return version
+
+
+async def aget_version(cache, key, timeout=None):
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, time.time_ns(), timeout)
+        version = await cache.aget(key)
+    return version
+
+
+def bump_version(cache, key, timeout=None):
+    """
+    Moves the version key on, so every reader tagged with the old value
+    reloads. A missing key starts again from a fresh value.
+    """
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout)
+    else:
+        if timeout is not None:
+            cache.touch(key, timeout)
+
+
+class ReferenceCache:
+    """
+    Read-through cache for small, rarely written tables. Rows are held in
+    process memory and tagged with the table version stored in the shared
+    cache; bumping the version (see api.signals) makes every worker reload
+    the table on its next read.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self._lock = threading.Lock()
+        self._version = None
+        self._rows = []
+        self._by_pk = {}
+
+    def __deepcopy__(self, memo):
+        # Serializer fields deep-copy their kwargs; every copy shares the cache.
+        return self
+
+    def _cache(self):
+        return caches[get_reference_cache_settings()['ALIAS']]
+
+    @property
+    def version_key(self):
+        return f"{get_reference_cache_settings()['KEY_PREFIX']}:{self.model._meta.label_lower}:version"
+
+    def version(self):
+        return get_version(self._cache(), self.version_key)
+
+    def bump(self):
+        bump_version(self._cache(), self.version_key)
+
+    def _load(self):
+        version = self.version()
+        with self._lock:
+            if version != self._version:
+                rows = list(self.model.objects.order_by('pk'))
+                self._rows = rows
+                self._by_pk = {row.pk: row for row in rows}
+                self._version = version
+            return self._rows, self._by_pk
+
+    async def _aload(self):
+        # Async twin of _load(): version read and reload without a thread hop
+        # (the version key lives in a cache backend with an async API).
+        version = await aget_version(self._cache(), self.version_key)
+        if version != self._version:
+            rows = [row async for row in self.model.objects.order_by('pk')]
+            with self._lock:
+                self._rows = rows
+                self._by_pk = {row.pk: row for row in rows}
+                self._version = version
+        with self._lock:
+            return self._rows, self._by_pk
+
+    def all(self):
+        rows, _ = self._load()
+        return [copy.copy(row) for row in rows]
+
+    def get(self, pk):
+        _, by_pk = self._load()
+        try:
+            return copy.copy(by_pk[int(pk)])
+        except (KeyError, TypeError, ValueError):
+            raise self.model.DoesNotExist(f'{self.model.__name__} matching query does not exist.')
+
+    async def aall(self):
+        rows, _ = await self._aload()
+        return [copy.copy(row) for row in rows]
+
+    async def aget(self, pk):
+        _, by_pk = await self._aload()
+        try:
+            return copy.copy(by_pk[int(pk)])
+        except (KeyError, TypeError, ValueError):
+            raise self.model.DoesNotExist(f'{self.model.__name__} matching query does not exist.')
+
+    def ids(self):
+        _, by_pk = self._load()
+        return set(by_pk)
+
+    def clear(self):
+        with self._lock:
+            self._version = None
+            self._rows = []
+            self._by_pk = {}
+
+
+class RevocationCache:
+    """
+    Per-user min_version of signed tokens (TokenRevocation). Each user's value
+    is its own key in the shared cache: a miss reads that user's row, and a
+    revocation overwrites only the revoked users' keys, so no worker ever
+    reloads the whole table.
+    """
+
+    def _cache(self):
+        return caches[get_reference_cache_settings()['ALIAS']]
+
+    def key(self, user_id):
+        return f"{get_reference_cache_settings()['KEY_PREFIX']}:revocation:{user_id}"
+
+    def get(self, user_id):
+        cache = self._cache()
+        version = cache.get(self.key(user_id))
+        if version is None:
+            version = TokenRevocation.objects.filter(user_id=user_id).values_list('min_version', flat=True).first() or 0
+            # add(): a revocation that wrote the key meanwhile wins.
+            cache.add(self.key(user_id), version, None)
+        return version
+
+    async def aget(self, user_id):
+        cache = self._cache()
+        version = await cache.aget(self.key(user_id))
+        if version is None:
+            version = await TokenRevocation.objects.filter(user_id=user_id).values_list('min_version', flat=True).afirst() or 0
+            await cache.aadd(self.key(user_id), version, None)
+        return version
+
+    def set_many(self, versions):
+        """versions: {user_id: min_version}, as just written to TokenRevocation."""
+        self._cache().set_many({self.key(user_id): version for user_id, version in versions.items()}, None)
+
+
+user_type_cache = ReferenceCache(UserType)
+user_role_cache = ReferenceCache(UserRole)
+revocation_cache = RevocationCache()
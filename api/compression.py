@@ -0,0 +1,153 @@
+import re
+import zlib
+
+from django.conf import settings
+
+# brotli and zstandard are optional; without them only gzip is offered.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+RESPONSE_COMPRESSION_DEFAULTS = {
+    'ENABLED': True,
+    # Smaller responses are sent as they are: a few hundred bytes fit in one
+    # packet either way and the encoding header eats most of the saving.
+    'MIN_SIZE': 1024,
+    # Server preference when the client accepts several with the same q-value.
+    'ENCODINGS': ('zstd', 'br', 'gzip'),
+    'LEVELS': {'gzip': 6, 'br': 4, 'zstd': 3},
+    # Exact media types, or 'type/*'. Images and other binary formats are
+    # already compressed.
+    'CONTENT_TYPES': (
+        'application/json',
+        'application/x-ndjson',
+        'application/openapi+json',
+        'application/yaml',
+        'application/javascript',
+        'text/*',
+    ),
+}
+
+ACCEPT_ENCODING_RE = re.compile(r'\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*(?:,|$)')
+
+
+def get_response_compression_settings():
+    return {**RESPONSE_COMPRESSION_DEFAULTS, **getattr(settings, 'RESPONSE_COMPRESSION', {})}
+
+
+class GzipCompressor:
+    def __init__(self, level):
+        # wbits 31: deflate in a gzip container, with a zero mtime.
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, level):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+# Content-Encoding token -> compressor class, for the installed libraries.
+COMPRESSORS = {'gzip': GzipCompressor}
+if brotli is not None:
+    COMPRESSORS['br'] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS['zstd'] = ZstdCompressor
+
+
+def compress(encoding, data, level):
+    compressor = COMPRESSORS[encoding](level)
+    return compressor.compress(data) + compressor.finish()
+
+
+def compress_stream(encoding, chunks, level):
+    """
+    Compresses an iterable of bytes chunk by chunk. Each chunk is flushed, so
+    the client receives it as soon as the upstream iterator yields it.
+    """
+    compressor = COMPRESSORS[encoding](level)
+    for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+async def acompress_stream(encoding, chunks, level):
+    """compress_stream() for the async iterators of async streaming responses."""
+    compressor = COMPRESSORS[encoding](level)
+    async for chunk in chunks:
+        data = compressor.compress(chunk) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def parse_accept_encoding(header):
+    """Returns {coding: q} from an Accept-Encoding header; malformed q-values count as 0."""
+    accepted = {}
+    for match in ACCEPT_ENCODING_RE.finditer(header or ''):
+        coding, q = match.group(1).lower(), match.group(2)
+        try:
+            accepted[coding] = 1.0 if q is None else float(q)
+        except ValueError:
+            accepted[coding] = 0.0
+    return accepted
+
+
+def choose_encoding(header, encodings):
+    """
+    Picks the coding with the highest q-value among encodings (in preference
+    order) that the client accepts, or None to send the response unencoded.
+    """
+    accepted = parse_accept_encoding(header)
+    wildcard = accepted.get('*', 0.0)
+    best, best_q = None, 0.0
+    for encoding in encodings:
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def is_compressible(content_type, allowed):
+    media_type = (content_type or '').partition(';')[0].strip().lower()
+    main_type = media_type.partition('/')[0]
+    return media_type in allowed or f'{main_type}/*' in allowed
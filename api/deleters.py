@@ -0,0 +1,102 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection, models, transaction
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from api.models import Profile
+from api.search import SEARCH_TABLE
+from api.signed_tokens import revoke_user_tokens, signed_tokens_enabled
+from api.sql import chunked, placeholders
+
+
+def _user_dependents():
+    """
+    (table, column) for every table that references auth_user, other than
+    the profile and token tables handled explicitly. Rows are deleted by
+    foreign key column, so a cascade that would itself cascade further is
+    not supported.
+    """
+    dependents = [
+        (field.remote_field.through._meta.db_table, field.m2m_column_name())
+        for field in User._meta.many_to_many
+    ]
+    for relation in User._meta.related_objects:
+        if relation.related_model in (Profile, Token) or relation.many_to_many:
+            continue
+        if relation.on_delete is not models.CASCADE:
+            raise ValueError(f'{relation.related_model.__name__}.{relation.field.name} does not cascade')
+        dependents.append((relation.related_model._meta.db_table, relation.field.column))
+    return dependents
+
+
+class ProfileBulkDeleter:
+    """
+    Deletes profiles together with their users, tokens, role links and search
+    rows using one DELETE ... WHERE ... IN per table and chunk, instead of the
+    per-object collector behind Model.delete(). Each chunk is its own
+    transaction. No model instances are loaded, so delete signals are not sent;
+    the token cache and search index are updated here instead.
+    """
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or getattr(settings, 'PROFILE_BULK_DELETE_CHUNK_SIZE', 500)
+        self.user_dependents = _user_dependents()
+        self.counts = {'profiles': 0, 'users': 0, 'tokens': 0, 'role_links': 0}
+
+    def delete_ids(self, profile_ids):
+        return self.run(chunked(sorted(set(profile_ids)), self.chunk_size))
+
+    def delete_queryset(self, queryset):
+        # Keyset walk over the matching ids; deleted rows drop out of the filter.
+        def chunks():
+            last_id = 0
+            while True:
+                chunk = list(
+                    queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:self.chunk_size]
+                )
+                if not chunk:
+                    return
+                last_id = chunk[-1]
+                yield chunk
+        return self.run(chunks())
+
+    def run(self, chunks):
+        started = time.perf_counter()
+        for chunk in chunks:
+            self.delete_chunk(chunk)
+        return {
+            'deleted': self.counts,
+            'elapsed_seconds': round(time.perf_counter() - started, 3),
+        }
+
+    def delete_chunk(self, profile_ids):
+        with transaction.atomic():
+            user_ids = list(
+                Profile.objects.filter(id__in=profile_ids).values_list('user_id', flat=True)
+            )
+            if not user_ids:
+                return
+            Through = Profile.user_roles.through
+            self.counts['role_links'] += self.execute(
+                Through._meta.db_table, Through._meta.get_field('profile').column, profile_ids
+            )
+            self.execute(SEARCH_TABLE, 'rowid', profile_ids)
+            self.counts['profiles'] += self.execute(Profile._meta.db_table, 'id', profile_ids)
+            # Read before the raw DELETE: other workers may have these cached.
+            token_keys = list(Token.objects.filter(user_id__in=user_ids).values_list('key', flat=True))
+            self.counts['tokens'] += self.execute(Token._meta.db_table, 'user_id', user_ids)
+            for table, column in self.user_dependents:
+                self.execute(table, column, user_ids)
+            self.counts['users'] += self.execute(User._meta.db_table, 'id', user_ids)
+            if signed_tokens_enabled():
+                revoke_user_tokens(user_ids)
+            token_cache.invalidate_many(token_keys)
+
+    def execute(self, table, column, ids):
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {quote(table)} WHERE {quote(column)} IN ({placeholders(ids)})', ids)
+            return cursor.rowcount
@@ -0,0 +1,81 @@
+import csv
+import json
+
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+
+from api.importers import CSV, NDJSON
+from api.models import Profile
+from api.serializers import ProfileSerializer
+
+
+EXPORT_FORMATS = (NDJSON, CSV)
+
+CSV_COLUMNS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'phone_number',
+    'profile_picture', 'user_type_id', 'user_type_name', 'user_role_ids',
+    'user_role_names', 'created_at', 'updated_at',
+)
+
+CONTENT_TYPES = {
+    NDJSON: 'application/x-ndjson',
+    CSV: 'text/csv',
+}
+
+
+class Echo:
+    """File-like object whose write() hands the value back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_profile_chunks(chunk_size=None):
+    """
+    Yields lists of profiles with user, user_type and user_roles loaded, walking
+    the table by primary key so only one chunk is held in memory at a time.
+    """
+    chunk_size = chunk_size or getattr(settings, 'PROFILE_EXPORT_CHUNK_SIZE', 500)
+    queryset = Profile.objects.select_related('user', 'user_type').order_by('id')
+    last_id = 0
+    while True:
+        chunk = list(queryset.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        prefetch_related_objects(chunk, 'user_roles')
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def iter_ndjson(chunk_size=None):
+    for chunk in iter_profile_chunks(chunk_size):
+        yield ''.join(
+            json.dumps(row, ensure_ascii=False) + '\n'
+            for row in ProfileSerializer(chunk, many=True).data
+        )
+
+
+def iter_csv(chunk_size=None):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_COLUMNS)
+    for chunk in iter_profile_chunks(chunk_size):
+        yield ''.join(writer.writerow(_csv_row(row)) for row in ProfileSerializer(chunk, many=True).data)
+
+
+def _csv_row(row):
+    user = row['user']
+    user_type = row['user_type'] or {}
+    return (
+        row['id'], user['username'], user['email'], user['first_name'], user['last_name'],
+        row['phone_number'] or '', row['profile_picture'] or '',
+        user_type.get('id', ''), user_type.get('name', ''),
+        ';'.join(str(role['id']) for role in row['user_roles']),
+        ';'.join(role['name'] for role in row['user_roles']),
+        row['created_at'], row['updated_at'],
+    )
+
+
+def export_profiles(file_format=NDJSON, chunk_size=None):
+    if file_format == CSV:
+        return iter_csv(chunk_size)
+    return iter_ndjson(chunk_size)
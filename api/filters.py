@@ -0,0 +1,100 @@
+import django_filters
+from django import forms
+from django.contrib.auth.models import User
+from django.db.models import BigIntegerField, ExpressionWrapper, F
+from django_filters.constants import EMPTY_VALUES
+
+from api.models import Profile
+from api.rolemasks import build_mask, is_maskable
+
+
+# Query parameters accepted by ProfileFilter, apart from ordering.
+FILTER_PARAMS = (
+    'user_type', 'user_roles', 'user_roles_all', 'email', 'phone_number',
+    'created_at_after', 'created_at_before', 'updated_at_after', 'updated_at_before',
+)
+
+
+class NumberInFilter(django_filters.BaseInFilter, django_filters.NumberFilter):
+    pass
+
+
+class IdInFilter(NumberInFilter):
+    field_class = forms.IntegerField
+
+
+class ProfileOrderingFilter(django_filters.OrderingFilter):
+    """OrderingFilter that always appends id so page boundaries are stable."""
+
+    def get_ordering(self, value):
+        ordering = [self.get_ordering_value(param) for param in value]
+        tie_breaker = '-id' if ordering[-1].startswith('-') else 'id'
+        return (*ordering, tie_breaker)
+
+    def filter(self, qs, value):
+        if value in EMPTY_VALUES:
+            return qs
+        return qs.order_by(*self.get_ordering(value))
+
+
+class ProfileFilter(django_filters.FilterSet):
+    """
+    Server-side filters for the profile list. Every filter is an equality or
+    range lookup that one of the indexes from migrations 0005 and 0009 (or the
+    through table's userrole_id index) can serve; see api/tests.py for the EXPLAIN
+    QUERY PLAN check.
+    """
+
+    user_type = django_filters.NumberFilter(field_name='user_type_id')
+    # Profiles holding any / all of the given role ids. Both search the
+    # through table by role; user_roles_all checks the remaining roles with
+    # role_mask on the rows found, instead of one more subquery per role.
+    user_roles = IdInFilter(method='filter_user_roles')
+    user_roles_all = IdInFilter(method='filter_user_roles_all')
+    email = django_filters.CharFilter(method='filter_email')
+    phone_number = django_filters.CharFilter(field_name='phone_number')
+    created_at = django_filters.IsoDateTimeFromToRangeFilter(field_name='created_at')
+    updated_at = django_filters.IsoDateTimeFromToRangeFilter(field_name='updated_at')
+    ordering = ProfileOrderingFilter(fields=('created_at', 'updated_at'))
+
+    class Meta:
+        model = Profile
+        fields = []
+
+    def role_match(self, queryset, name, mask):
+        """Aliases role_mask & mask as <name>_match for a bitwise filter."""
+        return queryset.alias(**{
+            f'{name}_match': ExpressionWrapper(F('role_mask').bitand(mask), output_field=BigIntegerField())
+        })
+
+    def holders(self, role_ids):
+        return Profile.user_roles.through.objects.filter(userrole_id__in=role_ids).values('profile_id')
+
+    def filter_email(self, queryset, name, value):
+        # A semi-join on user_id searches api_user_email_idx first whatever
+        # the planner estimates for the join, rather than walking the
+        # ordering index and looking up every user.
+        return queryset.filter(user_id__in=User.objects.filter(email=value).values('pk'))
+
+    def filter_user_roles(self, queryset, name, value):
+        # A bitwise "role_mask & mask > 0" has no index to use and scans
+        # every profile; benchmark_role_filters measures both.
+        return queryset.filter(id__in=self.holders(value))
+
+    def filter_user_roles_all(self, queryset, name, value):
+        # The first role drives the search; list the rarest role first.
+        first, *rest = value
+        queryset = queryset.filter(id__in=self.holders([first]))
+        mask = build_mask(rest)
+        if mask:
+            queryset = self.role_match(queryset, name, mask).filter(**{f'{name}_match': mask})
+        for role_id in {role_id for role_id in rest if not is_maskable(role_id)} - {first}:
+            queryset = queryset.filter(id__in=self.holders([role_id]))
+        return queryset
+
+    def get_ordering(self):
+        """Returns the requested ordering as model field names, or None."""
+        value = self.form.cleaned_data.get('ordering')
+        if value in EMPTY_VALUES:
+            return None
+        return self.filters['ordering'].get_ordering(value)
@@ -0,0 +1,190 @@
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+
+from api.cache import user_type_cache, user_role_cache
+from api.models import Profile
+from api.renderers import FragmentJSONRenderer, JSONFragment
+from api.serializers import ProfileSerializer
+from api.timing import serializing
+
+
+PROFILE_FRAGMENT_CACHE_DEFAULTS = {
+    'ENABLED': True,
+    # Upper bound on the JSON held per worker; least recently used
+    # fragments are evicted first.
+    'MAX_BYTES': 32 * 1024 * 1024,
+}
+
+# User fields that appear in a profile's representation. Saving any of them
+# moves Profile.updated_at (see api.signals), which retires cached fragments.
+RENDERED_USER_FIELDS = frozenset({'username', 'email', 'first_name', 'last_name'})
+
+
+def get_profile_fragment_cache_settings():
+    return {**PROFILE_FRAGMENT_CACHE_DEFAULTS, **getattr(settings, 'PROFILE_FRAGMENT_CACHE', {})}
+
+
+def touch_profiles(**filters):
+    """
+    Moves updated_at forward on the matching profiles so every worker stops
+    using their cached fragments, for changes to rows the profile renders
+    but does not own. Role link changes move it in refresh_role_masks().
+    """
+    return Profile.objects.filter(**filters).update(updated_at=timezone.now())
+
+
+class ProfileFragmentCache:
+    """
+    Bounded LRU of ProfileSerializer output encoded as JSON, keyed by profile
+    id, updated_at and the representation variant (fieldset plus the
+    UserType/UserRole table versions). Any change to a profile or to the rows
+    it renders produces a new key, so entries are never stale, only unused;
+    those age out of the LRU.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._profile_keys = {}
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def config(self):
+        return get_profile_fragment_cache_settings()
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                content = self._entries.get(key)
+                if content is None:
+                    self.misses += 1
+                else:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    found[key] = JSONFragment(content)
+        return found
+
+    def set(self, key, content):
+        max_bytes = self.config['MAX_BYTES']
+        if len(content) > max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = content
+            self._profile_keys.setdefault(key[0], set()).add(key)
+            self.bytes += len(content)
+            while self.bytes > max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        self.bytes -= len(self._entries.pop(key))
+        keys = self._profile_keys.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._profile_keys[key[0]]
+
+    def invalidate_profiles(self, profile_ids):
+        with self._lock:
+            for profile_id in profile_ids:
+                for key in list(self._profile_keys.get(profile_id, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._profile_keys.clear()
+            self.bytes = self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.config['ENABLED'],
+                'size': len(self._entries),
+                'bytes': self.bytes,
+                'max_bytes': self.config['MAX_BYTES'],
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+profile_fragment_cache = ProfileFragmentCache()
+
+
+class ProfileFragments:
+    """
+    Builds profile representations for one fieldset from cached fragments,
+    rendering only the misses. Results are JSONFragments, which
+    FragmentJSONRenderer writes into the response without re-encoding.
+    Representations from ProfileSerializer and ProfileValuesReader are
+    identical, so both paths share the cache.
+    """
+
+    renderer = FragmentJSONRenderer()
+
+    def __init__(self, fields=None, expand=None):
+        self.fields = fields
+        self.expand = expand
+        self.enabled = profile_fragment_cache.config['ENABLED']
+        if self.enabled:
+            wanted = set(ProfileSerializer.READABLE_FIELDS if fields is None else fields)
+            expanded = set(ProfileSerializer.EXPANDABLE_FIELDS if expand is None else expand)
+            self.variant = (
+                tuple(name for name in ProfileSerializer.READABLE_FIELDS if name in wanted),
+                tuple(name for name in ProfileSerializer.EXPANDABLE_FIELDS if name in wanted & expanded),
+                user_type_cache.version(),
+                user_role_cache.version(),
+            )
+
+    def render(self, items, get_key, serialize):
+        """
+        Returns one representation per item. get_key(item) gives its
+        (id, updated_at); serialize(missed_items) renders the misses in order.
+        """
+        if not self.enabled:
+            return serialize(items)
+        keys = [(*get_key(item), self.variant) for item in items]
+        found = profile_fragment_cache.get_many(keys)
+        missed = [(key, item) for key, item in zip(keys, items) if key not in found]
+        if missed:
+            with serializing():
+                rendered = [
+                    (key, self.renderer.fragment(data))
+                    for (key, _), data in zip(missed, serialize([item for _, item in missed]))
+                ]
+            for key, fragment in rendered:
+                profile_fragment_cache.set(key, fragment.json)
+                found[key] = fragment
+        return [found[key] for key in keys]
+
+    def render_profiles(self, profiles):
+        """
+        Representations of model instances loaded with
+        ProfileSerializer.setup_eager_loading(..., prefetch=False); role links
+        are prefetched for the misses only.
+        """
+        def serialize(missed):
+            prefetch_related_objects(missed, *ProfileSerializer.get_prefetch_lookups(self.fields, self.expand))
+            return ProfileSerializer(missed, many=True, fields=self.fields, expand=self.expand).data
+
+        return self.render(list(profiles), lambda profile: (profile.pk, profile.updated_at), serialize)
+
+    def render_profile(self, profile):
+        return self.render_profiles([profile])[0]
+
+    def render_rows(self, rows, reader):
+        """Representations of ProfileValuesReader rows, rendered by the reader on a miss."""
+        return self.render(list(rows), lambda row: (row['id'], row['updated_at']), reader.serialize)
@@ -0,0 +1,113 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+
+
+PASSWORD_HASH_POOL_DEFAULTS = {
+    'WORKERS': 2,
+    # Hash jobs allowed to wait for a free worker before callers get a 503.
+    'MAX_QUEUE': 32,
+}
+
+
+class HashPoolFull(Exception):
+    pass
+
+
+def get_password_hash_pool_settings(name='PASSWORD_HASH_POOL'):
+    return {**PASSWORD_HASH_POOL_DEFAULTS, **getattr(settings, name, {})}
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _make_password(password):
+    from django.contrib.auth.hashers import make_password
+    return make_password(password)
+
+
+def _check_password(password, encoded):
+    from django.contrib.auth.hashers import check_password
+    return check_password(password, encoded)
+
+
+class PasswordHashPool:
+    """
+    Runs PBKDF2 hashing on a bounded process pool so that login and register
+    bursts do not hold request workers or the event loop. Each instance has
+    its own executor, sized by the settings dict named by setting.
+    """
+
+    def __init__(self, setting='PASSWORD_HASH_POOL'):
+        self.setting = setting
+        self._executor = None
+        self._lock = threading.Lock()
+        self.pending = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=get_password_hash_pool_settings(self.setting)['WORKERS'],
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', 'LearninWithDjangoRest.settings'),),
+                )
+            return self._executor
+
+    def _acquire(self):
+        config = get_password_hash_pool_settings(self.setting)
+        with self._lock:
+            if self.pending >= config['WORKERS'] + config['MAX_QUEUE']:
+                raise HashPoolFull()
+            self.pending += 1
+
+    def _release(self):
+        with self._lock:
+            self.pending -= 1
+
+    async def run(self, func, *args):
+        self._acquire()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._release()
+
+    async def make_password(self, password):
+        return await self.run(_make_password, password)
+
+    async def check_password(self, password, encoded):
+        return await self.run(_check_password, password, encoded)
+
+    def make_passwords(self, passwords):
+        """
+        Hashes a batch from synchronous code, split evenly over the workers,
+        and returns the encoded passwords in order. The batch bypasses the
+        queue limit, so only use it on a pool that request handlers do not
+        share (import_hash_pool).
+        """
+        if not passwords:
+            return []
+        workers = get_password_hash_pool_settings(self.setting)['WORKERS']
+        chunksize = -(-len(passwords) // workers)
+        return list(self._get_executor().map(_make_password, passwords, chunksize=chunksize))
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+
+password_hash_pool = PasswordHashPool()
+# Bulk import gets its own workers, so a large file never queues ahead of
+# logins on password_hash_pool.
+import_hash_pool = PasswordHashPool('PROFILE_IMPORT_HASH_POOL')
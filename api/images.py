@@ -0,0 +1,111 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_PICTURE_DERIVATIVES = (
+    {'name': 'thumb_64', 'size': 64, 'format': 'JPEG'},
+    {'name': 'thumb_256', 'size': 256, 'format': 'JPEG'},
+    {'name': 'webp_256', 'size': 256, 'format': 'WEBP'},
+)
+
+EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}
+
+DERIVATIVES_DIR = 'derivatives'
+
+
+def get_derivative_specs():
+    return getattr(settings, 'PROFILE_PICTURE_DERIVATIVES', DEFAULT_PROFILE_PICTURE_DERIVATIVES)
+
+
+def derivative_name(name, spec):
+    directory, filename = os.path.split(name)
+    # Keep the original extension in the stem so a.jpg and a.png do not collide.
+    stem = filename.replace('.', '_')
+    return os.path.join(directory, DERIVATIVES_DIR, f"{stem}_{spec['name']}.{EXTENSIONS[spec['format']]}")
+
+
+def derivative_urls(name):
+    if not name:
+        return None
+    return {spec['name']: default_storage.url(derivative_name(name, spec)) for spec in get_derivative_specs()}
+
+
+def is_up_to_date(name, target, storage=default_storage):
+    if not storage.exists(target):
+        return False
+    try:
+        return storage.get_modified_time(target) >= storage.get_modified_time(name)
+    except NotImplementedError:
+        return True
+
+
+def render_derivative(image, spec):
+    derivative = image.copy()
+    derivative.thumbnail((spec['size'], spec['size']), Image.LANCZOS)
+    if spec['format'] == 'JPEG' and derivative.mode not in ('RGB', 'L'):
+        derivative = derivative.convert('RGB')
+    buffer = BytesIO()
+    derivative.save(buffer, format=spec['format'], quality=85, optimize=True)
+    return buffer.getvalue()
+
+
+def generate_derivatives(name, force=False, storage=default_storage):
+    """
+    Writes every configured derivative of the stored image ``name`` that is
+    missing or older than the original. Returns the number written.
+    """
+    pending = [
+        (spec, derivative_name(name, spec))
+        for spec in get_derivative_specs()
+        if force or not is_up_to_date(name, derivative_name(name, spec), storage)
+    ]
+    if not pending:
+        return 0
+
+    with storage.open(name, 'rb') as original:
+        image = ImageOps.exif_transpose(Image.open(original))
+        image.load()
+
+    for spec, target in pending:
+        content = render_derivative(image, spec)
+        if storage.exists(target):
+            storage.delete(target)
+        storage.save(target, ContentFile(content))
+    return len(pending)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'PROFILE_PICTURE_WORKERS', 2),
+                thread_name_prefix='profile-pictures',
+            )
+        return _executor
+
+
+def _generate_in_background(name):
+    try:
+        generate_derivatives(name)
+    except Exception:
+        logger.exception('Could not generate derivatives for %s', name)
+
+
+def schedule_derivatives(name):
+    """Generates derivatives of ``name`` on a background thread."""
+    _get_executor().submit(_generate_in_background, name)
@@ -0,0 +1,225 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from api.cache import user_type_cache, user_role_cache
+from api.hashing import import_hash_pool
+from api.models import Profile
+from api.rolemasks import refresh_role_masks
+from api.search import index_profiles
+
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+IMPORT_FORMATS = (NDJSON, CSV)
+
+# Maximum number of per-row errors kept in the import report.
+MAX_REPORTED_ERRORS = 1000
+
+
+class ProfileImportRowSerializer(serializers.Serializer):
+    username = serializers.CharField(max_length=150)
+    email = serializers.EmailField()
+    first_name = serializers.CharField(required=False, allow_blank=True, max_length=150, default='')
+    last_name = serializers.CharField(required=False, allow_blank=True, max_length=150, default='')
+    password = serializers.CharField(required=False, allow_blank=True, default='')
+    # An already encoded Django password (e.g. pbkdf2_sha256$...), stored as is.
+    password_hash = serializers.CharField(required=False, allow_blank=True, default='')
+    phone_number = serializers.CharField(required=False, allow_blank=True, allow_null=True, max_length=20, default=None)
+    user_type_id = serializers.IntegerField()
+    user_role_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+    def validate_password_hash(self, value):
+        if value:
+            try:
+                identify_hasher(value)
+            except ValueError:
+                raise serializers.ValidationError('Şifre özeti tanınmadı')
+        return value
+
+    def validate(self, attrs):
+        if attrs['password'] and attrs['password_hash']:
+            raise serializers.ValidationError('password ve password_hash birlikte verilemez')
+        return attrs
+
+    def validate_user_type_id(self, value):
+        if value not in self.context['user_type_ids']:
+            raise serializers.ValidationError('Kullanıcı tipi bulunamadı')
+        return value
+
+    def validate_user_role_ids(self, value):
+        missing = set(value) - self.context['user_role_ids']
+        if missing:
+            raise serializers.ValidationError(f'Kullanıcı rolü bulunamadı: {sorted(missing)}')
+        return value
+
+
+def guess_format(filename):
+    if filename and filename.lower().endswith('.csv'):
+        return CSV
+    return NDJSON
+
+
+def read_rows(stream, file_format):
+    """
+    Yields (line_number, row) pairs from a text stream. Rows that cannot be
+    parsed are yielded as (line_number, None).
+    """
+    if file_format == CSV:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            roles = row.get('user_role_ids') or ''
+            row['user_role_ids'] = [role for role in roles.replace(';', '|').split('|') if role.strip()]
+            yield reader.line_num, row
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        if not isinstance(row, dict):
+            row = None
+        yield line_number, row
+
+
+class ProfileImporter:
+    """
+    Creates users and profiles from an iterable of rows in chunks. Each chunk
+    is validated up front, written with bulk_create in its own transaction, and
+    rows that fail validation are reported without aborting the import.
+
+    Rows may carry a pre-hashed password_hash, which is stored as is. Plain
+    passwords are hashed on import_hash_pool, separate from the login pool,
+    before the chunk's transaction starts.
+    """
+
+    def __init__(self, chunk_size=None):
+        self.chunk_size = chunk_size or getattr(settings, 'PROFILE_IMPORT_CHUNK_SIZE', 1000)
+        self.context = {
+            'user_type_ids': user_type_cache.ids(),
+            'user_role_ids': user_role_cache.ids(),
+        }
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line_number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'errors': errors})
+
+    def run(self, rows):
+        started = time.perf_counter()
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                break
+            self.import_chunk(chunk)
+        elapsed = time.perf_counter() - started
+        processed = self.created + self.failed
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'elapsed_seconds': round(elapsed, 3),
+            'rows_per_second': round(processed / elapsed, 1) if elapsed else None,
+        }
+
+    def import_chunk(self, chunk):
+        valid = []
+        seen_usernames = set()
+        for line_number, row in chunk:
+            if row is None:
+                self.add_error(line_number, {'non_field_errors': ['Satır okunamadı']})
+                continue
+            serializer = ProfileImportRowSerializer(data=row, context=self.context)
+            if not serializer.is_valid():
+                self.add_error(line_number, serializer.errors)
+                continue
+            username = serializer.validated_data['username']
+            if username in seen_usernames:
+                self.add_error(line_number, {'username': ['Bu kullanıcı adı dosyada tekrar ediyor']})
+                continue
+            seen_usernames.add(username)
+            valid.append((line_number, serializer.validated_data))
+
+        existing = set(
+            User.objects.filter(username__in=seen_usernames).values_list('username', flat=True)
+        )
+        rows = []
+        for line_number, data in valid:
+            if data['username'] in existing:
+                self.add_error(line_number, {'username': ['Bu kullanıcı adı zaten kayıtlı']})
+            else:
+                rows.append((line_number, data))
+        if not rows:
+            return
+
+        passwords = self.hash_passwords([data for _, data in rows])
+        users = [
+            User(
+                username=data['username'],
+                email=data['email'],
+                first_name=data['first_name'],
+                last_name=data['last_name'],
+                password=password,
+            )
+            for (_, data), password in zip(rows, passwords)
+        ]
+        try:
+            profiles = self.write_chunk(users, [data for _, data in rows])
+        except IntegrityError as exc:
+            # A concurrent writer took one of the usernames; the chunk is rolled back.
+            for line_number, _ in rows:
+                self.add_error(line_number, {'non_field_errors': [str(exc)]})
+            return
+        self.created += len(profiles)
+
+    def hash_passwords(self, rows):
+        plain = iter(import_hash_pool.make_passwords([data['password'] for data in rows if data['password']]))
+        return [
+            data['password_hash'] or (next(plain) if data['password'] else make_password(None))
+            for data in rows
+        ]
+
+    def write_chunk(self, users, rows):
+        with transaction.atomic():
+            users = User.objects.bulk_create(users)
+            profiles = Profile.objects.bulk_create([
+                Profile(user=user, phone_number=data['phone_number'], user_type_id=data['user_type_id'])
+                for user, data in zip(users, rows)
+            ])
+            Through = Profile.user_roles.through
+            Through.objects.bulk_create(
+                [
+                    Through(profile_id=profile.pk, userrole_id=role_id)
+                    for profile, data in zip(profiles, rows)
+                    for role_id in set(data['user_role_ids'])
+                ],
+                batch_size=self.chunk_size,
+            )
+            # bulk_create sends no post_save or m2m_changed, so index the new
+            # rows and fill their role masks here.
+            index_profiles([profile.pk for profile in profiles])
+            refresh_role_masks([profile.pk for profile in profiles])
+        return profiles
+
+
+def import_profiles(file, file_format=NDJSON, chunk_size=None):
+    if isinstance(file, io.TextIOBase):
+        stream = file
+    else:
+        stream = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    return ProfileImporter(chunk_size=chunk_size).run(read_rows(stream, file_format))
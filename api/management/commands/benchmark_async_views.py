@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import ThreadSensitiveContext, sync_to_async
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.test import AsyncClient, Client
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from api.models import Profile, UserType
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests per second and latency percentiles of the WSGI views '
+        'and their native async counterparts (/api/async/...) at a given '
+        'concurrency. Requests go through the WSGI and ASGI handlers in process, '
+        'so the numbers exclude the web server itself.'
+    )
+
+    # The test clients keep close_old_connections off the request signals, so
+    # it is called after every request here, as the real handlers do. Without
+    # it worker threads would hold on to pooled connections.
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per endpoint and mode')
+        parser.add_argument('--concurrency', type=int, default=64)
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username=f'benchmark-async-{time.time_ns()}')
+        token = Token.objects.create(user=user)
+        headers = {'Authorization': f'Token {token.key}'}
+
+        endpoints = [('profile-list', []), ('user-type-list', []), ('user-role-list', [])]
+        profile_id = Profile.objects.values_list('pk', flat=True).first()
+        if profile_id is not None:
+            endpoints.append(('profile-detail', [profile_id]))
+        user_type_id = UserType.objects.values_list('pk', flat=True).first()
+        if user_type_id is not None:
+            endpoints.append(('user-type-detail', [user_type_id]))
+
+        pooled = bool(connection.settings_dict['OPTIONS'].get('pool'))
+        self.stdout.write(
+            f"{options['requests']} requests per endpoint, concurrency {options['concurrency']}, "
+            f"connection pool {'on' if pooled else 'off'}"
+        )
+        self.stdout.write(f"{'endpoint':>18} {'mode':>6} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8}")
+        # Every request is slow under this load; keep the log out of the table.
+        logger = logging.getLogger('api.performance')
+        logger.disabled = True
+        try:
+            for name, args in endpoints:
+                sync_url = reverse(name, args=args)
+                async_url = reverse(f'async-{name}', args=args)
+                for mode, samples, elapsed in (
+                    ('wsgi', *self.run_wsgi(sync_url, headers, options)),
+                    ('asgi', *self.run_asgi(async_url, headers, options)),
+                ):
+                    self.stdout.write(
+                        f'{name:>18} {mode:>6} {len(samples) / elapsed:>8.0f} '
+                        f'{statistics.median(samples):>8.2f} {statistics.quantiles(samples, n=100)[-1]:>8.2f}'
+                    )
+        finally:
+            logger.disabled = False
+            user.delete()
+
+    def run_wsgi(self, url, headers, options):
+        def send(_):
+            client = Client()
+            started = time.perf_counter()
+            response = client.get(url, headers=headers)
+            close_old_connections()
+            assert response.status_code == 200, response.content
+            return (time.perf_counter() - started) * 1000
+
+        send(None)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            samples = list(executor.map(send, range(options['requests'])))
+        return samples, time.perf_counter() - started
+
+    def run_asgi(self, url, headers, options):
+        async def run():
+            client = AsyncClient()
+            semaphore = asyncio.Semaphore(options['concurrency'])
+
+            async def send():
+                # ASGIHandler gives every request its own sync thread (and so
+                # its own connection); AsyncClient does not.
+                async with semaphore, ThreadSensitiveContext():
+                    started = time.perf_counter()
+                    response = await client.get(url, headers=headers)
+                    await sync_to_async(close_old_connections)()
+                    assert response.status_code == 200, response.content
+                    return (time.perf_counter() - started) * 1000
+
+            await send()
+            started = time.perf_counter()
+            samples = await asyncio.gather(*(send() for _ in range(options['requests'])))
+            return samples, time.perf_counter() - started
+
+        return asyncio.run(run())
@@ -0,0 +1,132 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.cache import user_type_cache, user_role_cache
+from api.compression import COMPRESSORS, compress, compress_stream
+from api.docs import docs_enabled
+from api.exporters import export_profiles
+from api.models import Profile, UserType, UserRole
+from api.readers import ProfileValuesReader
+from api.rolemasks import refresh_role_masks
+from api.serializers import UserTypeSerializer, UserRoleSerializer
+
+
+# Levels compared per coding: fastest, the middleware default, strongest.
+LEVELS = {
+    'gzip': (1, 6, 9),
+    'br': (1, 4, 11),
+    'zstd': (1, 3, 19),
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare response size and compression CPU time for each installed coding '
+        'and level on real payloads: a profile list page, the role and type lists, '
+        'the OpenAPI schema and the streamed profile export. Profiles are seeded '
+        'inside a transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=2000)
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--roles', type=int, default=20)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['profiles'], options['roles'])
+                self.run(self.payloads(options['page_size']), options['repeat'])
+                self.run_stream(options['repeat'])
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def seed(self, count, role_count):
+        user_type = UserType.objects.create(name='benchmark', description='benchmark type')
+        roles = [
+            UserRole.objects.create(name=f'benchmark-{i}', description=f'benchmark role {i}')
+            for i in range(role_count)
+        ]
+        users = User.objects.bulk_create([
+            User(username=f'compression-{i}', email=f'compression-{i}@example.com',
+                 first_name='Bench', last_name=str(i), password='!')
+            for i in range(count)
+        ])
+        profiles = Profile.objects.bulk_create([
+            Profile(user=user, user_type=user_type, phone_number=f'555{i:07d}')
+            for i, user in enumerate(users)
+        ])
+        Through = Profile.user_roles.through
+        Through.objects.bulk_create([
+            Through(profile_id=profile.pk, userrole_id=roles[(i + j) % role_count].pk)
+            for i, profile in enumerate(profiles)
+            for j in range(3)
+        ])
+        refresh_role_masks([profile.pk for profile in profiles])
+
+    def payloads(self, page_size):
+        render = JSONRenderer().render
+        reader = ProfileValuesReader()
+        rows = reader.get_queryset().order_by('created_at', 'id')[:page_size]
+        payloads = {
+            f'profiles x{page_size}': render(reader.serialize(rows)),
+            'user roles': render(UserRoleSerializer(user_role_cache.all(), many=True).data),
+            'user types': render(UserTypeSerializer(user_type_cache.all(), many=True).data),
+        }
+        if docs_enabled():
+            from api.schema import generate_schema, get_codec
+
+            payloads['openapi json'] = get_codec('json').encode(generate_schema())
+        return payloads
+
+    def time(self, func, repeat):
+        func()
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
+
+    def levels(self):
+        return [(encoding, level) for encoding in COMPRESSORS for level in LEVELS[encoding]]
+
+    def run(self, payloads, repeat):
+        self.stdout.write(f"{'payload':>16} {'coding':>9} {'bytes':>9} {'ratio':>6} {'ms':>8} {'MB/s':>7}")
+        for name, payload in payloads.items():
+            self.stdout.write(f"{name:>16} {'identity':>9} {len(payload):>9}")
+            for encoding, level in self.levels():
+                size = len(compress(encoding, payload, level))
+                ms = self.time(lambda: compress(encoding, payload, level), repeat)
+                self.stdout.write(
+                    f"{'':>16} {f'{encoding}-{level}':>9} {size:>9} {len(payload) / size:>6.1f} "
+                    f"{ms:>8.3f} {len(payload) / 1e3 / ms if ms else 0:>7.0f}"
+                )
+
+    def run_stream(self, repeat):
+        # The middleware flushes after every chunk the export yields, so the
+        # client gets each chunk as it is produced; this shows what that costs
+        # against compressing the whole body at once.
+        chunks = [chunk.encode() for chunk in export_profiles()]
+        body = b''.join(chunks)
+        self.stdout.write(f'\nprofile export: {len(chunks)} chunks, {len(body)} bytes')
+        self.stdout.write(f"{'coding':>9} {'whole':>9} {'streamed':>9} {'whole ms':>9} {'streamed ms':>12}")
+        for encoding, level in self.levels():
+            whole = len(compress(encoding, body, level))
+            streamed = sum(len(data) for data in compress_stream(encoding, chunks, level))
+            whole_ms = self.time(lambda: compress(encoding, body, level), max(repeat // 4, 1))
+            streamed_ms = self.time(lambda: list(compress_stream(encoding, chunks, level)), max(repeat // 4, 1))
+            self.stdout.write(
+                f"{f'{encoding}-{level}':>9} {whole:>9} {streamed:>9} {whole_ms:>9.2f} {streamed_ms:>12.2f}"
+            )
@@ -0,0 +1,77 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.backends.sqlite3.pool import all_pools
+from api.models import Profile
+
+
+MODES = {
+    'per-request': {'CONN_MAX_AGE': 0, 'pool': False},
+    'persistent': {'CONN_MAX_AGE': 600, 'pool': False},
+    'pooled': {'CONN_MAX_AGE': 0, 'pool': {'max_size': 4}},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Time existing API endpoints with a connection opened per request, a '
+        'persistent connection (CONN_MAX_AGE) and the connection pool. Each '
+        'request is followed by the close_old_connections() call Django makes '
+        'when a request finishes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username=f'benchmark-connections-{time.time_ns()}', is_staff=True)
+        token = Token.objects.create(user=user)
+        client = APIClient(HTTP_HOST='localhost')
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        urls = [reverse('user-type-list'), reverse('profile-list')]
+        profile_id = Profile.objects.values_list('pk', flat=True).first()
+        if profile_id is not None:
+            urls.append(reverse('profile-detail', args=[profile_id]))
+
+        original = {
+            'CONN_MAX_AGE': connection.settings_dict['CONN_MAX_AGE'],
+            'pool': connection.settings_dict['OPTIONS'].get('pool', False),
+        }
+        try:
+            self.stdout.write(f"{'mode':>12} {'endpoint':>28} {'p50 ms':>8} {'p95 ms':>8}")
+            for mode, config in MODES.items():
+                self.configure(config)
+                for url in urls:
+                    samples = self.measure(client, url, options['iterations'])
+                    self.stdout.write(
+                        f'{mode:>12} {url:>28} {statistics.median(samples):>8.2f} '
+                        f'{statistics.quantiles(samples, n=20)[-1]:>8.2f}'
+                    )
+            for key, pool in all_pools().items():
+                self.stdout.write(f'pool {key}: {pool.stats()}')
+        finally:
+            self.configure(original)
+            user.delete()
+
+    def configure(self, config):
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = config['CONN_MAX_AGE']
+        connection.settings_dict['OPTIONS']['pool'] = config['pool']
+
+    def measure(self, client, url, iterations):
+        samples = []
+        for _ in range(iterations + 1):
+            started = time.perf_counter()
+            response = client.get(url)
+            close_old_connections()
+            samples.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.content
+        return samples[1:]
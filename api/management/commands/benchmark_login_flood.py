@@ -0,0 +1,110 @@
+import logging
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.test import Client, override_settings
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from api.throttling import get_auth_throttle_settings
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure read endpoint latency while other threads flood /api/login/ with '
+        'wrong passwords, with the auth throttles off and on. Requests go through '
+        'the WSGI handler in process; the throttle store is a temporary file.'
+    )
+
+    # As in benchmark_async_views, close_old_connections() is called after
+    # every request because the test client does not.
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Read requests per run')
+        parser.add_argument('--readers', type=int, default=4, help='Threads sending read requests')
+        parser.add_argument('--flooders', type=int, default=8, help='Threads sending logins')
+        parser.add_argument('--usernames', type=int, default=50, help='Usernames the flood rotates through')
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username=f'benchmark-flood-{time.time_ns()}')
+        token = Token.objects.create(user=user)
+        headers = {'Authorization': f'Token {token.key}'}
+        # Every request is slow or rejected under this load; keep the log out of the table.
+        loggers = [logging.getLogger(name) for name in ('api.performance', 'django.request')]
+        for logger in loggers:
+            logger.disabled = True
+        self.stdout.write(
+            f"{options['requests']} reads on {options['readers']} threads, "
+            f"{options['flooders']} login threads over {options['usernames']} usernames"
+        )
+        self.stdout.write(
+            f"{'run':>14} {'reads/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'logins/s':>9} {'401':>6} {'429':>6}"
+        )
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                throttle = get_auth_throttle_settings()
+                for name, flooders, enabled in (
+                    ('no flood', 0, True),
+                    ('throttle off', options['flooders'], False),
+                    ('throttle on', options['flooders'], True),
+                ):
+                    path = Path(directory) / f'{name.replace(" ", "-")}.sqlite3'
+                    with override_settings(AUTH_THROTTLE={**throttle, 'ENABLED': enabled, 'PATH': path}):
+                        self.report(name, *self.run(headers, flooders, options))
+        finally:
+            for logger in loggers:
+                logger.disabled = False
+            user.delete()
+
+    def run(self, headers, flooders, options):
+        url = reverse('profile-list')
+        login_url = reverse('login')
+        stop = threading.Event()
+        statuses = Counter()
+        lock = threading.Lock()
+
+        def read(_):
+            client = Client()
+            started = time.perf_counter()
+            response = client.get(url, headers=headers)
+            close_old_connections()
+            assert response.status_code == 200, response.content
+            return (time.perf_counter() - started) * 1000
+
+        def flood(worker):
+            client = Client()
+            i = worker
+            while not stop.is_set():
+                response = client.post(login_url, {
+                    'username': f'flood-{i % options["usernames"]}',
+                    'password': 'wrong-password',
+                }, content_type='application/json')
+                close_old_connections()
+                with lock:
+                    statuses[response.status_code] += 1
+                i += flooders
+
+        with ThreadPoolExecutor(max_workers=flooders or 1) as flood_pool:
+            for worker in range(flooders):
+                flood_pool.submit(flood, worker)
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['readers']) as read_pool:
+                samples = list(read_pool.map(read, range(options['requests'])))
+            elapsed = time.perf_counter() - started
+            stop.set()
+        return samples, elapsed, statuses
+
+    def report(self, name, samples, elapsed, statuses):
+        self.stdout.write(
+            f'{name:>14} {len(samples) / elapsed:>8.0f} {statistics.median(samples):>8.2f} '
+            f'{statistics.quantiles(samples, n=100)[-1]:>8.2f} {sum(statuses.values()) / elapsed:>9.0f} '
+            f'{statuses[401]:>6} {statuses[429]:>6}'
+        )
@@ -0,0 +1,106 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from api.models import Profile
+from api.search import index_profiles, search_profile_ids
+
+
+FIRST_NAMES = (
+    'Ahmet', 'Mehmet', 'Ayşe', 'Fatma', 'Emre', 'Elif', 'Burak', 'Zeynep', 'Can', 'Deniz',
+    'Ece', 'Murat', 'Selin', 'Oğuz', 'Gökhan', 'İrem', 'Kerem', 'Leyla', 'Onur', 'Şule',
+)
+LAST_NAMES = (
+    'Yılmaz', 'Kaya', 'Demir', 'Şahin', 'Çelik', 'Yıldız', 'Yıldırım', 'Öztürk', 'Aydın', 'Özdemir',
+    'Arslan', 'Doğan', 'Kılıç', 'Aslan', 'Çetin', 'Kara', 'Koç', 'Kurt', 'Özkan', 'Şimşek',
+)
+
+CHUNK_SIZE = 10000
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure profile search latency on the FTS5 index against a LIKE scan. '
+        'Profiles are seeded inside a transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=100000, help='Profiles to seed (e.g. 1000000)')
+        parser.add_argument('--repeat', type=int, default=50, help='Queries per query kind')
+        parser.add_argument('--skip-like', action='store_true', help='Do not time the LIKE baseline')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(options['profiles'])
+                self.run(options['profiles'], options['repeat'], options['skip_like'])
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def seed(self, count):
+        # Includes indexing, as the importer does it after each bulk_create.
+        rng = random.Random(0)
+        started = time.perf_counter()
+        for offset in range(0, count, CHUNK_SIZE):
+            users = User.objects.bulk_create([
+                User(
+                    username=f'user{i}', email=f'user{i}@example.com', password='!',
+                    first_name=rng.choice(FIRST_NAMES), last_name=rng.choice(LAST_NAMES),
+                )
+                for i in range(offset, min(offset + CHUNK_SIZE, count))
+            ])
+            profiles = Profile.objects.bulk_create([
+                Profile(user=user, phone_number=f'5{rng.randint(0, 10 ** 9 - 1):09d}') for user in users
+            ])
+            index_profiles([profile.pk for profile in profiles])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'seeded {count} profiles in {elapsed:.1f}s ({count / elapsed:.0f} rows/s, indexed)')
+
+    def queries(self, count, repeat):
+        rng = random.Random(1)
+        return {
+            'first name': [rng.choice(FIRST_NAMES) for _ in range(repeat)],
+            'name prefix': [rng.choice(LAST_NAMES)[:3] for _ in range(repeat)],
+            'full name': [f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}' for _ in range(repeat)],
+            'username': [f'user{rng.randrange(count)}' for _ in range(repeat)],
+            'phone prefix': [f'5{rng.randint(0, 999):03d}' for _ in range(repeat)],
+        }
+
+    def like_ids(self, text, limit):
+        condition = Q()
+        for term in text.split():
+            condition &= (
+                Q(user__username__icontains=term) | Q(user__email__icontains=term)
+                | Q(user__first_name__icontains=term) | Q(user__last_name__icontains=term)
+                | Q(phone_number__icontains=term)
+            )
+        return list(Profile.objects.filter(condition).values_list('id', flat=True)[:limit])
+
+    def time(self, func, texts):
+        samples = []
+        for text in texts:
+            started = time.perf_counter()
+            func(text)
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+    def run(self, count, repeat, skip_like):
+        self.stdout.write(f"{'query':>14} {'fts p50 ms':>11} {'fts p95 ms':>11} {'like p50 ms':>12} {'like p95 ms':>12}")
+        for name, texts in self.queries(count, repeat).items():
+            fts = self.time(lambda text: search_profile_ids(text, 20), texts)
+            like = ('-', '-') if skip_like else self.time(lambda text: self.like_ids(text, 20), texts)
+            self.stdout.write(
+                f'{name:>14} {fts[0]:>11.2f} {fts[1]:>11.2f} '
+                + ' '.join(f'{value:>12.2f}' if value != '-' else f'{value:>12}' for value in like)
+            )
@@ -0,0 +1,90 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+
+from api.models import Profile, UserType, UserRole
+from api.readers import ProfileValuesReader
+from api.rolemasks import refresh_role_masks
+from api.serializers import ProfileSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare ProfileSerializer with the .values() fast path (ProfileValuesReader) '
+        'for profile list pages. Missing rows are seeded inside a transaction that is '
+        'rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--roles-per-profile', type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.seed(max(options['sizes']), options['roles_per_profile'])
+                self.run(options['sizes'], options['repeat'])
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def seed(self, count, roles_per_profile):
+        missing = count - Profile.objects.count()
+        if missing <= 0:
+            return
+        user_type = UserType.objects.create(name='benchmark', description='benchmark type')
+        # create() rather than bulk_create() so the reference caches are bumped.
+        roles = [
+            UserRole.objects.create(name=f'benchmark-{i}', description='benchmark role')
+            for i in range(roles_per_profile)
+        ]
+        users = User.objects.bulk_create([
+            User(username=f'benchmark-{i}', email=f'benchmark-{i}@example.com',
+                 first_name='Bench', last_name=str(i), password='!')
+            for i in range(missing)
+        ])
+        profiles = Profile.objects.bulk_create([
+            Profile(user=user, user_type=user_type, phone_number=f'555{i:07d}')
+            for i, user in enumerate(users)
+        ])
+        Through = Profile.user_roles.through
+        Through.objects.bulk_create([
+            Through(profile_id=profile.pk, userrole_id=role.pk) for profile in profiles for role in roles
+        ])
+        refresh_role_masks([profile.pk for profile in profiles])
+
+    def time(self, func, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            samples.append(time.perf_counter() - started)
+        return statistics.median(samples) * 1000, result
+
+    def run(self, sizes, repeat):
+        renderer = JSONRenderer()
+        self.stdout.write(f"{'page size':>10} {'serializer ms':>14} {'values ms':>10} {'speedup':>8}  identical")
+        for size in sizes:
+            def serializer_page():
+                queryset = ProfileSerializer.setup_eager_loading(Profile.objects.order_by('created_at', 'id'))
+                return renderer.render(ProfileSerializer(queryset[:size], many=True).data)
+
+            def values_page():
+                reader = ProfileValuesReader()
+                rows = reader.get_queryset().order_by('created_at', 'id')[:size]
+                return renderer.render(reader.serialize(rows))
+
+            slow_ms, slow = self.time(serializer_page, repeat)
+            fast_ms, fast = self.time(values_page, repeat)
+            if slow != fast:
+                raise CommandError(f'Outputs differ at page size {size}')
+            self.stdout.write(f'{size:>10} {slow_ms:>14.2f} {fast_ms:>10.2f} {slow_ms / fast_ms:>7.1f}x  yes')
@@ -0,0 +1,139 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import BigIntegerField, Count, ExpressionWrapper, F
+
+from api.filters import ProfileFilter
+from api.models import Profile, UserRole
+from api.readers import ProfileValuesReader
+from api.rolemasks import build_mask, refresh_role_masks
+
+
+CHUNK_SIZE = 10000
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare role filtering on the Profile.role_mask bitmask with the '
+        'through-table join and subquery, and with what ProfileFilter runs '
+        '(through-table search, mask as a residual check). Profiles are seeded '
+        'inside a transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', type=int, default=100000)
+        parser.add_argument('--roles', type=int, default=30)
+        parser.add_argument('--roles-per-profile', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=20, help='Runs per query')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                roles = self.seed(options['profiles'], options['roles'], options['roles_per_profile'])
+                self.run(roles, options['repeat'])
+                raise Rollback()
+        except Rollback:
+            pass
+
+    def seed(self, count, role_count, per_profile):
+        rng = random.Random(0)
+        roles = [
+            UserRole.objects.create(name=f'benchmark-{i}', description='benchmark role')
+            for i in range(role_count)
+        ]
+        Through = Profile.user_roles.through
+        started = time.perf_counter()
+        for offset in range(0, count, CHUNK_SIZE):
+            users = User.objects.bulk_create([
+                User(username=f'role-benchmark-{i}', password='!')
+                for i in range(offset, min(offset + CHUNK_SIZE, count))
+            ])
+            profiles = Profile.objects.bulk_create([Profile(user=user) for user in users])
+            Through.objects.bulk_create([
+                Through(profile_id=profile.pk, userrole_id=role.pk)
+                for profile in profiles
+                for role in rng.sample(roles, per_profile)
+            ])
+            refresh_role_masks([profile.pk for profile in profiles])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f'seeded {count} profiles with {per_profile} of {role_count} roles in {elapsed:.1f}s')
+        return [role.pk for role in roles]
+
+    def filtered(self, params):
+        filterset = ProfileFilter(params, queryset=Profile.objects.order_by('created_at', 'id'))
+        assert filterset.is_valid(), filterset.errors
+        return filterset.qs
+
+    def queries(self, role_ids):
+        one, two = role_ids[0], role_ids[1]
+        ordered = Profile.objects.order_by('created_at', 'id')
+        Through = Profile.user_roles.through
+        holders = lambda role_id: Through.objects.filter(userrole_id=role_id).values('profile_id')
+        both = ordered.filter(user_roles__in=[one, two]).annotate(
+            matched=Count('user_roles', distinct=True)
+        ).filter(matched=2)
+        reader = ProfileValuesReader(fields=['id', 'user_roles'], expand=[])
+        page = list(reader.get_queryset().order_by('created_at', 'id')[:100])
+        masked = lambda role_ids: ordered.alias(
+            match=ExpressionWrapper(F('role_mask').bitand(build_mask(role_ids)), output_field=BigIntegerField())
+        )
+        return [
+            ('has role, count', {
+                'filter': lambda: self.filtered({'user_roles': str(one)}).count(),
+                'mask': lambda: masked([one]).filter(match__gt=0).count(),
+                'subquery': lambda: ordered.filter(id__in=holders(one)).count(),
+                'join': lambda: ordered.filter(user_roles=one).distinct().count(),
+            }),
+            ('any of 2, page', {
+                'filter': lambda: list(
+                    self.filtered({'user_roles': f'{one},{two}'}).values_list('id', flat=True)[:20]
+                ),
+                'mask': lambda: list(masked([one, two]).filter(match__gt=0).values_list('id', flat=True)[:20]),
+                'subquery': lambda: list(
+                    ordered.filter(id__in=Through.objects.filter(userrole_id__in=[one, two]).values('profile_id'))
+                    .values_list('id', flat=True)[:20]
+                ),
+                'join': lambda: list(
+                    ordered.filter(user_roles__in=[one, two]).distinct().values_list('id', flat=True)[:20]
+                ),
+            }),
+            ('all of 2, count', {
+                'filter': lambda: self.filtered({'user_roles_all': f'{one},{two}'}).count(),
+                'mask': lambda: masked([one, two]).filter(match=build_mask([one, two])).count(),
+                'subquery': lambda: ordered.filter(id__in=holders(one)).filter(id__in=holders(two)).count(),
+                'join': lambda: both.count(),
+            }),
+            ('role ids, 100 rows', {
+                'mask': lambda: reader.get_role_ids(page),
+                'subquery': lambda: reader.group_role_ids(
+                    [], reader.role_links([row['id'] for row in page])
+                ),
+                'join': lambda: list(
+                    Profile.objects.filter(id__in=[row['id'] for row in page]).values_list('id', 'user_roles')
+                ),
+            }),
+        ]
+
+    def time(self, func, repeat):
+        func()
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        return statistics.median(samples)
+
+    def run(self, role_ids, repeat):
+        columns = ('filter', 'mask', 'subquery', 'join')
+        self.stdout.write(f"{'query':>20}" + ''.join(f' {f"{column} ms":>12}' for column in columns))
+        for name, variants in self.queries(role_ids):
+            timings = {variant: f'{self.time(func, repeat):.2f}' for variant, func in variants.items()}
+            self.stdout.write(f'{name:>20}' + ''.join(f' {timings.get(column, "-"):>12}' for column in columns))
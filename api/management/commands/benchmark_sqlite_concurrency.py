@@ -0,0 +1,134 @@
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+SCHEMA = """
+CREATE TABLE profile (
+    id INTEGER PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    phone_number TEXT,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+def connect(path, profile):
+    connection = sqlite3.connect(path, isolation_level=None)
+    if profile['pragmas']:
+        for name, value in profile['pragmas'].items():
+            connection.execute(f'PRAGMA {name} = {value}')
+    return connection
+
+
+def worker(path, profile, rows, duration, write_ratio, seed, results):
+    """
+    Mixes page reads with read-then-write transactions (the shape of
+    ProfileFormSerializer) until the deadline and reports its counters.
+    """
+    rng = random.Random(seed)
+    connection = connect(path, profile)
+    counts = {'reads': 0, 'writes': 0, 'locked': 0}
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = rng.randint(1, rows)
+        try:
+            if rng.random() < write_ratio:
+                connection.execute(f"BEGIN {profile['begin']}")
+                try:
+                    connection.execute('SELECT id, phone_number FROM profile WHERE id = ?', (start,)).fetchone()
+                    connection.execute(
+                        'UPDATE profile SET phone_number = ?, updated_at = ? WHERE id = ?',
+                        (str(rng.randint(0, 10 ** 9)), time.time(), start),
+                    )
+                    connection.execute('COMMIT')
+                except sqlite3.OperationalError:
+                    connection.execute('ROLLBACK')
+                    raise
+                counts['writes'] += 1
+            else:
+                connection.execute(
+                    'SELECT id, username, phone_number FROM profile WHERE id >= ? ORDER BY id LIMIT 10', (start,)
+                ).fetchall()
+                counts['reads'] += 1
+        except sqlite3.OperationalError as exc:
+            if 'locked' not in str(exc) and 'busy' not in str(exc):
+                raise
+            counts['locked'] += 1
+    connection.close()
+    results.put(counts)
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure SQLite read/write throughput with several worker processes, '
+        'comparing default settings with SQLITE_PRAGMAS and BEGIN IMMEDIATE.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--duration', type=float, default=5.0, help='Seconds per profile')
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument('--rows', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        transaction_mode = settings.DATABASES['default'].get('OPTIONS', {}).get('transaction_mode', 'DEFERRED')
+        profiles = {
+            'default': {'pragmas': {}, 'begin': 'DEFERRED'},
+            'tuned': {
+                'pragmas': {**getattr(settings, 'SQLITE_DATABASE_PRAGMAS', {}), **getattr(settings, 'SQLITE_PRAGMAS', {})},
+                'begin': transaction_mode,
+            },
+        }
+
+        self.stdout.write(
+            f"{options['workers']} workers, {options['duration']}s, "
+            f"{options['write_ratio']:.0%} writes, {options['rows']} rows"
+        )
+        self.stdout.write(f"{'profile':>8} {'reads/s':>10} {'writes/s':>10} {'locked':>8}")
+        for name, profile in profiles.items():
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'benchmark.sqlite3')
+                self.create_database(path, profile, options['rows'])
+                totals = self.run(path, profile, options)
+            duration = options['duration']
+            self.stdout.write(
+                f"{name:>8} {totals['reads'] / duration:>10.0f} "
+                f"{totals['writes'] / duration:>10.0f} {totals['locked']:>8}"
+            )
+
+    def create_database(self, path, profile, rows):
+        connection = connect(path, profile)
+        connection.execute(SCHEMA)
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO profile (id, username, phone_number, updated_at) VALUES (?, ?, ?, ?)',
+            ((i, f'user-{i}', '5550000000', time.time()) for i in range(1, rows + 1)),
+        )
+        connection.execute('COMMIT')
+        connection.close()
+
+    def run(self, path, profile, options):
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        processes = [
+            context.Process(target=worker, args=(
+                path, profile, options['rows'], options['duration'], options['write_ratio'], seed, results,
+            ))
+            for seed in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        totals = {'reads': 0, 'writes': 0, 'locked': 0}
+        for _ in processes:
+            for key, value in results.get().items():
+                totals[key] += value
+        for process in processes:
+            process.join()
+        return totals
@@ -0,0 +1,81 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.authentication import CachedTokenAuthentication, SignedTokenAuthentication
+from api.signed_tokens import get_signed_tokens_settings, issue_tokens
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare the per-request cost of DRF TokenAuthentication, the cached '
+        'authtoken lookup and HMAC-signed Bearer tokens: authenticate() alone, '
+        'then a GET of /api/user-types/ through the WSGI handler in process.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=2000, help='authenticate() calls per scheme')
+        parser.add_argument('--requests', type=int, default=300, help='GET requests per scheme')
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username=f'benchmark-auth-{time.time_ns()}')
+        token = Token.objects.create(user=user)
+        try:
+            with override_settings(SIGNED_TOKENS={**get_signed_tokens_settings(), 'ENABLED': True}):
+                signed = issue_tokens(user)['token']
+                schemes = (
+                    ('authtoken', TokenAuthentication(), f'Token {token.key}'),
+                    ('cached', CachedTokenAuthentication(), f'Token {token.key}'),
+                    ('signed', SignedTokenAuthentication(), f'Bearer {signed}'),
+                )
+                self.stdout.write(f"{'scheme':>10} {'auth us':>8} {'queries':>8} {'GET p50 ms':>11} {'GET p99 ms':>11}")
+                for name, authenticator, header in schemes:
+                    auth_us, queries = self.time_authenticate(authenticator, header, options['repeat'])
+                    line = f'{name:>10} {auth_us:>8.1f} {queries:>8}'
+                    # The views authenticate with DEFAULT_AUTHENTICATION_CLASSES, so
+                    # plain TokenAuthentication has no end-to-end run.
+                    if name == 'authtoken':
+                        self.stdout.write(f"{line} {'-':>11} {'-':>11}")
+                        continue
+                    samples = self.time_requests(header, options['requests'])
+                    self.stdout.write(
+                        f'{line} {statistics.median(samples):>11.3f} '
+                        f'{statistics.quantiles(samples, n=100)[-1]:>11.3f}'
+                    )
+        finally:
+            user.delete()
+
+    def time_authenticate(self, authenticator, header, repeat):
+        request = Request(APIRequestFactory().get('/', HTTP_AUTHORIZATION=header))
+        # Warm the caches; the queries of one more call are what every request pays.
+        authenticator.authenticate(request)
+        with CaptureQueriesContext(connection) as queries:
+            authenticator.authenticate(request)
+        started = time.perf_counter()
+        for _ in range(repeat):
+            authenticator.authenticate(request)
+        elapsed = time.perf_counter() - started
+        return elapsed / repeat * 1e6, len(queries)
+
+    def time_requests(self, header, count):
+        client = Client()
+        url = reverse('user-type-list')
+        headers = {'Authorization': header}
+        assert client.get(url, headers=headers).status_code == 200
+        samples = []
+        for _ in range(count):
+            started = time.perf_counter()
+            response = client.get(url, headers=headers)
+            samples.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 200, response.content
+        return samples
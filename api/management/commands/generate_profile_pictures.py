@@ -0,0 +1,44 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from api.images import generate_derivatives
+from api.models import Profile
+
+
+def _generate(args):
+    name, force = args
+    try:
+        return name, generate_derivatives(name, force=force), None
+    except Exception as exc:
+        return name, 0, exc
+
+
+class Command(BaseCommand):
+    help = 'Generate missing or stale profile picture derivatives (thumbnails, WebP)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Regenerate derivatives that are up to date')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+
+    def handle(self, *args, **options):
+        names = (
+            Profile.objects.exclude(profile_picture='')
+            .exclude(profile_picture__isnull=True)
+            .values_list('profile_picture', flat=True)
+            .distinct()
+        )
+        jobs = [(name, options['force']) for name in names]
+
+        written = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            for name, count, error in executor.map(_generate, jobs, chunksize=8):
+                if error is not None:
+                    failed += 1
+                    self.stderr.write(f'{name}: {error}')
+                written += count
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(jobs)} pictures checked, {written} derivatives written, {failed} failed'
+        ))
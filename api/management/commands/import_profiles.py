@@ -0,0 +1,30 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.importers import IMPORT_FORMATS, guess_format, import_profiles
+
+
+class Command(BaseCommand):
+    help = 'Bulk import users and profiles from an NDJSON or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='NDJSON or CSV file to import')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='Defaults to the file extension')
+        parser.add_argument('--chunk-size', type=int, help='Rows per transaction')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or guess_format(path)
+        try:
+            with open(path, encoding='utf-8-sig', newline='') as file:
+                report = import_profiles(file, file_format, chunk_size=options['chunk_size'])
+        except OSError as exc:
+            raise CommandError(exc)
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {json.dumps(error['errors'], ensure_ascii=False)}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['created']} profiles created, {report['failed']} rows failed "
+            f"in {report['elapsed_seconds']}s ({report['rows_per_second']} rows/s)"
+        ))
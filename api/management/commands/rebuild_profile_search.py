@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the FTS5 profile search index from the profile and user tables.'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = rebuild_search_index()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} profiles in {elapsed:.2f}s'))
@@ -0,0 +1,243 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+
+from api.compression import (
+    COMPRESSORS, acompress_stream, choose_encoding, compress, compress_stream,
+    get_response_compression_settings, is_compressible,
+)
+from api.timing import (
+    current_serialization_timing, instrument_serializers, start_serialization_timing, stop_serialization_timing,
+)
+
+
+logger = logging.getLogger('api.performance')
+
+SQL_INSTRUMENTATION_DEFAULTS = {
+    'ENABLED': False,
+    'SERVER_TIMING': True,
+    # Requests slower than this are written to the api.performance log.
+    'SLOW_REQUEST_MS': 500,
+    # The same SQL running this many times in one request is reported as N+1.
+    'N_PLUS_ONE_THRESHOLD': 5,
+}
+
+
+def get_sql_instrumentation_settings():
+    return {**SQL_INSTRUMENTATION_DEFAULTS, **getattr(settings, 'SQL_INSTRUMENTATION', {})}
+
+
+class QueryRecorder:
+    """execute_wrapper that counts and times every query of a request."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.duration += duration
+            self.count += 1
+            self.statements[sql] += 1
+            timing = current_serialization_timing()
+            if timing is not None and timing.active:
+                timing.db_duration += duration
+
+    def repeated(self, threshold):
+        return [(sql, count) for sql, count in self.statements.most_common() if count >= threshold]
+
+
+class QueryInstrumentationMiddleware:
+    """
+    Adds a Server-Timing header (db, serialize, render, app, total) to every
+    response, reports SQL statements repeated within one request as possible
+    N+1 patterns, and logs requests slower than SLOW_REQUEST_MS. Works in
+    both sync and async chains, so async views are not pushed onto a thread.
+
+    serialize is the time in Serializer.data and the other code wrapped in
+    api.timing.serializing(), less the queries run meanwhile (those count as
+    db); render is the response renderer turning the data into bytes.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.config = get_sql_instrumentation_settings()
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed()
+        instrument_serializers()
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        request._render_timing = {'started': None, 'duration': 0.0}
+        timing, token = start_serialization_timing()
+        started = time.perf_counter()
+        try:
+            with self.instrument(recorder):
+                response = self.get_response(request)
+        finally:
+            stop_serialization_timing(token)
+        total = time.perf_counter() - started
+
+        self.report(request, response, recorder, timing, total)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        request._render_timing = {'started': None, 'duration': 0.0}
+        timing, token = start_serialization_timing()
+        started = time.perf_counter()
+        # Connections are thread-local and the async ORM runs its queries on
+        # the request's sync thread, so the wrappers are installed there.
+        stack = await sync_to_async(self.instrument)(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            stop_serialization_timing(token)
+        total = time.perf_counter() - started
+
+        self.report(request, response, recorder, timing, total)
+        return response
+
+    def instrument(self, recorder):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(recorder))
+        return stack
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns; time it.
+        timing = request._render_timing
+        timing['started'] = time.perf_counter()
+
+        def finished(rendered):
+            timing['duration'] = time.perf_counter() - timing['started']
+
+        response.add_post_render_callback(finished)
+        return response
+
+    def report(self, request, response, recorder, timing, total):
+        db_ms = recorder.duration * 1000
+        serialize_ms = max(timing.duration - timing.db_duration, 0.0) * 1000
+        render_ms = request._render_timing['duration'] * 1000
+        total_ms = total * 1000
+        app_ms = max(total_ms - db_ms - serialize_ms - render_ms, 0.0)
+
+        if self.config['SERVER_TIMING']:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={db_ms:.2f};desc="{recorder.count} queries"',
+                f'serialize;dur={serialize_ms:.2f}',
+                f'render;dur={render_ms:.2f}',
+                f'app;dur={app_ms:.2f}',
+                f'total;dur={total_ms:.2f}',
+            ])
+
+        match = request.resolver_match
+        entry = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'db_ms': round(db_ms, 2),
+            'serialize_ms': round(serialize_ms, 2),
+            'render_ms': round(render_ms, 2),
+            'queries': recorder.count,
+        }
+
+        repeated = recorder.repeated(self.config['N_PLUS_ONE_THRESHOLD'])
+        if repeated:
+            logger.warning('possible N+1 %s', json.dumps({
+                **entry,
+                'repeated': [{'sql': sql, 'count': count} for sql, count in repeated],
+            }))
+        if total_ms >= self.config['SLOW_REQUEST_MS']:
+            logger.warning('slow request %s', json.dumps(entry))
+
+
+class CompressionMiddleware:
+    """
+    Compresses responses with the best coding the client accepts (zstd, br
+    or gzip, as installed and configured in RESPONSE_COMPRESSION). Responses
+    below MIN_SIZE, outside the CONTENT_TYPES allowlist or already encoded
+    (the stored OpenAPI schema) are left alone. Streaming responses are
+    compressed chunk by chunk as they are sent, never buffered.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.config = get_response_compression_settings()
+        if not self.config['ENABLED']:
+            raise MiddlewareNotUsed()
+        self.encodings = [name for name in self.config['ENCODINGS'] if name in COMPRESSORS]
+        self.content_types = frozenset(self.config['CONTENT_TYPES'])
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.compress(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.compress(request, await self.get_response(request))
+
+    def compress(self, request, response):
+        if response.has_header('Content-Encoding') or not is_compressible(
+            response.get('Content-Type'), self.content_types
+        ):
+            return response
+        # The body depends on Accept-Encoding even when this one is sent as is.
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if not response.streaming and len(response.content) < self.config['MIN_SIZE']:
+            return response
+        if 'no-transform' in response.get('Cache-Control', ''):
+            return response
+        encoding = choose_encoding(request.headers.get('Accept-Encoding'), self.encodings)
+        if encoding is None:
+            return response
+        level = self.config['LEVELS'][encoding]
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = acompress_stream(encoding, response.streaming_content, level)
+            else:
+                response.streaming_content = compress_stream(encoding, response.streaming_content, level)
+            del response.headers['Content-Length']
+        else:
+            compressed = compress(encoding, response.content, level)
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers['Content-Length'] = str(len(compressed))
+
+        # The encoded body is no longer byte-identical to the one a strong
+        # ETag was computed for.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0004_profile_created_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['updated_at', 'id'], name='profile_updated_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['phone_number'], name='profile_phone_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['user_type', 'created_at', 'id'], name='profile_type_created_idx'),
+        ),
+        # auth_user.email is not indexed by django.contrib.auth; the profile
+        # list filters on it.
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS api_user_email_idx ON auth_user (email)',
+            'DROP INDEX IF EXISTS api_user_email_idx',
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import migrations
+
+
+# FTS5 index over the searchable user/profile columns; rowid is the profile id.
+# It is kept in sync from api/signals.py rather than with triggers, because
+# SQLite table rebuilds in later migrations would drop or break triggers.
+FORWARD_SQL = [
+    """
+    CREATE VIRTUAL TABLE api_profile_search USING fts5(
+        username, email, first_name, last_name, phone_number,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    """
+    INSERT INTO api_profile_search (rowid, username, email, first_name, last_name, phone_number)
+    SELECT p.id, u.username, u.email, u.first_name, u.last_name, p.phone_number
+    FROM api_profile p JOIN auth_user u ON u.id = p.user_id
+    """,
+]
+
+REVERSE_SQL = [
+    'DROP TABLE IF EXISTS api_profile_search',
+]
+
+
+def run_sqlite(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_profile_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(run_sqlite(FORWARD_SQL), run_sqlite(REVERSE_SQL)),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+# Same statement as api.rolemasks.REFRESH_SQL (role ids 1-62 map to bits 0-61,
+# bit 62 flags profiles holding a higher role id), inlined so the migration
+# does not change if that module does.
+BACKFILL_SQL = """
+UPDATE api_profile SET role_mask = COALESCE((
+    SELECT SUM(CASE WHEN r.userrole_id <= 62 THEN 1 << (r.userrole_id - 1) ELSE 0 END)
+         | CASE WHEN MAX(r.userrole_id) > 62 THEN 4611686018427387904 ELSE 0 END
+    FROM api_profile_user_roles r WHERE r.profile_id = api_profile.id
+), 0)
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_profile_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='role_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunSQL(BACKFILL_SQL, migrations.RunSQL.noop),
+    ]
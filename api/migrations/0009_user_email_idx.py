@@ -0,0 +1,22 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Recreates api_user_email_idx from 0005. That migration only depends on
+    auth's first migration, so on a fresh database auth's later migrations
+    can run after it; on SQLite they rebuild auth_user and drop indexes they
+    do not know about.
+    """
+
+    dependencies = [
+        ('api', '0008_token_revocation'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            'CREATE INDEX IF NOT EXISTS api_user_email_idx ON auth_user (email)',
+            migrations.RunSQL.noop,
+        ),
+    ]
@@ -40,13 +40,38 @@ class Profile(BaseModel):
     profile_picture = models.ImageField(upload_to='profile_pictures/', blank=True, null=True)
     user_type = models.ForeignKey(UserType, on_delete=models.SET_NULL, null=True)
     user_roles = models.ManyToManyField(UserRole)
+    # Bitmask of user_roles maintained by api.signals; see api/rolemasks.py.
+    role_mask = models.BigIntegerField(default=0, editable=False)
 
     class Meta:
         app_label = 'api'
         verbose_name = 'Kullanıcı Profili'
         verbose_name_plural = 'Kullanıcı Profilleri'
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='profile_created_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='profile_updated_id_idx'),
+            models.Index(fields=['phone_number'], name='profile_phone_idx'),
+            models.Index(fields=['user_type', 'created_at', 'id'], name='profile_type_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.get_full_name()}"
     
     
+
+
+class TokenRevocation(models.Model):
+    """
+    Signed access/refresh tokens of user_id carrying a version below
+    min_version are rejected (api/signed_tokens.py). Not a foreign key, so
+    the row outlives a deleted user; such rows are pruned once every token
+    they could reject has expired. Rows of existing users are kept.
+    """
+    user_id = models.BigIntegerField(primary_key=True)
+    min_version = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        app_label = 'api'
+        verbose_name = 'Token İptali'
+        verbose_name_plural = 'Token İptalleri'
@@ -0,0 +1,100 @@
+import math
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+PAGINATION_QUERY_PARAM = 'pagination'
+CURSOR_MODE = 'cursor'
+
+
+class ProfilePageNumberPagination(PageNumberPagination):
+    page_size = getattr(settings, 'PROFILE_PAGE_SIZE', 10)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'PROFILE_MAX_PAGE_SIZE', 100)
+
+
+class ProfileCursorPagination(CursorPagination):
+    # Keyset pagination: no COUNT(*) and no OFFSET scan, so latency stays
+    # flat however deep the client pages. Backed by the (created_at, id) index.
+    page_size = getattr(settings, 'PROFILE_PAGE_SIZE', 10)
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'PROFILE_MAX_PAGE_SIZE', 100)
+    ordering = ('created_at', 'id')
+
+
+class AsyncProfilePageNumberPagination(ProfilePageNumberPagination):
+    """
+    Page number pagination for async views: acount() plus an async slice,
+    with the same query parameters and response shape as the sync paginator.
+    """
+
+    async def apaginate_queryset(self, queryset, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        self.count = await queryset.acount()
+        num_pages = max(1, math.ceil(self.count / page_size))
+
+        page_number = request.query_params.get(self.page_query_param) or 1
+        if page_number in self.last_page_strings:
+            page_number = num_pages
+        try:
+            page_number = int(page_number)
+            if not 1 <= page_number <= num_pages:
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message='Invalid page.'))
+
+        self.page_number = page_number
+        self.num_pages = num_pages
+        offset = (page_number - 1) * page_size
+        return [row async for row in queryset[offset:offset + page_size]]
+
+    def get_next_link(self):
+        if self.page_number >= self.num_pages:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_data(self, data):
+        return {
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+
+class AsyncProfileCursorPagination(ProfileCursorPagination):
+    # The cursor logic is DRF's; its queries run in the sync thread.
+
+    async def apaginate_queryset(self, queryset, request):
+        return await sync_to_async(self.paginate_queryset)(queryset, request)
+
+    def get_paginated_data(self, data):
+        return self.get_paginated_response(data).data
+
+
+def get_profile_paginator(request):
+    mode = request.query_params.get(PAGINATION_QUERY_PARAM)
+    if mode is None:
+        mode = getattr(settings, 'PROFILE_PAGINATION_MODE', 'page')
+    if mode == CURSOR_MODE:
+        return ProfileCursorPagination()
+    return ProfilePageNumberPagination()
+
+
+def get_async_profile_paginator(request):
+    if isinstance(get_profile_paginator(request), ProfileCursorPagination):
+        return AsyncProfileCursorPagination()
+    return AsyncProfilePageNumberPagination()
@@ -0,0 +1,146 @@
+from collections import defaultdict
+
+from rest_framework import serializers
+
+from api.cache import user_type_cache, user_role_cache
+from api.images import derivative_urls
+from api.models import Profile
+from api.rolemasks import OVERFLOW_BIT, mask_role_ids
+from api.serializers import ProfileSerializer, UserTypeSerializer, UserRoleSerializer
+from api.timing import serializing
+
+
+PROFILE_COLUMNS = (
+    'id', 'created_at', 'updated_at', 'phone_number', 'profile_picture', 'user_id', 'user_type_id',
+    'role_mask',
+)
+USER_COLUMNS = ('user__username', 'user__email', 'user__first_name', 'user__last_name')
+
+
+class ProfileValuesReader:
+    """
+    Read-only fast path for profile lists. Rows come from .values() instead of
+    model instances, role ids are decoded from role_mask (with one through-table
+    query only for rows holding a role id above the mask range), and user
+    types/roles are rendered from the reference caches. The output matches
+    ProfileSerializer field for field, including ?fields= and ?expand=.
+    """
+
+    def __init__(self, fields=None, expand=None, context=None):
+        self.wanted = set(ProfileSerializer.READABLE_FIELDS if fields is None else fields)
+        self.expanded = set(ProfileSerializer.EXPANDABLE_FIELDS if expand is None else expand)
+        self.output_fields = [name for name in ProfileSerializer.READABLE_FIELDS if name in self.wanted]
+        self.context = context or {}
+        self.datetime_field = serializers.DateTimeField()
+        self.storage = Profile._meta.get_field('profile_picture').storage
+
+    def get_queryset(self):
+        columns = PROFILE_COLUMNS
+        if self.expands('user'):
+            columns += USER_COLUMNS
+        return Profile.objects.values(*columns)
+
+    def picture_url(self, name):
+        if not name:
+            return None
+        url = self.storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def overflow_ids(self, rows):
+        return [row['id'] for row in rows if row['role_mask'] & OVERFLOW_BIT]
+
+    def role_links(self, profile_ids):
+        return (
+            Profile.user_roles.through.objects
+            .filter(profile_id__in=profile_ids)
+            .order_by('profile_id', 'userrole_id')
+            .values_list('profile_id', 'userrole_id')
+        )
+
+    def group_role_ids(self, rows, links):
+        role_ids = {row['id']: mask_role_ids(row['role_mask']) for row in rows}
+        overflow = defaultdict(list)
+        for profile_id, role_id in links:
+            overflow[profile_id].append(role_id)
+        role_ids.update(overflow)
+        return role_ids
+
+    def get_role_ids(self, rows):
+        if 'user_roles' not in self.wanted:
+            return {}
+        overflow_ids = self.overflow_ids(rows)
+        return self.group_role_ids(rows, self.role_links(overflow_ids) if overflow_ids else [])
+
+    def expands(self, name):
+        return name in self.wanted and name in self.expanded
+
+    def render_references(self, user_types, roles):
+        """Maps id -> nested representation for the expanded reference fields."""
+        if user_types is not None:
+            user_types = {item['id']: item for item in UserTypeSerializer(user_types, many=True).data}
+        if roles is not None:
+            roles = {item['id']: item for item in UserRoleSerializer(roles, many=True).data}
+        return user_types, roles
+
+    def serialize(self, rows):
+        with serializing():
+            rows = list(rows)
+            user_types, roles = self.render_references(
+                user_type_cache.all() if self.expands('user_type') else None,
+                user_role_cache.all() if self.expands('user_roles') else None,
+            )
+            return self.render(rows, self.get_role_ids(rows), user_types, roles)
+
+    async def aserialize(self, rows):
+        """serialize() for async views, given a list of rows."""
+        role_ids = {}
+        if 'user_roles' in self.wanted:
+            overflow_ids = self.overflow_ids(rows)
+            links = [link async for link in self.role_links(overflow_ids)] if overflow_ids else []
+            role_ids = self.group_role_ids(rows, links)
+        user_types, roles = self.render_references(
+            await user_type_cache.aall() if self.expands('user_type') else None,
+            await user_role_cache.aall() if self.expands('user_roles') else None,
+        )
+        with serializing():
+            return self.render(rows, role_ids, user_types, roles)
+
+    def render(self, rows, role_ids, user_types, roles):
+        to_datetime = self.datetime_field.to_representation
+        data = []
+        for row in rows:
+            values = {
+                'id': row['id'],
+                'created_at': to_datetime(row['created_at']),
+                'updated_at': to_datetime(row['updated_at']),
+                'phone_number': row['phone_number'],
+            }
+            if 'profile_picture' in self.wanted:
+                values['profile_picture'] = self.picture_url(row['profile_picture'])
+            if 'profile_picture_derivatives' in self.wanted:
+                values['profile_picture_derivatives'] = derivative_urls(row['profile_picture'])
+            if 'user' in self.wanted:
+                if self.expands('user'):
+                    values['user'] = {
+                        'id': row['user_id'],
+                        'username': row['user__username'],
+                        'email': row['user__email'],
+                        'first_name': row['user__first_name'],
+                        'last_name': row['user__last_name'],
+                    }
+                else:
+                    values['user'] = row['user_id']
+            if 'user_type' in self.wanted:
+                type_id = row['user_type_id']
+                if user_types is None or type_id is None:
+                    values['user_type'] = type_id
+                else:
+                    values['user_type'] = user_types[type_id]
+            if 'user_roles' in self.wanted:
+                ids = role_ids.get(row['id'], [])
+                values['user_roles'] = ids if roles is None else [roles[role_id] for role_id in ids if role_id in roles]
+            data.append({name: values[name] for name in self.output_fields})
+        return data
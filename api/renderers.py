@@ -0,0 +1,91 @@
+import json
+from collections.abc import Mapping
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+
+
+class JSONFragment(Mapping):
+    """
+    An object that is already encoded as JSON. FragmentJSONRenderer copies the
+    bytes into the response as they are; anything else that reads it (tests,
+    the browsable API) sees a read-only dict decoded on first access.
+    """
+
+    __slots__ = ('json', '_data')
+
+    def __init__(self, json_bytes):
+        self.json = json_bytes
+        self._data = None
+
+    @property
+    def data(self):
+        if self._data is None:
+            self._data = json.loads(self.json)
+        return self._data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __iter__(self):
+        return iter(self.data)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return f'JSONFragment({self.json!r})'
+
+
+class FragmentJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that splices JSONFragment values into the output without
+    decoding them. Output is byte-for-byte what JSONRenderer would produce.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or not has_fragments(data):
+            # Pretty-printed output re-indents everything; fragments are
+            # encoded compact, so they go through the regular encoder.
+            return super().render(data, accepted_media_type, renderer_context)
+        return self.encode(data)
+
+    def encode(self, data):
+        if isinstance(data, JSONFragment):
+            return data.json
+        if isinstance(data, dict):
+            key_separator = b':' if self.compact else b': '
+            return b'{' + self.item_separator.join(
+                self.dumps(str(key)) + key_separator + self.encode(value) for key, value in data.items()
+            ) + b'}'
+        if isinstance(data, (list, tuple)):
+            return b'[' + self.item_separator.join(self.encode(item) for item in data) + b']'
+        return self.dumps(data)
+
+    @property
+    def item_separator(self):
+        return (SHORT_SEPARATORS if self.compact else LONG_SEPARATORS)[0].encode()
+
+    def dumps(self, data):
+        ret = json.dumps(
+            data, cls=self.encoder_class, ensure_ascii=self.ensure_ascii, allow_nan=not self.strict,
+            separators=SHORT_SEPARATORS if self.compact else LONG_SEPARATORS,
+        )
+        return ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029').encode()
+
+    def fragment(self, data):
+        """Encodes data once so it can be cached and spliced into later responses."""
+        return JSONFragment(self.dumps(data))
+
+
+def has_fragments(data):
+    if isinstance(data, JSONFragment):
+        return True
+    if isinstance(data, dict):
+        return any(has_fragments(value) for value in data.values())
+    if isinstance(data, (list, tuple)):
+        return any(has_fragments(item) for item in data)
+    return False
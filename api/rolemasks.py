@@ -0,0 +1,89 @@
+from django.db import connection
+from django.utils import timezone
+
+from api.sql import chunked, placeholders
+
+
+# Profile.role_mask holds bit (id - 1) for every role with id <= MASK_ROLE_LIMIT.
+# A profile holding any role above the limit also gets OVERFLOW_BIT, so readers
+# and filters know to look at the through table for that row. Bits stay below
+# the sign bit, so the mask is a non-negative 64-bit integer.
+MASK_ROLE_LIMIT = 62
+OVERFLOW_BIT = 1 << MASK_ROLE_LIMIT
+ROLE_BITS = OVERFLOW_BIT - 1
+
+# Recomputes role_mask from the through table for the profiles matching a
+# WHERE clause. SUM adds distinct bits, so it equals a bitwise OR.
+REFRESH_SQL = f"""
+UPDATE api_profile SET role_mask = COALESCE((
+    SELECT SUM(CASE WHEN r.userrole_id <= {MASK_ROLE_LIMIT} THEN 1 << (r.userrole_id - 1) ELSE 0 END)
+         | CASE WHEN MAX(r.userrole_id) > {MASK_ROLE_LIMIT} THEN {OVERFLOW_BIT} ELSE 0 END
+    FROM api_profile_user_roles r WHERE r.profile_id = api_profile.id
+), 0)
+"""
+
+
+def is_maskable(role_id):
+    return 0 < role_id <= MASK_ROLE_LIMIT
+
+
+def role_bit(role_id):
+    return 1 << (role_id - 1)
+
+
+def build_mask(role_ids):
+    """Returns the mask bits for the maskable ids among role_ids."""
+    mask = 0
+    for role_id in role_ids:
+        if is_maskable(role_id):
+            mask |= role_bit(role_id)
+    return mask
+
+
+def mask_role_ids(mask):
+    """Returns the role ids encoded in mask in ascending order, ignoring OVERFLOW_BIT."""
+    mask &= ROLE_BITS
+    role_ids = []
+    while mask:
+        low = mask & -mask
+        role_ids.append(low.bit_length())
+        mask ^= low
+    return role_ids
+
+
+def refresh_role_masks(profile_ids):
+    """
+    Recomputes role_mask for profiles whose role links changed; used by
+    signals and bulk writers. updated_at moves too, since the roles are part
+    of the profile's cached representation (api/fragments.py).
+    """
+    updated_at = connection.ops.adapt_datetimefield_value(timezone.now())
+    with connection.cursor() as cursor:
+        for batch in chunked(profile_ids):
+            cursor.execute(
+                f'{REFRESH_SQL}, updated_at = %s WHERE id IN ({placeholders(batch)})',
+                [updated_at, *batch],
+            )
+
+
+def forget_role(role_id):
+    """
+    Drops a deleted role from every mask. Deleting a role removes its through
+    rows without sending m2m_changed, so this runs from post_delete.
+    """
+    with connection.cursor() as cursor:
+        if is_maskable(role_id):
+            bit = role_bit(role_id)
+            cursor.execute(
+                'UPDATE api_profile SET role_mask = role_mask & %s WHERE role_mask & %s != 0',
+                [~bit & (OVERFLOW_BIT | ROLE_BITS), bit],
+            )
+        else:
+            cursor.execute(f'{REFRESH_SQL} WHERE role_mask & %s != 0', [OVERFLOW_BIT])
+
+
+def rebuild_role_masks():
+    """Recomputes every profile's role_mask and returns the number of rows updated."""
+    with connection.cursor() as cursor:
+        cursor.execute(REFRESH_SQL)
+        return cursor.rowcount
@@ -0,0 +1,203 @@
+import functools
+import gzip
+import hashlib
+import importlib.metadata
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.http import Http404, HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from django.views import View
+
+from api.compression import choose_encoding
+
+# drf-yasg is imported inside the functions that generate the schema, so
+# serving a stored schema (and importing this module) does not load it.
+
+# format -> content type; the keys match swagger<format>/ without the dot.
+FORMATS = {
+    'json': 'application/json',
+    'yaml': 'application/yaml',
+}
+
+# Installed distributions whose version changes the generated schema.
+SCHEMA_PACKAGES = ('Django', 'djangorestframework', 'drf-yasg', 'django-filter')
+
+def get_api_info():
+    from drf_yasg import openapi
+
+    return openapi.Info(
+        title="Django REST API",
+        default_version='v1',
+        description="API documentation for your Django REST project",
+        terms_of_service="https://www.google.com/policies/terms/",
+        contact=openapi.Contact(email="contact@example.com"),
+        license=openapi.License(name="BSD License"),
+    )
+
+
+def get_codec(fmt):
+    from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml
+
+    return {'json': OpenAPICodecJson, 'yaml': OpenAPICodecYaml}[fmt](validators=[])
+
+
+def schema_settings():
+    return {
+        'MODE': 'dynamic',
+        'DIR': Path(settings.BASE_DIR) / '.schema',
+        'CODE_VERSION': None,
+        **getattr(settings, 'API_SCHEMA', {}),
+    }
+
+
+def is_stored_mode():
+    return schema_settings()['MODE'] == 'stored'
+
+
+@functools.cache
+def code_version():
+    """
+    API_SCHEMA['CODE_VERSION'] (e.g. the deployed git sha) if set, otherwise a
+    hash of the project's Python sources and the versions of the packages
+    that shape the schema. Computed once per process.
+    """
+    configured = schema_settings()['CODE_VERSION']
+    if configured:
+        return re.sub(r'[^\w.-]', '_', configured)
+    digest = hashlib.sha256()
+    for package in SCHEMA_PACKAGES:
+        digest.update(f'{package}=={importlib.metadata.version(package)}\n'.encode())
+    roots = {Path(apps.get_app_config('api').path), Path(settings.BASE_DIR) / settings.ROOT_URLCONF.split('.')[0]}
+    for root in sorted(roots):
+        for path in sorted(root.rglob('*.py')):
+            digest.update(str(path.relative_to(root.parent)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def schema_path(version, fmt):
+    return Path(schema_settings()['DIR']) / f'openapi-{version}.{fmt}'
+
+
+def generate_schema():
+    """Builds the schema the drf-yasg views would serve to an anonymous request."""
+    from drf_yasg.generators import OpenAPISchemaGenerator
+
+    generator = OpenAPISchemaGenerator(get_api_info())
+    return generator.get_schema(request=None, public=True)
+
+
+def _write_atomic(path, content):
+    # Other workers may be reading the file; replace it in one step.
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f'.{path.name}.')
+    with os.fdopen(fd, 'wb') as file:
+        file.write(content)
+    os.replace(tmp, path)
+
+
+def write_schema(version=None):
+    """
+    Generates the schema, writes every format plus a gzip copy for the given
+    code version and removes the files of other versions. Returns the paths.
+    """
+    version = version or code_version()
+    directory = Path(schema_settings()['DIR'])
+    directory.mkdir(parents=True, exist_ok=True)
+    schema = generate_schema()
+    written = []
+    for fmt in FORMATS:
+        content = get_codec(fmt).encode(schema)
+        path = schema_path(version, fmt)
+        # The gzip copy goes first: a reader that sees the plain file finds both.
+        _write_atomic(path.with_name(f'{path.name}.gz'), gzip.compress(content, mtime=0))
+        _write_atomic(path, content)
+        written.append(path)
+    for path in directory.glob('openapi-*'):
+        if not path.name.startswith(f'openapi-{version}.'):
+            path.unlink(missing_ok=True)
+    return written
+
+
+class StoredSchema:
+    """One format of the stored schema, held in memory with its ETags."""
+
+    def __init__(self, fmt, content, gzipped):
+        self.content_type = FORMATS[fmt]
+        self.content = content
+        self.gzipped = gzipped
+        digest = hashlib.sha256(content).hexdigest()[:32]
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gzip"'
+
+
+_lock = threading.Lock()
+_loaded = {}
+
+
+def get_stored_schema(fmt):
+    """Returns the StoredSchema for fmt, generating the files once if missing."""
+    key = (code_version(), fmt)
+    if key not in _loaded:
+        with _lock:
+            if key not in _loaded:
+                path = schema_path(key[0], fmt)
+                gzip_path = path.with_name(f'{path.name}.gz')
+                try:
+                    stored = StoredSchema(fmt, path.read_bytes(), gzip_path.read_bytes())
+                except FileNotFoundError:
+                    # Not generated yet, or removed by a worker running another
+                    # code version; the files are written atomically, so retry
+                    # once with our own.
+                    write_schema(key[0])
+                    stored = StoredSchema(fmt, path.read_bytes(), gzip_path.read_bytes())
+                _loaded[key] = stored
+    return _loaded[key]
+
+
+def warm_stored_schema():
+    """
+    Loads (or generates) the stored schema at startup. Does nothing in dynamic
+    mode or with API_DOCS off.
+    """
+    if not (getattr(settings, 'API_DOCS', True) and is_stored_mode()):
+        return None
+    started = time.perf_counter()
+    for fmt in FORMATS:
+        get_stored_schema(fmt)
+    return time.perf_counter() - started
+
+
+class StoredSchemaView(View):
+    """
+    Serves swagger.json / swagger.yaml from the files written by write_schema()
+    instead of walking every view per request. Clients revalidate with
+    If-None-Match and get a 304 until the code version changes.
+    """
+
+    def get(self, request, format):
+        fmt = format.lstrip('.')
+        if fmt not in FORMATS:
+            raise Http404()
+        stored = get_stored_schema(fmt)
+        gzipped = choose_encoding(request.headers.get('Accept-Encoding'), ('gzip',)) == 'gzip'
+        etag = stored.gzip_etag if gzipped else stored.etag
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(stored.gzipped if gzipped else stored.content, content_type=stored.content_type)
+            if gzipped:
+                response.headers['Content-Encoding'] = 'gzip'
+            response.headers['Content-Length'] = str(len(response.content))
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = 'public, no-cache'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
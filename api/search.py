@@ -0,0 +1,81 @@
+import re
+
+from django.db import connection, transaction
+
+from api.sql import chunked, placeholders
+
+
+SEARCH_TABLE = 'api_profile_search'
+SEARCH_COLUMNS = ('username', 'email', 'first_name', 'last_name', 'phone_number')
+# bm25() weight per column, in SEARCH_COLUMNS order: names beat email and phone.
+SEARCH_WEIGHTS = (4.0, 2.0, 5.0, 5.0, 1.0)
+
+MAX_QUERY_TERMS = 8
+
+# Fields whose change has to be copied into the index.
+USER_SEARCH_FIELDS = frozenset(('username', 'email', 'first_name', 'last_name'))
+PROFILE_SEARCH_FIELDS = frozenset(('phone_number', 'user'))
+
+# FTS5 honours OR REPLACE on rowid, so one statement both adds and refreshes.
+INSERT_SQL = f"""
+INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, {', '.join(SEARCH_COLUMNS)})
+SELECT p.id, u.username, u.email, u.first_name, u.last_name, p.phone_number
+FROM api_profile p JOIN auth_user u ON u.id = p.user_id
+"""
+
+TERM_RE = re.compile(r'\w+')
+
+
+def build_match_query(text):
+    """
+    Turns free text into an FTS5 MATCH expression: every word becomes a quoted
+    prefix term and all of them must match. Returns None if there are no words.
+    """
+    terms = TERM_RE.findall(text or '')[:MAX_QUERY_TERMS]
+    if not terms:
+        return None
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_profile_ids(text, limit=20, offset=0):
+    """Returns profile ids matching text, best bm25 rank first."""
+    match = build_match_query(text)
+    if match is None:
+        return []
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+            f'ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s OFFSET %s',
+            [match, limit, offset],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def unindex_profiles(profile_ids):
+    with connection.cursor() as cursor:
+        for batch in chunked(profile_ids):
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders(batch)})', batch)
+
+
+def index_profiles(profile_ids):
+    """(Re)indexes the given profiles; used by signals and bulk writers."""
+    with connection.cursor() as cursor:
+        for batch in chunked(profile_ids):
+            cursor.execute(f'{INSERT_SQL} WHERE p.id IN ({placeholders(batch)})', batch)
+
+
+def index_user(user_id):
+    """Reindexes the profile of a user whose searchable fields changed."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'{INSERT_SQL} WHERE p.user_id = %s', [user_id])
+
+
+def rebuild_search_index():
+    """Refills the FTS table from api_profile/auth_user and returns its row count."""
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(INSERT_SQL)
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT count(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
@@ -2,6 +2,10 @@ from rest_framework import serializers
 from api.models import UserType, UserRole, Profile
 from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
+from api.images import derivative_urls
+from api.cache import user_type_cache, user_role_cache
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import Prefetch
 
 class UserTypeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -14,6 +18,25 @@ class UserRoleSerializer(serializers.ModelSerializer):
         model=UserRole
         fields='__all__'
 
+class CachedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField that resolves ids through a ReferenceCache instead
+    of running queryset.get() for every submitted id.
+    """
+
+    def __init__(self, **kwargs):
+        self.reference_cache = kwargs.pop('reference_cache')
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return self.reference_cache.get(data)
+        except ObjectDoesNotExist:
+            self.fail('does_not_exist', pk_value=data)
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -24,30 +47,116 @@ class UserSerializer(serializers.ModelSerializer):
         }
 
 
+def _split_param(value):
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def parse_fieldset(query_params):
+    """
+    Reads ?fields= and ?expand= for ProfileSerializer. A missing parameter is
+    returned as None, which keeps the full, fully expanded representation.
+    """
+    fields = _split_param(query_params.get('fields'))
+    expand = _split_param(query_params.get('expand'))
+    errors = {}
+    if fields is not None:
+        unknown = set(fields) - set(ProfileSerializer.READABLE_FIELDS)
+        if unknown:
+            errors['fields'] = [f'Geçersiz alan: {name}' for name in sorted(unknown)]
+    if expand is not None:
+        unknown = set(expand) - set(ProfileSerializer.EXPANDABLE_FIELDS)
+        if unknown:
+            errors['expand'] = [f'Genişletilemeyen alan: {name}' for name in sorted(unknown)]
+    if errors:
+        raise serializers.ValidationError(errors)
+    return fields, expand
+
+
 class ProfileSerializer(serializers.ModelSerializer):
+    READABLE_FIELDS = (
+        'id', 'user', 'user_type', 'user_roles', 'profile_picture_derivatives',
+        'created_at', 'updated_at', 'phone_number', 'profile_picture',
+    )
+    EXPANDABLE_FIELDS = ('user', 'user_type', 'user_roles')
+
     user = UserSerializer()
     user_type = UserTypeSerializer(read_only=True)
     user_roles = UserRoleSerializer(many=True, read_only=True)
     password = serializers.CharField(write_only=True, required=False)
-    user_type_id = serializers.PrimaryKeyRelatedField(
+    user_type_id = CachedPrimaryKeyRelatedField(
         queryset=UserType.objects.all(),
+        reference_cache=user_type_cache,
         write_only=True,
         required=True,
         source='user_type'
     )
-    user_role_ids = serializers.PrimaryKeyRelatedField(
+    user_role_ids = CachedPrimaryKeyRelatedField(
         queryset=UserRole.objects.all(),
+        reference_cache=user_role_cache,
         write_only=True,
         required=True,
         many=True,
         source='user_roles'
     )
+    profile_picture_derivatives = serializers.SerializerMethodField()
 
     class Meta:
         model = Profile
-        fields = '__all__'
+        # role_mask is an internal copy of user_roles.
+        exclude = ('role_mask',)
         read_only_fields = ('created_at', 'updated_at')
 
+    def __init__(self, *args, **kwargs):
+        # fields: readable fields to output; expand: relations to nest instead
+        # of rendering as primary keys. None keeps the default for either.
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for name in set(self.READABLE_FIELDS) - set(fields):
+                self.fields.pop(name, None)
+        if expand is not None:
+            collapsed = {
+                'user': lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+                'user_type': lambda: serializers.PrimaryKeyRelatedField(read_only=True),
+                'user_roles': lambda: serializers.PrimaryKeyRelatedField(many=True, read_only=True),
+            }
+            for name in set(self.EXPANDABLE_FIELDS) - set(expand):
+                if name in self.fields:
+                    self.fields[name] = collapsed[name]()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, fields=None, expand=None, prefetch=True):
+        """
+        Joins and prefetches only the relations the representation needs.
+        With prefetch=False the caller prefetches get_prefetch_lookups() itself.
+        """
+        wanted = set(cls.READABLE_FIELDS if fields is None else fields)
+        expanded = set(cls.EXPANDABLE_FIELDS if expand is None else expand)
+
+        related = [name for name in ('user', 'user_type') if name in wanted & expanded]
+        if related:
+            queryset = queryset.select_related(*related)
+        if prefetch:
+            queryset = queryset.prefetch_related(*cls.get_prefetch_lookups(fields, expand))
+        return queryset
+
+    @classmethod
+    def get_prefetch_lookups(cls, fields=None, expand=None):
+        wanted = set(cls.READABLE_FIELDS if fields is None else fields)
+        expanded = set(cls.EXPANDABLE_FIELDS if expand is None else expand)
+        if 'user_roles' not in wanted:
+            return []
+        if 'user_roles' in expanded:
+            return [Prefetch('user_roles', queryset=UserRole.objects.order_by('id'))]
+        return [Prefetch('user_roles', queryset=UserRole.objects.only('id').order_by('id'))]
+
+    def get_profile_picture_derivatives(self, obj):
+        return derivative_urls(obj.profile_picture.name)
+
     def create(self, validated_data):
         user_data = validated_data.pop('user')
         password = validated_data.pop('password', None)
@@ -109,14 +218,16 @@ class ProfileFormSerializer(serializers.ModelSerializer):
     last_name = serializers.CharField(write_only=True, required=False, allow_blank=True)
     password = serializers.CharField(write_only=True, required=False)
     phone_number = serializers.CharField(required=False, allow_blank=True)
-    user_type_id = serializers.PrimaryKeyRelatedField(
+    user_type_id = CachedPrimaryKeyRelatedField(
         queryset=UserType.objects.all(),
+        reference_cache=user_type_cache,
         write_only=True,
         required=True,
         source='user_type'
     )
-    user_role_ids = serializers.PrimaryKeyRelatedField(
+    user_role_ids = CachedPrimaryKeyRelatedField(
         queryset=UserRole.objects.all(),
+        reference_cache=user_role_cache,
         write_only=True,
         required=True,
         many=True,
@@ -218,12 +329,17 @@ class RegisterSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         password2 = validated_data.pop('password2')
+        # Already hashed off the request worker (see api.hashing)
+        password_hash = validated_data.pop('password_hash', None)
         user = User.objects.create(
             username=validated_data['username'],
             email=validated_data['email'],
             first_name=validated_data['first_name'],
             last_name=validated_data['last_name']
         )
-        user.set_password(validated_data['password'])
+        if password_hash:
+            user.password = password_hash
+        else:
+            user.set_password(validated_data['password'])
         user.save()
         return user
\ No newline at end of file
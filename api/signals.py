@@ -0,0 +1,149 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from api.images import schedule_derivatives
+from api.search import (
+    PROFILE_SEARCH_FIELDS, USER_SEARCH_FIELDS, index_profiles, index_user, unindex_profiles,
+)
+from api.cache import user_type_cache, user_role_cache
+from api.fragments import RENDERED_USER_FIELDS, profile_fragment_cache, touch_profiles
+from api.rolemasks import forget_role, refresh_role_masks
+from api.signed_tokens import revoke_user_tokens, signed_tokens_enabled
+from api.models import Profile, UserType, UserRole
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(sender, instance, created, **kwargs):
+    # Any change (deactivation, renamed user, ...) drops the cached user
+    # object; a user that was just created has no tokens yet. Deleting a user
+    # cascades to its tokens, whose post_delete invalidates them.
+    if not created:
+        token_cache.invalidate_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def revoke_signed_tokens(sender, instance, **kwargs):
+    # Signed tokens carry no is_active check; deleted and deactivated users
+    # go on the revocation list (ProfileDetailView.delete ends up here).
+    if signed_tokens_enabled() and (kwargs['signal'] is post_delete or not instance.is_active):
+        revoke_user_tokens([instance.pk])
+
+
+@receiver(post_save, sender=Profile)
+def generate_profile_picture_derivatives(sender, instance, **kwargs):
+    if instance.profile_picture:
+        name = instance.profile_picture.name
+        transaction.on_commit(lambda: schedule_derivatives(name))
+
+
+@receiver(post_save, sender=Profile)
+def index_saved_profile(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or PROFILE_SEARCH_FIELDS.intersection(update_fields):
+        index_profiles([instance.pk])
+
+
+@receiver(post_delete, sender=Profile)
+def unindex_deleted_profile(sender, instance, **kwargs):
+    unindex_profiles([instance.pk])
+
+
+@receiver(post_save, sender=User)
+def index_saved_user(sender, instance, created, update_fields=None, **kwargs):
+    # A new user has no profile yet; last_login updates touch no indexed field.
+    if created or (update_fields is not None and not USER_SEARCH_FIELDS.intersection(update_fields)):
+        return
+    index_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def touch_user_profile(sender, instance, created, update_fields=None, **kwargs):
+    # The profile's cached representation includes these user fields.
+    if created or (update_fields is not None and not RENDERED_USER_FIELDS.intersection(update_fields)):
+        return
+    touch_profiles(user_id=instance.pk)
+
+
+@receiver(post_delete, sender=Profile)
+def drop_deleted_profile_fragments(sender, instance, **kwargs):
+    profile_fragment_cache.invalidate_profiles([instance.pk])
+
+
+@receiver(m2m_changed, sender=Profile.user_roles.through)
+def refresh_profile_role_mask(sender, instance, action, reverse, pk_set, **kwargs):
+    profile_ids = None
+    if reverse:
+        # Changed from the role side: pk_set holds profile ids. clear() sends
+        # none, so the affected profiles are collected before it runs.
+        if action == 'pre_clear':
+            instance._role_mask_profile_ids = list(instance.profile_set.values_list('pk', flat=True))
+        elif action == 'post_clear':
+            profile_ids = instance.__dict__.pop('_role_mask_profile_ids', [])
+        elif action in ('post_add', 'post_remove') and pk_set:
+            profile_ids = list(pk_set)
+    elif action == 'post_clear' or (action in ('post_add', 'post_remove') and pk_set):
+        profile_ids = [instance.pk]
+    if profile_ids:
+        refresh_role_masks(profile_ids)
+
+
+@receiver(post_delete, sender=UserRole)
+def forget_deleted_role(sender, instance, **kwargs):
+    forget_role(instance.pk)
+
+
+@receiver(post_save, sender=UserType)
+@receiver(post_delete, sender=UserType)
+def bump_user_type_cache(sender, **kwargs):
+    # Bump now for this request and again on commit, so a worker that reloaded
+    # the table before the commit does not keep the old rows.
+    user_type_cache.bump()
+    transaction.on_commit(user_type_cache.bump)
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def bump_user_role_cache(sender, **kwargs):
+    user_role_cache.bump()
+    transaction.on_commit(user_role_cache.bump)
+
+
+# Set by enable_database_pragmas() in the server entry points.
+database_pragmas_enabled = False
+
+
+def enable_database_pragmas():
+    """
+    Applies SQLITE_DATABASE_PRAGMAS (journal_mode=WAL) to new connections.
+    They rewrite the database file, so the servers opt in and management
+    commands such as makemigrations --check do not touch db.sqlite3.
+    """
+    global database_pragmas_enabled
+    database_pragmas_enabled = True
+
+
+def get_sqlite_pragmas():
+    pragmas = dict(getattr(settings, 'SQLITE_PRAGMAS', {}))
+    if database_pragmas_enabled:
+        pragmas = {**getattr(settings, 'SQLITE_DATABASE_PRAGMAS', {}), **pragmas}
+    return pragmas
+
+
+@receiver(connection_created)
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or getattr(connection, 'reused_connection', False):
+        return
+    # Raw sqlite3 connection: these are connection setup, not app queries.
+    for name, value in get_sqlite_pragmas().items():
+        connection.connection.execute(f'PRAGMA {name} = {value}')
@@ -0,0 +1,183 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api.cache import revocation_cache
+from api.models import TokenRevocation
+
+
+SIGNED_TOKENS_DEFAULTS = {
+    'ENABLED': False,
+    # Seconds an access token is accepted without any lookup.
+    'ACCESS_TTL': 300,
+    # Seconds a refresh token can be exchanged for a new pair.
+    'REFRESH_TTL': 14 * 86400,
+}
+
+ACCESS = 'access'
+REFRESH = 'refresh'
+
+# One salt per kind, so a refresh token never verifies as an access token.
+SALTS = {
+    ACCESS: 'api.signed_tokens.access',
+    REFRESH: 'api.signed_tokens.refresh',
+}
+
+
+def get_signed_tokens_settings():
+    return {**SIGNED_TOKENS_DEFAULTS, **getattr(settings, 'SIGNED_TOKENS', {})}
+
+
+def signed_tokens_enabled():
+    return get_signed_tokens_settings()['ENABLED']
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class SignedToken:
+    """Verified claims of an access or refresh token."""
+
+    def __init__(self, kind, user_id, version, is_staff):
+        self.kind = kind
+        self.user_id = user_id
+        self.version = version
+        self.is_staff = is_staff
+
+
+class TokenUser:
+    """
+    request.user for signed access tokens: the id and staff flag come from
+    the token, so permission checks need no query. Views that need the User
+    row load it by id.
+    """
+
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token):
+        self.id = self.pk = token.user_id
+        self.is_staff = token.is_staff
+
+    def __str__(self):
+        return f'TokenUser {self.id}'
+
+
+def _sign(kind, user, version):
+    # HMAC-SHA256 over the claims and the issue time, keyed by SECRET_KEY.
+    claims = {'u': user.pk, 'v': version, 's': int(user.is_staff)}
+    return signing.TimestampSigner(salt=SALTS[kind]).sign_object(claims)
+
+
+def _issue(user, version):
+    config = get_signed_tokens_settings()
+    return {
+        'token': _sign(ACCESS, user, version),
+        'refresh': _sign(REFRESH, user, version),
+        'token_type': 'Bearer',
+        'expires_in': config['ACCESS_TTL'],
+    }
+
+
+def issue_tokens(user):
+    """Returns a new access/refresh pair for user, for the login and register responses."""
+    return _issue(user, revocation_cache.get(user.pk))
+
+
+async def aissue_tokens(user):
+    return _issue(user, await revocation_cache.aget(user.pk))
+
+
+def issue_credentials(user):
+    """
+    Token fields of the login and register responses: a signed pair when
+    SIGNED_TOKENS is enabled, otherwise the user's authtoken key.
+    """
+    if signed_tokens_enabled():
+        return issue_tokens(user)
+    token, _ = Token.objects.get_or_create(user=user)
+    return {'token': token.key}
+
+
+async def aissue_credentials(user):
+    if signed_tokens_enabled():
+        return await aissue_tokens(user)
+    token, _ = await Token.objects.aget_or_create(user=user)
+    return {'token': token.key}
+
+
+def _unsign(value, kind):
+    """Checks signature and age; revocation is checked by the caller."""
+    config = get_signed_tokens_settings()
+    max_age = config['ACCESS_TTL'] if kind == ACCESS else config['REFRESH_TTL']
+    try:
+        claims = signing.TimestampSigner(salt=SALTS[kind]).unsign_object(value, max_age=max_age)
+        return SignedToken(kind, int(claims['u']), int(claims['v']), bool(claims['s']))
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        raise InvalidToken()
+
+
+def verify_token(value, kind=ACCESS):
+    """
+    Returns the SignedToken for a valid, unexpired, unrevoked token or raises
+    InvalidToken. Uses no database once the user's revocation entry is in
+    the shared cache.
+    """
+    token = _unsign(value, kind)
+    if token.version < revocation_cache.get(token.user_id):
+        raise InvalidToken()
+    return token
+
+
+async def averify_token(value, kind=ACCESS):
+    token = _unsign(value, kind)
+    if token.version < await revocation_cache.aget(token.user_id):
+        raise InvalidToken()
+    return token
+
+
+def revoke_user_tokens(user_ids):
+    """
+    Rejects every signed token issued so far to the given users (logout,
+    deactivation, deletion). New tokens carry the raised version.
+
+    A version never goes down: dropping the row of a user who can still log
+    in would restart them at 0, and the next revocation would only reach
+    version 1 while tokens issued at 1 are still valid. Only rows of deleted
+    users are pruned, once every token they could reject has expired.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    config = get_signed_tokens_settings()
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=max(config['ACCESS_TTL'], config['REFRESH_TTL']))
+    with transaction.atomic():
+        current = dict(
+            TokenRevocation.objects.filter(user_id__in=user_ids).values_list('user_id', 'min_version')
+        )
+        versions = {user_id: current.get(user_id, 0) + 1 for user_id in user_ids}
+        TokenRevocation.objects.bulk_create(
+            [
+                TokenRevocation(user_id=user_id, min_version=version, expires_at=expires_at)
+                for user_id, version in versions.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['user_id'],
+            update_fields=['min_version', 'expires_at'],
+        )
+        TokenRevocation.objects.filter(expires_at__lt=now).exclude(
+            user_id__in=User.objects.values('pk')
+        ).delete()
+        # Set now so the rest of this request sees it, and again after
+        # commit: a worker that missed an evicted key in between may have
+        # cached the old row.
+        revocation_cache.set_many(versions)
+        transaction.on_commit(lambda: revocation_cache.set_many(versions))
@@ -0,0 +1,18 @@
+from itertools import islice
+
+
+# Ids bound per "IN (...)" statement, well below SQLite's bound-parameter
+# limit (SQLITE_MAX_VARIABLE_NUMBER, 999 before SQLite 3.32).
+MAX_IN_PARAMS = 500
+
+
+def chunked(values, size=MAX_IN_PARAMS):
+    """Yields lists of at most size items from values, in order."""
+    iterator = iter(values)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def placeholders(values):
+    """"%s, %s, ..." for binding values in an IN list."""
+    return ', '.join(['%s'] * len(values))
@@ -1,3 +1,1544 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_login_failed
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.http import JsonResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from api import schema
+from api.authentication import TokenCache, token_cache
+from api.backends.sqlite3.pool import ConnectionPool, PoolTimeout, _pools, get_pool
+from api.cache import user_role_cache, user_type_cache
+from api.deleters import ProfileBulkDeleter
+from api.exporters import CSV_COLUMNS
+from api.filters import ProfileFilter
+from api.fragments import profile_fragment_cache
+from api.hashing import import_hash_pool, password_hash_pool
+from api.images import derivative_name, generate_derivatives, get_derivative_specs
+from api.importers import CSV, NDJSON, import_profiles
+from api.middleware import QueryInstrumentationMiddleware
+from api.models import Profile, TokenRevocation, UserType, UserRole
+from api.readers import ProfileValuesReader
+from api.rolemasks import MASK_ROLE_LIMIT, OVERFLOW_BIT, build_mask, refresh_role_masks
+from api.search import SEARCH_TABLE, search_profile_ids, unindex_profiles
+from api.serializers import ProfileFormSerializer, ProfileSerializer, UserRoleSerializer
+from api.signed_tokens import issue_tokens, revoke_user_tokens
+from api.timing import serializing
+
+
+@override_settings(TOKEN_AUTH_CACHE={'VERSION_ALIAS': 'default'})
+class TokenCacheTestCase(TestCase):
+    def setUp(self):
+        caches['default'].clear()
+        token_cache.clear()
+        self.user = User.objects.create_user(username='cached', password='cached-password')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+
+    def get(self):
+        return self.client.get(reverse('user-type-list'), headers={'Authorization': f'Token {self.token.key}'})
+
+    def other_worker(self):
+        """A second process's cache, already holding the token."""
+        worker = TokenCache()
+        token = Token.objects.select_related('user').get(pk=self.token.pk)
+        worker.set(self.token.key, token, worker.version(self.token.key))
+        self.assertIsNotNone(worker.get(self.token.key, worker.version(self.token.key)))
+        return worker
+
+    def test_hits_and_misses_are_counted(self):
+        self.assertEqual(self.get().status_code, 200)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get().status_code, 200)
+        stats = token_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['size']), (1, 1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_version_keys_expire_with_the_entries(self):
+        versions = caches['default']
+        with mock.patch.object(versions, 'add', wraps=versions.add) as add, \
+                mock.patch.object(versions, 'touch', wraps=versions.touch) as touch:
+            self.get()
+            self.token.delete()
+        self.assertEqual({call.args[2] for call in add.call_args_list}, {300})
+        self.assertEqual({call.args[1] for call in touch.call_args_list}, {300})
+
+    def test_version_keys_never_cull_reference_versions(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        file_cache = 'django.core.cache.backends.filebased.FileBasedCache'
+        with override_settings(
+            CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'shared': {'BACKEND': file_cache, 'LOCATION': f'{directory.name}/shared'},
+                'token_versions': {
+                    'BACKEND': file_cache, 'LOCATION': f'{directory.name}/token-versions',
+                    'OPTIONS': {'MAX_ENTRIES': 10, 'CULL_FREQUENCY': 2},
+                },
+            },
+            TOKEN_AUTH_CACHE={'VERSION_ALIAS': 'token_versions'},
+            REFERENCE_CACHE={'ALIAS': 'shared'},
+        ):
+            version = user_type_cache.version()
+            for i in range(50):
+                token_cache.version(f'token-{i}')
+            self.assertEqual(user_type_cache.version(), version)
+            self.assertLessEqual(len(list(Path(directory.name, 'token-versions').iterdir())), 10)
+
+    def test_deleted_token_is_dropped_in_every_worker(self):
+        self.get()
+        worker = self.other_worker()
+        self.token.delete()
+        self.assertIsNone(worker.get(self.token.key, worker.version(self.token.key)))
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_deactivated_user_is_dropped_in_every_worker(self):
+        self.get()
+        worker = self.other_worker()
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(worker.get(self.token.key, worker.version(self.token.key)))
+        self.assertEqual(self.get().status_code, 401)
+
+    def test_deleted_user_is_dropped_in_every_worker(self):
+        self.get()
+        worker = self.other_worker()
+        self.user.delete()
+        self.assertIsNone(worker.get(self.token.key, worker.version(self.token.key)))
+        self.assertEqual(self.get().status_code, 401)
+
+
+@override_settings(REFERENCE_CACHE={'ALIAS': 'default'})
+class ReferenceCacheTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_type = UserType.objects.create(name='type', description='type')
+        cls.roles = [UserRole.objects.create(name=f'role-{i}', description='role') for i in range(3)]
+
+    def setUp(self):
+        caches['default'].clear()
+        for cache in (user_type_cache, user_role_cache):
+            cache.clear()
+            self.addCleanup(cache.clear)
+
+    def test_user_type_writes_bump_the_version_and_refresh_the_table(self):
+        self.assertEqual([row.name for row in user_type_cache.all()], ['type'])
+
+        version = user_type_cache.version()
+        user_type = UserType.objects.create(name='other', description='type')
+        self.assertGreater(user_type_cache.version(), version)
+        with self.assertNumQueries(1):
+            self.assertEqual([row.name for row in user_type_cache.all()], ['type', 'other'])
+
+        user_type.name = 'renamed'
+        user_type.save()
+        self.assertEqual(user_type_cache.get(user_type.pk).name, 'renamed')
+
+        user_type.delete()
+        self.assertEqual([row.name for row in user_type_cache.all()], ['type'])
+        with self.assertRaises(UserType.DoesNotExist):
+            user_type_cache.get(user_type.pk)
+
+    def test_user_role_writes_bump_the_version_and_refresh_the_table(self):
+        self.assertEqual(user_role_cache.ids(), {role.pk for role in self.roles})
+
+        version = user_role_cache.version()
+        self.roles[0].description = 'changed'
+        self.roles[0].save()
+        self.assertGreater(user_role_cache.version(), version)
+        self.assertEqual(user_role_cache.get(self.roles[0].pk).description, 'changed')
+
+        self.roles[1].delete()
+        self.assertEqual(user_role_cache.ids(), {self.roles[0].pk, self.roles[2].pk})
+
+    def test_version_is_bumped_again_on_commit(self):
+        version = user_role_cache.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            UserRole.objects.create(name='late', description='role')
+            self.assertEqual(user_role_cache.version(), version + 1)
+        self.assertEqual(user_role_cache.version(), version + 2)
+
+    def test_warm_cache_is_read_without_queries(self):
+        user_type_cache.all()
+        user_role_cache.all()
+        with self.assertNumQueries(0):
+            self.assertEqual(user_type_cache.get(self.user_type.pk).name, 'type')
+            self.assertEqual(len(user_role_cache.all()), 3)
+
+    def test_profile_references_are_validated_without_queries(self):
+        user_type_cache.all()
+        user_role_cache.all()
+        for serializer_class in (ProfileSerializer, ProfileFormSerializer):
+            fields = serializer_class().fields
+            with self.assertNumQueries(0):
+                self.assertEqual(fields['user_type_id'].run_validation(self.user_type.pk), self.user_type)
+                self.assertEqual(fields['user_role_ids'].run_validation([role.pk for role in self.roles]), self.roles)
+                with self.assertRaises(ValidationError):
+                    fields['user_role_ids'].run_validation([self.roles[0].pk, 0])
+
+
+class ProfileFilterTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_types = [UserType.objects.create(name=f'type-{i}', description='type') for i in range(10)]
+        cls.roles = [UserRole.objects.create(name=f'role-{i}', description='role') for i in range(20)]
+        users = User.objects.bulk_create([
+            User(username=f'user-{i}', email=f'user-{i}@example.com') for i in range(500)
+        ])
+        profiles = Profile.objects.bulk_create([
+            Profile(user=user, user_type=cls.user_types[i % 10], phone_number=f'555{i:07d}')
+            for i, user in enumerate(users)
+        ])
+        Through = Profile.user_roles.through
+        Through.objects.bulk_create([
+            Through(profile_id=profile.pk, userrole_id=cls.roles[(i + j) % 20].pk)
+            for i, profile in enumerate(profiles)
+            for j in range(2)
+        ])
+        refresh_role_masks([profile.pk for profile in profiles])
+        cls.admin = users[0]
+        # Give the planner the statistics a populated database would have.
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def filter(self, params):
+        filterset = ProfileFilter(params, queryset=Profile.objects.order_by('created_at', 'id'))
+        self.assertTrue(filterset.is_valid(), filterset.errors)
+        return filterset.qs
+
+    def test_filters_use_an_index(self):
+        self.assertEqual(connection.vendor, 'sqlite')
+        # params -> the index that must drive the search. "SCAN x USING INDEX"
+        # walks the whole index, so any SCAN fails the test.
+        cases = {
+            'user_type': ({'user_type': self.user_types[3].pk}, 'profile_type_created_idx'),
+            'user_roles': (
+                {'user_roles': f'{self.roles[1].pk},{self.roles[2].pk}'}, r'api_profile_user_roles_userrole_id_\w+'
+            ),
+            'user_roles_all': (
+                {'user_roles_all': f'{self.roles[1].pk},{self.roles[2].pk}'}, r'api_profile_user_roles_userrole_id_\w+'
+            ),
+            'email': ({'email': 'user-3@example.com'}, 'api_user_email_idx'),
+            'phone_number': ({'phone_number': '5550000003'}, 'profile_phone_idx'),
+            'created_at': (
+                {'created_at_after': '2020-01-01T00:00:00Z', 'created_at_before': '2100-01-01T00:00:00Z'},
+                'profile_created_id_idx',
+            ),
+            'updated_at': (
+                {'updated_at_after': '2020-01-01T00:00:00Z', 'updated_at_before': '2100-01-01T00:00:00Z'},
+                'profile_updated_id_idx',
+            ),
+        }
+        for name, (params, index) in cases.items():
+            with self.subTest(name):
+                # QuerySet.explain() runs EXPLAIN QUERY PLAN on SQLite.
+                plan = self.filter(params).explain()
+                self.assertNotRegex(plan, r'\bSCAN\b')
+                self.assertRegex(plan, rf'SEARCH \w+ USING (COVERING )?INDEX {index} \(')
+
+    def test_filter_results(self):
+        self.assertEqual(self.filter({'email': 'user-3@example.com'}).get().user.username, 'user-3')
+        self.assertEqual(self.filter({'user_roles': f'{self.roles[1].pk},{self.roles[2].pk}'}).count(), 75)
+        self.assertEqual(self.filter({'user_roles_all': f'{self.roles[1].pk},{self.roles[2].pk}'}).count(), 25)
+        ordered = list(self.filter({'ordering': '-updated_at'}).values_list('id', flat=True))
+        self.assertEqual(ordered, sorted(ordered, reverse=True))
+
+    def test_list_rejects_invalid_filters(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/api/profiles/', {'ordering': 'phone_number'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.json()['details'])
+        response = client.get('/api/profiles/', {'user_type': self.user_types[2].pk, 'user_roles': self.roles[2].pk})
+        self.assertEqual(response.json()['count'], 25)
+
+
+class ProfileSearchTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_type = UserType.objects.create(name='type', description='type')
+
+    def create(self, username, **fields):
+        user = User.objects.create_user(
+            username=username, email=fields.pop('email', f'{username}@example.com'),
+            first_name=fields.pop('first_name', ''), last_name=fields.pop('last_name', ''),
+        )
+        return Profile.objects.create(user=user, user_type=self.user_type, **fields)
+
+    def indexed(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid, username, email, first_name, last_name, phone_number FROM {SEARCH_TABLE}')
+            return {row[0]: row[1:] for row in cursor.fetchall()}
+
+    def test_index_follows_profile_and_user_writes(self):
+        profile = self.create('alice', first_name='Alice', phone_number='5551112233')
+        self.assertEqual(self.indexed(), {profile.pk: ('alice', 'alice@example.com', 'Alice', '', '5551112233')})
+
+        user = profile.user
+        user.last_name = 'Smith'
+        user.save()
+        profile.phone_number = '5559998877'
+        profile.save(update_fields=['phone_number'])
+        self.assertEqual(self.indexed(), {profile.pk: ('alice', 'alice@example.com', 'Alice', 'Smith', '5559998877')})
+        self.assertEqual(search_profile_ids('smith'), [profile.pk])
+
+        other = self.create('bob')
+        profile.delete()
+        self.assertEqual(list(self.indexed()), [other.pk])
+        other.user.delete()
+        self.assertEqual(self.indexed(), {})
+
+    def test_rebuild_command(self):
+        profiles = [self.create(f'user-{i}') for i in range(3)]
+        unindex_profiles([profiles[0].pk])
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} (rowid, username) VALUES (999999, 'stale')")
+
+        out = io.StringIO()
+        call_command('rebuild_profile_search', stdout=out)
+        self.assertIn('Indexed 3 profiles', out.getvalue())
+        self.assertEqual(sorted(self.indexed()), sorted(profile.pk for profile in profiles))
+
+    def test_prefix_terms_ranked_by_column_weight(self):
+        by_name = self.create('zed', first_name='Kemal', last_name='Arslan', email='zed@example.com')
+        by_email = self.create('yusuf', email='kemalettin@example.com')
+        by_phone = self.create('veli', phone_number='5551234567')
+
+        self.assertEqual(search_profile_ids('kem'), [by_name.pk, by_email.pk])
+        self.assertEqual(search_profile_ids('KEMAL arsl'), [by_name.pk])
+        self.assertEqual(search_profile_ids('555123'), [by_phone.pk])
+        self.assertEqual(search_profile_ids('kem', limit=1, offset=1), [by_email.pk])
+        # Operators and quotes are plain words, not FTS5 syntax.
+        self.assertEqual(search_profile_ids('"kemal" OR NOT*'), [])
+        self.assertEqual(search_profile_ids('--'), [])
+
+        admin = User.objects.create_user(username='admin')
+        client = APIClient()
+        client.force_authenticate(admin)
+        response = client.get(reverse('profile-search'), {'q': 'kem', 'fields': 'id'})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([row['id'] for row in response.json()['results']], [by_name.pk, by_email.pk])
+        self.assertEqual(client.get(reverse('profile-search'), {'q': ' '}).status_code, 400)
+
+
+@override_settings(
+    TOKEN_AUTH_CACHE={'VERSION_ALIAS': 'default'}, SIGNED_TOKENS={'ENABLED': True},
+    REFERENCE_CACHE={'ALIAS': 'default'},
+)
+class ProfileBulkDeleteTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_types = [UserType.objects.create(name=f'type-{i}', description='type') for i in range(2)]
+        cls.roles = [UserRole.objects.create(name=f'role-{i}', description='role') for i in range(2)]
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+
+    def setUp(self):
+        caches['default'].clear()
+        token_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def create(self, count, user_type):
+        profiles = []
+        for i in range(count):
+            user = User.objects.create_user(username=f'{user_type.name}-{i}', email=f'{user_type.name}-{i}@example.com')
+            Token.objects.create(user=user)
+            profile = Profile.objects.create(user=user, user_type=user_type)
+            profile.user_roles.set(self.roles)
+            profiles.append(profile)
+        return profiles
+
+    def remaining(self, profiles):
+        profile_ids = [profile.pk for profile in profiles]
+        user_ids = [profile.user_id for profile in profiles]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT count(*) FROM {SEARCH_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(profile_ids))})",
+                profile_ids,
+            )
+            search_rows = cursor.fetchone()[0]
+        return {
+            'profiles': Profile.objects.filter(pk__in=profile_ids).count(),
+            'users': User.objects.filter(pk__in=user_ids).count(),
+            'tokens': Token.objects.filter(user_id__in=user_ids).count(),
+            'role_links': Profile.user_roles.through.objects.filter(profile_id__in=profile_ids).count(),
+            'search_rows': search_rows,
+        }
+
+    def test_ids_are_deleted_in_chunks_without_orphans(self):
+        doomed = self.create(5, self.user_types[0])
+        kept = self.create(1, self.user_types[1])
+        deleter = ProfileBulkDeleter(chunk_size=2)
+        with mock.patch.object(deleter, 'delete_chunk', wraps=deleter.delete_chunk) as delete_chunk:
+            report = deleter.delete_ids([profile.pk for profile in reversed(doomed)] + [doomed[0].pk, 999999])
+
+        ids = sorted(profile.pk for profile in doomed)
+        self.assertEqual([call.args[0] for call in delete_chunk.call_args_list], [ids[:2], ids[2:4], [ids[4], 999999]])
+        self.assertEqual(report['deleted'], {'profiles': 5, 'users': 5, 'tokens': 5, 'role_links': 10})
+        self.assertEqual(set(self.remaining(doomed).values()), {0})
+        self.assertEqual(self.remaining(kept), {'profiles': 1, 'users': 1, 'tokens': 1, 'role_links': 2, 'search_rows': 1})
+
+    @override_settings(PROFILE_BULK_DELETE_CHUNK_SIZE=2)
+    def test_filter_walks_every_chunk(self):
+        doomed = self.create(5, self.user_types[0])
+        kept = self.create(2, self.user_types[1])
+        with mock.patch.object(ProfileBulkDeleter, 'delete_chunk', autospec=True,
+                               side_effect=ProfileBulkDeleter.delete_chunk) as delete_chunk:
+            response = self.client.post(
+                reverse('profile-bulk-delete'), {'filter': {'user_type': self.user_types[0].pk}}, format='json'
+            )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([len(call.args[1]) for call in delete_chunk.call_args_list], [2, 2, 1])
+        self.assertEqual(response.json()['deleted'], {'profiles': 5, 'users': 5, 'tokens': 5, 'role_links': 10})
+        self.assertEqual(set(self.remaining(doomed).values()), {0})
+        self.assertEqual(self.remaining(kept)['profiles'], 2)
+
+    def test_view_rejects_empty_or_unknown_filters(self):
+        profiles = self.create(2, self.user_types[0])
+        for data in (
+            {},
+            {'filter': {}},
+            {'filter': {'user_type': '', 'user_roles': []}},
+            {'filter': {'username': 'user_type-0'}},
+            {'filter': ['user_type']},
+            {'filter': {'user_type': 'abc'}},
+            {'ids': [profiles[0].pk], 'filter': {'user_type': self.user_types[0].pk}},
+            {'ids': ['1']},
+        ):
+            with self.subTest(data=data):
+                response = self.client.post(reverse('profile-bulk-delete'), data, format='json')
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.remaining(profiles)['profiles'], 2)
+
+        member = User.objects.create_user(username='member')
+        self.client.force_authenticate(member)
+        response = self.client.post(reverse('profile-bulk-delete'), {'ids': [profiles[0].pk]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_sessions_end_in_every_worker(self):
+        profile = self.create(1, self.user_types[0])[0]
+        token = Token.objects.get(user_id=profile.user_id)
+        worker = TokenCache()
+        worker.set(token.key, token, worker.version(token.key))
+        signed = issue_tokens(profile.user)['token']
+        client = APIClient()
+        self.assertEqual(
+            client.get(reverse('user-type-list'), headers={'Authorization': f'Bearer {signed}'}).status_code, 200
+        )
+
+        ProfileBulkDeleter().delete_ids([profile.pk])
+        self.assertIsNone(worker.get(token.key, worker.version(token.key)))
+        self.assertEqual(TokenRevocation.objects.get(user_id=profile.user_id).min_version, 1)
+        for header in (f'Token {token.key}', f'Bearer {signed}'):
+            with self.subTest(header=header.split()[0]):
+                response = client.get(reverse('user-type-list'), headers={'Authorization': header})
+                self.assertEqual(response.status_code, 401)
+
+
+class ProfilePaginationTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user_type = UserType.objects.create(name='type', description='type')
+        users = User.objects.bulk_create([User(username=f'page-{i:03d}') for i in range(105)])
+        cls.profiles = Profile.objects.bulk_create([Profile(user=user, user_type=user_type) for user in users])
+        cls.ids = [profile.pk for profile in sorted(cls.profiles, key=lambda profile: (profile.created_at, profile.pk))]
+        cls.token = Token.objects.create(user=users[0])
+
+    def setUp(self):
+        profile_fragment_cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_page_number_response_is_unchanged(self):
+        for name in ('profile-list', 'async-profile-list'):
+            with self.subTest(view=name):
+                url = reverse(name)
+                first = self.get(url)
+                self.assertEqual(list(first), ['count', 'next', 'previous', 'results'])
+                self.assertEqual(first['count'], 105)
+                self.assertIsNone(first['previous'])
+                self.assertTrue(first['next'].endswith('?page=2'))
+                self.assertEqual([row['id'] for row in first['results']], self.ids[:10])
+
+                last = self.get(url, {'page': 'last'})
+                self.assertEqual([row['id'] for row in last['results']], self.ids[100:])
+                self.assertIsNone(last['next'])
+                self.assertTrue(last['previous'].endswith('page=10'))
+                self.assertEqual(self.client.get(url, {'page': 12}).status_code, 404)
+
+    def test_page_size_is_capped(self):
+        for params in ({}, {'pagination': 'cursor'}):
+            for name in ('profile-list', 'async-profile-list'):
+                with self.subTest(view=name, **params):
+                    url = reverse(name)
+                    self.assertEqual(len(self.get(url, {**params, 'page_size': 5})['results']), 5)
+                    self.assertEqual(len(self.get(url, {**params, 'page_size': 1000})['results']), 100)
+
+    def test_cursor_walks_every_profile_once(self):
+        for name in ('profile-list', 'async-profile-list'):
+            with self.subTest(view=name):
+                page = self.get(reverse(name), {'pagination': 'cursor', 'page_size': 20})
+                self.assertEqual(list(page), ['next', 'previous', 'results'])
+                self.assertIsNone(page['previous'])
+                first_ids = [row['id'] for row in page['results']]
+                seen = list(first_ids)
+                pages = [page]
+                while page['next']:
+                    page = self.get(page['next'])
+                    pages.append(page)
+                    seen.extend(row['id'] for row in page['results'])
+                self.assertEqual(seen, self.ids)
+                self.assertEqual(len(pages), 6)
+
+                back = self.get(pages[1]['previous'])
+                self.assertEqual([row['id'] for row in back['results']], first_ids)
+
+        response = self.client.get(reverse('profile-list'), {'pagination': 'cursor', 'cursor': 'bogus'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_follows_the_requested_ordering(self):
+        page = self.get(reverse('profile-list'), {'pagination': 'cursor', 'ordering': '-created_at', 'page_size': 60})
+        page = self.get(page['next'])
+        self.assertEqual([row['id'] for row in page['results']], self.ids[::-1][60:])
+
+
+class ProfileValuesReaderTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user_type = UserType.objects.create(name='type', description='type')
+        roles = [UserRole.objects.create(name=f'role-{i}', description='role') for i in range(3)]
+        above_mask = UserRole.objects.create(id=MASK_ROLE_LIMIT + 8, name='above-mask', description='role')
+
+        full = Profile.objects.create(
+            user=User.objects.create_user(username='full', email='full@example.com', first_name='Ada', last_name='Ç'),
+            user_type=user_type, phone_number='5551112233', profile_picture='profile_pictures/full.jpg',
+        )
+        full.user_roles.set([roles[2], roles[0]])
+        bare = Profile.objects.create(user=User.objects.create_user(username='bare'), user_type=None)
+        overflow = Profile.objects.create(user=User.objects.create_user(username='overflow'), user_type=user_type)
+        overflow.user_roles.set([above_mask, roles[1]])
+        cls.profile_ids = [full.pk, bare.pk, overflow.pk]
+
+    def setUp(self):
+        user_type_cache.clear()
+        user_role_cache.clear()
+
+    def assertSameBytes(self, fields=None, expand=None, request=None):
+        context = {'request': request} if request is not None else {}
+        queryset = ProfileSerializer.setup_eager_loading(Profile.objects.filter(pk__in=self.profile_ids), fields, expand)
+        expected = JSONRenderer().render(
+            ProfileSerializer(queryset.order_by('id'), many=True, fields=fields, expand=expand, context=context).data
+        )
+        reader = ProfileValuesReader(fields, expand, context)
+        rows = list(reader.get_queryset().filter(pk__in=self.profile_ids).order_by('id'))
+        self.assertEqual(JSONRenderer().render(reader.serialize(rows)), expected)
+        self.assertEqual(JSONRenderer().render(async_to_sync(reader.aserialize)(rows)), expected)
+
+    def test_output_matches_the_serializer(self):
+        # The last profile's roles come from the through table, not the mask.
+        self.assertTrue(Profile.objects.get(pk=self.profile_ids[2]).role_mask & OVERFLOW_BIT)
+        for fields, expand in (
+            (None, None),
+            (None, []),
+            (None, ['user_roles']),
+            (['id', 'user_roles'], None),
+            (['user', 'user_type', 'profile_picture', 'phone_number'], ['user_type']),
+            (['id'], []),
+        ):
+            with self.subTest(fields=fields, expand=expand):
+                self.assertSameBytes(fields, expand)
+
+    def test_picture_urls_use_the_request(self):
+        self.assertSameBytes(request=RequestFactory().get('/api/profiles/'))
+
+
+class ProfileUpsertTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_type = UserType.objects.create(name='type', description='type')
+        cls.roles = [UserRole.objects.create(name=f'role-{i}', description='role') for i in range(3)]
+        cls.admin = User.objects.create_user(username='admin', password='admin-password', is_staff=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('profile-upsert')
+
+    def row(self, i, role_ids, **extra):
+        return {
+            'username': f'sync-{i}', 'email': f'sync-{i}@example.com', 'first_name': 'Sync',
+            'last_name': str(i), 'phone_number': f'555{i:07d}', 'user_type_id': self.user_type.pk,
+            'user_role_ids': role_ids, **extra,
+        }
+
+    def upsert(self, data):
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_upsert_creates_then_updates(self):
+        created = self.upsert(self.row(1, [self.roles[0].pk, self.roles[1].pk], password='first-password'))
+        profile = Profile.objects.get(pk=created['profile_id'])
+
+        updated = self.upsert(self.row(1, [self.roles[1].pk, self.roles[2].pk], email='new@example.com'))
+        self.assertEqual(updated, created)
+        profile.refresh_from_db()
+        self.assertEqual(profile.user.email, 'new@example.com')
+        self.assertTrue(profile.user.check_password('first-password'))
+        self.assertEqual(
+            list(profile.user_roles.order_by('id').values_list('id', flat=True)),
+            [self.roles[1].pk, self.roles[2].pk],
+        )
+        self.assertEqual(profile.role_mask, build_mask([self.roles[1].pk, self.roles[2].pk]))
+
+    def test_upsert_query_count_does_not_grow_with_rows(self):
+        roles = [self.roles[0].pk]
+        self.upsert([self.row(0, roles)])
+        # Auth is forced and the reference ids are cached, so these are the
+        # upsert's own statements: savepoint, existing user SELECT, user and
+        # profile INSERT ... ON CONFLICT, link SELECT, link INSERT, role mask
+        # UPDATE, search index, release.
+        with self.assertNumQueries(9):
+            self.upsert([self.row(i, roles) for i in range(1, 51)])
+        # Updating with unchanged roles skips the link writes and the mask.
+        with self.assertNumQueries(7):
+            self.upsert([self.row(i, roles) for i in range(1, 51)])
+        self.assertEqual(Profile.objects.filter(user__username__startswith='sync-').count(), 51)
+
+    def test_upsert_rejects_invalid_rows(self):
+        response = self.client.post(self.url, [self.row(1, [self.roles[0].pk])] * 2, format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.url, [self.row(1, [999])], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('user_role_ids', response.json()['details'][0])
+        self.assertFalse(User.objects.filter(username='sync-1').exists())
+
+    def test_upsert_is_admin_only_and_never_writes_staff(self):
+        member = User.objects.create_user(username='member', password='member-password')
+        self.client.force_authenticate(member)
+        response = self.client.post(self.url, self.row(1, [self.roles[0].pk]), format='json')
+        self.assertEqual(response.status_code, 403)
+
+        self.client.force_authenticate(self.admin)
+        row = self.row(1, [self.roles[0].pk], username='admin', password='taken-over')
+        response = self.client.post(self.url, [self.row(2, [self.roles[0].pk]), row], format='json')
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['usernames'], ['admin'])
+        self.admin.refresh_from_db()
+        self.assertTrue(self.admin.check_password('admin-password'))
+        self.assertFalse(User.objects.filter(username='sync-2').exists())
+
+    @override_settings(SIGNED_TOKENS={'ENABLED': True})
+    def test_password_change_ends_sessions(self):
+        created = self.upsert(self.row(1, [self.roles[0].pk], password='first-password'))
+        user = User.objects.get(pk=created['user_id'])
+        token = Token.objects.create(user=user)
+        self.upsert(self.row(1, [self.roles[0].pk]))
+        self.assertTrue(Token.objects.filter(pk=token.pk).exists())
+
+        self.upsert(self.row(1, [self.roles[0].pk], password='second-password'))
+        self.assertFalse(Token.objects.filter(user=user).exists())
+        self.assertEqual(TokenRevocation.objects.get(user_id=user.pk).min_version, 1)
+
+    @override_settings(PROFILE_UPSERT_MAX_PASSWORDS=2)
+    def test_password_rows_are_capped(self):
+        rows = [self.row(i, [self.roles[0].pk], password=f'password-{i}') for i in range(3)]
+        response = self.client.post(self.url, rows, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.upsert(rows[:2] + [self.row(2, [self.roles[0].pk])])
+
+
+class ProfileImportTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_type = UserType.objects.create(name='type', description='type')
+        cls.roles = [UserRole.objects.create(name=f'role-{i}', description='role') for i in range(2)]
+        User.objects.create_user(username='taken')
+
+    def row(self, i, **extra):
+        return {
+            'username': f'imported-{i}', 'email': f'imported-{i}@example.com', 'phone_number': f'555{i:07d}',
+            'user_type_id': self.user_type.pk, 'user_role_ids': [self.roles[0].pk], **extra,
+        }
+
+    def ndjson(self, *lines):
+        return io.StringIO(''.join((line if isinstance(line, str) else json.dumps(line)) + '\n' for line in lines))
+
+    def test_ndjson_rows_report_errors_per_line(self):
+        report = import_profiles(self.ndjson(
+            self.row(1, user_role_ids=[role.pk for role in self.roles]),
+            '{not json',
+            self.row(2, user_role_ids=[999]),
+            self.row(1),
+            self.row(3, username='taken'),
+            self.row(4, password='plain', password_hash=make_password('hashed')),
+            self.row(5, password_hash='not-a-hash'),
+        ), NDJSON)
+
+        self.assertEqual((report['created'], report['failed']), (1, 6))
+        errors = {error['line']: error['errors'] for error in report['errors']}
+        self.assertEqual(sorted(errors), [2, 3, 4, 5, 6, 7])
+        self.assertIn('non_field_errors', errors[2])
+        self.assertIn('user_role_ids', errors[3])
+        self.assertIn('username', errors[4])
+        self.assertIn('username', errors[5])
+        self.assertIn('non_field_errors', errors[6])
+        self.assertIn('password_hash', errors[7])
+        profile = Profile.objects.get(user__username='imported-1')
+        self.assertEqual(sorted(profile.user_roles.values_list('pk', flat=True)), [role.pk for role in self.roles])
+        self.assertEqual(profile.role_mask, build_mask([role.pk for role in self.roles]))
+        self.assertFalse(profile.user.has_usable_password())
+
+    def test_csv_rows(self):
+        roles = ';'.join(str(role.pk) for role in self.roles)
+        stream = io.StringIO(
+            'username,email,first_name,phone_number,user_type_id,user_role_ids\r\n'
+            f'csv-1,csv-1@example.com,Csv,5550000001,{self.user_type.pk},{roles}\r\n'
+            f'csv-2,not-an-email,Csv,5550000002,{self.user_type.pk},{self.roles[1].pk}\r\n'
+        )
+        report = import_profiles(stream, CSV)
+
+        self.assertEqual((report['created'], report['failed']), (1, 1))
+        self.assertEqual(report['errors'][0]['line'], 3)
+        self.assertIn('email', report['errors'][0]['errors'])
+        profile = Profile.objects.get(user__username='csv-1')
+        self.assertEqual(profile.user.first_name, 'Csv')
+        self.assertEqual(sorted(profile.user_roles.values_list('pk', flat=True)), [role.pk for role in self.roles])
+
+    def test_passwords_are_stored_or_hashed_on_the_import_pool(self):
+        self.addCleanup(import_hash_pool.shutdown)
+        encoded = make_password('pre-hashed')
+        # The login pool is never touched, so imports cannot queue ahead of logins.
+        with mock.patch.object(password_hash_pool, '_get_executor', side_effect=AssertionError):
+            report = import_profiles(self.ndjson(
+                self.row(1, password_hash=encoded),
+                self.row(2, password='plain-password'),
+            ), NDJSON)
+
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(User.objects.get(username='imported-1').password, encoded)
+        self.assertTrue(User.objects.get(username='imported-2').check_password('plain-password'))
+
+    def test_failed_chunk_is_rolled_back_alone(self):
+        with mock.patch('api.importers.index_profiles', side_effect=[None, IntegrityError('conflict'), None]):
+            report = import_profiles(self.ndjson(*[self.row(i) for i in range(1, 6)]), NDJSON, chunk_size=2)
+
+        self.assertEqual((report['created'], report['failed']), (3, 2))
+        self.assertEqual([error['line'] for error in report['errors']], [3, 4])
+        self.assertEqual(
+            sorted(User.objects.filter(username__startswith='imported-').values_list('username', flat=True)),
+            ['imported-1', 'imported-2', 'imported-5'],
+        )
+        self.assertEqual(Profile.objects.filter(user__username__startswith='imported-').count(), 3)
+        self.assertFalse(Profile.user_roles.through.objects.filter(profile__user__username='imported-3').exists())
+
+
+class ProfileExportTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_type = UserType.objects.create(name='Öğrenci', description='type')
+        roles = [UserRole.objects.create(name=f'rol, {i}', description='role') for i in range(2)]
+        for i in range(5):
+            user = User.objects.create_user(
+                username=f'user-{i}', email=f'user-{i}@example.com', first_name='Çağla', last_name=f'"Şen", {i}',
+            )
+            profile = Profile.objects.create(
+                user=user, user_type=cls.user_type if i % 2 else None, phone_number=f'555000000{i}' if i else None,
+            )
+            profile.user_roles.set(roles[:i % 3])
+        cls.user = User.objects.get(username='user-0')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def export(self, file_format):
+        response = self.client.get(reverse('profile-export'), {'file_format': file_format})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response
+
+    def expected(self):
+        profiles = Profile.objects.select_related('user', 'user_type').prefetch_related('user_roles').order_by('id')
+        return json.loads(json.dumps(ProfileSerializer(profiles, many=True).data))
+
+    def test_ndjson_rows_match_the_serializer(self):
+        response = self.export(NDJSON)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="profiles.ndjson"')
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual([json.loads(line) for line in body.splitlines()], self.expected())
+
+    def test_csv_columns_match_the_serializer(self):
+        response = self.export(CSV)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0], list(CSV_COLUMNS))
+        self.assertEqual(len(rows), 6)
+        for row, expected in zip(rows[1:], self.expected()):
+            row = dict(zip(CSV_COLUMNS, row))
+            user, user_type = expected['user'], expected['user_type'] or {}
+            self.assertEqual(row, {
+                'id': str(expected['id']),
+                'username': user['username'],
+                'email': user['email'],
+                'first_name': user['first_name'],
+                'last_name': user['last_name'],
+                'phone_number': expected['phone_number'] or '',
+                'profile_picture': expected['profile_picture'] or '',
+                'user_type_id': str(user_type.get('id', '')),
+                'user_type_name': user_type.get('name', ''),
+                'user_role_ids': ';'.join(str(role['id']) for role in expected['user_roles']),
+                'user_role_names': ';'.join(role['name'] for role in expected['user_roles']),
+                'created_at': expected['created_at'],
+                'updated_at': expected['updated_at'],
+            })
+
+    @override_settings(PROFILE_EXPORT_CHUNK_SIZE=2)
+    def test_export_is_streamed_one_chunk_at_a_time(self):
+        chunks = iter(self.export(NDJSON).streaming_content)
+        # Profiles are only read as the body is consumed: a page and its roles per chunk.
+        with self.assertNumQueries(2):
+            first = next(chunks)
+        self.assertEqual(len(first.splitlines()), 2)
+        self.assertEqual([len(chunk.splitlines()) for chunk in chunks], [2, 1])
+
+    def test_unknown_format_is_rejected(self):
+        response = self.client.get(reverse('profile-export'), {'file_format': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ProfilePictureDerivativeTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.name = 'profile_pictures/avatar.png'
+        buffer = io.BytesIO()
+        Image.new('RGBA', (400, 200), (200, 30, 30, 128)).save(buffer, format='PNG')
+        default_storage.save(self.name, ContentFile(buffer.getvalue()))
+
+    def open_derivative(self, spec_name):
+        spec = next(spec for spec in get_derivative_specs() if spec['name'] == spec_name)
+        with default_storage.open(derivative_name(self.name, spec)) as file:
+            image = Image.open(file)
+            image.load()
+        return image
+
+    def test_derivatives_are_written_in_each_size_and_format(self):
+        self.assertEqual(generate_derivatives(self.name), 3)
+        thumb = self.open_derivative('thumb_64')
+        self.assertEqual((thumb.format, thumb.mode, thumb.size), ('JPEG', 'RGB', (64, 32)))
+        self.assertEqual(self.open_derivative('thumb_256').size, (256, 128))
+        self.assertEqual(self.open_derivative('webp_256').format, 'WEBP')
+
+    def test_up_to_date_derivatives_are_skipped_unless_forced(self):
+        generate_derivatives(self.name)
+        self.assertEqual(generate_derivatives(self.name), 0)
+        self.assertEqual(generate_derivatives(self.name, force=True), 3)
+
+    def test_serializer_lists_derivative_urls(self):
+        profile = Profile.objects.create(user=User.objects.create_user(username='pictured'), profile_picture=self.name)
+        plain = Profile.objects.create(user=User.objects.create_user(username='plain'))
+        self.assertEqual(ProfileSerializer(profile).data['profile_picture_derivatives'], {
+            'thumb_64': '/media/profile_pictures/derivatives/avatar_png_thumb_64.jpg',
+            'thumb_256': '/media/profile_pictures/derivatives/avatar_png_thumb_256.jpg',
+            'webp_256': '/media/profile_pictures/derivatives/avatar_png_webp_256.webp',
+        })
+        self.assertIsNone(ProfileSerializer(plain).data['profile_picture_derivatives'])
+
+    def test_saving_a_picture_schedules_its_derivatives(self):
+        user = User.objects.create_user(username='pictured')
+        with mock.patch('api.signals.schedule_derivatives') as schedule:
+            with self.captureOnCommitCallbacks(execute=True):
+                Profile.objects.create(user=user, profile_picture=self.name)
+        schedule.assert_called_once_with(self.name)
+
+    def test_command_generates_missing_derivatives_and_regenerates_with_force(self):
+        Profile.objects.create(user=User.objects.create_user(username='pictured'), profile_picture=self.name)
+        Profile.objects.create(user=User.objects.create_user(username='plain'))
+
+        def run(*args):
+            out = io.StringIO()
+            call_command('generate_profile_pictures', '--workers', '1', *args, stdout=out)
+            return out.getvalue().strip()
+
+        self.assertEqual(run(), '1 pictures checked, 3 derivatives written, 0 failed')
+        self.assertEqual(run(), '1 pictures checked, 0 derivatives written, 0 failed')
+        default_storage.delete(derivative_name(self.name, get_derivative_specs()[0]))
+        self.assertEqual(run(), '1 pictures checked, 1 derivatives written, 0 failed')
+        self.assertEqual(run('--force'), '1 pictures checked, 3 derivatives written, 0 failed')
+
+
+class ProfileFragmentCacheTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_type = UserType.objects.create(name='type', description='type')
+        cls.roles = [UserRole.objects.create(name=f'role-{i}', description='role') for i in range(2)]
+        cls.admin = User.objects.create_user(username='admin', first_name='Admin')
+        cls.profile = Profile.objects.create(user=cls.admin, user_type=cls.user_type)
+        cls.profile.user_roles.set(cls.roles)
+
+    def setUp(self):
+        profile_fragment_cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+        self.url = reverse('profile-detail', args=[self.profile.pk])
+
+    def test_detail_is_served_from_cache(self):
+        first = self.client.get(self.url).content
+        # One query for the profile row; roles and serialization are skipped.
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url).content, first)
+        self.assertEqual(profile_fragment_cache.stats()['hits'], 1)
+
+    def test_related_changes_invalidate_fragments(self):
+        self.client.get(self.url)
+        self.admin.first_name = 'Renamed'
+        self.admin.save()
+        self.assertEqual(self.client.get(self.url).json()['user']['first_name'], 'Renamed')
+
+        self.profile.user_roles.remove(self.roles[0])
+        self.assertEqual([role['id'] for role in self.client.get(self.url).json()['user_roles']], [self.roles[1].pk])
+
+        self.roles[1].name = 'renamed-role'
+        self.roles[1].save()
+        self.assertEqual(self.client.get(self.url).json()['user_roles'][0]['name'], 'renamed-role')
+
+        self.user_type.name = 'renamed-type'
+        self.user_type.save()
+        self.assertEqual(self.client.get(self.url).json()['user_type']['name'], 'renamed-type')
+        self.assertEqual(profile_fragment_cache.stats()['hits'], 0)
+
+    def test_list_joins_cached_and_new_fragments(self):
+        url = reverse('profile-list')
+        self.client.get(url)
+        other = Profile.objects.create(user=User.objects.create_user(username='other'), user_type=self.user_type)
+        results = self.client.get(url).json()['results']
+        self.assertEqual([item['id'] for item in results], [self.profile.pk, other.pk])
+        stats = profile_fragment_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+
+class StoredSchemaTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.settings_override = override_settings(
+            API_SCHEMA={'MODE': 'stored', 'DIR': self.directory, 'CODE_VERSION': 'test'}
+        )
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        schema.code_version.cache_clear()
+        self.addCleanup(schema.code_version.cache_clear)
+        schema._loaded.clear()
+        self.addCleanup(schema._loaded.clear)
+
+    def get(self, accept_encoding):
+        request = RequestFactory().get('/swagger.json', HTTP_ACCEPT_ENCODING=accept_encoding)
+        return schema.StoredSchemaView.as_view()(request, format='.json')
+
+    def test_gzip_follows_q_values(self):
+        for header, gzipped in (
+            ('gzip', True),
+            ('br, gzip;q=0.5', True),
+            ('*', True),
+            ('gzip;q=0', False),
+            ('gzip;q=0, deflate', False),
+            ('identity', False),
+        ):
+            with self.subTest(header=header):
+                response = self.get(header)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.headers.get('Content-Encoding') == 'gzip', gzipped)
+                content = gzip.decompress(response.content) if gzipped else response.content
+                self.assertIn('"paths"', content.decode())
+
+    def test_missing_gzip_copy_is_regenerated(self):
+        paths = schema.write_schema()
+        paths[0].with_name(f'{paths[0].name}.gz').unlink()
+        stored = schema.get_stored_schema('json')
+        self.assertEqual(gzip.decompress(stored.gzipped), stored.content)
+        self.assertTrue(paths[0].with_name(f'{paths[0].name}.gz').exists())
+
+
+class CompressionMiddlewareTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin')
+        roles = [UserRole.objects.create(name=f'role-{i}', description='role ' * 20) for i in range(20)]
+        for i in range(3):
+            profile = Profile.objects.create(user=User.objects.create_user(username=f'user-{i}'))
+            profile.user_roles.set(roles)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_gzip_is_negotiated(self):
+        plain = self.client.get(reverse('user-role-list'))
+        self.assertNotIn('Content-Encoding', plain.headers)
+        response = self.client.get(reverse('user-role-list'), HTTP_ACCEPT_ENCODING='br;q=0, gzip;q=0.5')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+
+    def test_small_responses_are_not_compressed(self):
+        response = self.client.get(reverse('user-type-list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    def test_streaming_response_is_compressed_per_chunk(self):
+        response = self.client.get(reverse('profile-export'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        body = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(len(body.splitlines()), 3)
+
+
+INSTRUMENTATION = {'ENABLED': True, 'SERVER_TIMING': True, 'SLOW_REQUEST_MS': 60000, 'N_PLUS_ONE_THRESHOLD': 5}
+
+
+@override_settings(SQL_INSTRUMENTATION=INSTRUMENTATION)
+class QueryInstrumentationMiddlewareTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin')
+        for i in range(3):
+            UserRole.objects.create(name=f'role-{i}', description='role')
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def server_timing(self, response):
+        segments = {}
+        for segment in response.headers['Server-Timing'].split(', '):
+            name, duration = segment.split(';')[:2]
+            segments[name] = float(duration.removeprefix('dur='))
+        return segments
+
+    def run_middleware(self, view):
+        middleware = QueryInstrumentationMiddleware(lambda request: view())
+        return middleware(RequestFactory().get('/api/user-roles/'))
+
+    def test_server_timing_header_reports_every_segment(self):
+        response = self.client.get(reverse('user-role-list'))
+        segments = self.server_timing(response)
+        self.assertEqual(list(segments), ['db', 'serialize', 'render', 'app', 'total'])
+        self.assertGreater(segments['serialize'], 0)
+        self.assertGreater(segments['render'], 0)
+        self.assertIn('queries"', response.headers['Server-Timing'])
+
+    def test_serializer_time_is_counted_as_serialize(self):
+        def view():
+            with mock.patch.object(UserRoleSerializer, 'to_representation', side_effect=lambda obj: time.sleep(0.02)):
+                UserRoleSerializer(UserRole.objects.all(), many=True).data
+            return JsonResponse({})
+
+        segments = self.server_timing(self.run_middleware(view))
+        self.assertGreaterEqual(segments['serialize'], 60)
+        self.assertLess(segments['app'], 60)
+
+    def test_queries_while_serializing_are_counted_as_db(self):
+        def view():
+            connection.ensure_connection()
+            connection.connection.create_function('pause', 0, lambda: time.sleep(0.05))
+            with serializing(), connection.cursor() as cursor:
+                cursor.execute('SELECT pause()')
+            return JsonResponse({})
+
+        segments = self.server_timing(self.run_middleware(view))
+        self.assertGreaterEqual(segments['db'], 50)
+        self.assertLess(segments['serialize'], 50)
+
+    def test_repeated_queries_are_reported_as_n_plus_one(self):
+        def view():
+            for role in UserRole.objects.order_by('pk'):
+                UserRole.objects.filter(pk=role.pk).exists()
+            return JsonResponse({})
+
+        with override_settings(SQL_INSTRUMENTATION={**INSTRUMENTATION, 'N_PLUS_ONE_THRESHOLD': 3}):
+            with self.assertLogs('api.performance', 'WARNING') as logs:
+                self.run_middleware(view)
+        self.assertEqual(len(logs.records), 1)
+        entry = json.loads(logs.records[0].args[0])
+        self.assertEqual(entry['queries'], 4)
+        self.assertEqual([statement['count'] for statement in entry['repeated']], [3])
+
+    def test_distinct_queries_are_not_reported(self):
+        with self.assertNoLogs('api.performance', 'WARNING'):
+            self.client.get(reverse('user-role-list'))
+
+    def test_slow_requests_are_logged(self):
+        with override_settings(SQL_INSTRUMENTATION={**INSTRUMENTATION, 'SLOW_REQUEST_MS': 0}):
+            with self.assertLogs('api.performance', 'WARNING') as logs:
+                APIClient().get(reverse('user-role-list'))
+        self.assertIn('slow request', logs.output[0])
+        entry = json.loads(logs.records[0].args[0])
+        self.assertEqual(entry['path'], reverse('user-role-list'))
+        self.assertEqual(entry['status'], 401)
+        self.assertLessEqual({'db_ms', 'serialize_ms', 'render_ms', 'total_ms'}, set(entry))
+
+
+class AsyncReadViewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_type = UserType.objects.create(name='type', description='type')
+        cls.role = UserRole.objects.create(name='role', description='role')
+        user = User.objects.create_user(username='reader', email='reader@example.com', first_name='Okur')
+        cls.profile = Profile.objects.create(user=user, user_type=cls.user_type, phone_number='5551112233')
+        cls.profile.user_roles.set([cls.role])
+        cls.token = Token.objects.create(user=user)
+
+    def setUp(self):
+        profile_fragment_cache.clear()
+        user_type_cache.clear()
+        user_role_cache.clear()
+        self.client = APIClient()
+
+    def get_both(self, name, args=(), params=None, authenticated=True):
+        """Returns the sync and the async response for the same request."""
+        headers = {'Authorization': f'Token {self.token.key}'} if authenticated else {}
+        return [
+            self.client.get(reverse(prefix + name, args=args), params, headers=headers)
+            for prefix in ('', 'async-')
+        ]
+
+    def assertSameResponse(self, name, args=(), params=None, authenticated=True, status=200):
+        sync, async_ = self.get_both(name, args, params, authenticated)
+        self.assertEqual((sync.status_code, async_.status_code), (status, status), async_.content)
+        self.assertEqual(async_['Content-Type'], sync['Content-Type'])
+        self.assertEqual(async_.content, sync.content)
+        return async_
+
+    def test_anonymous_requests_get_401(self):
+        for name, args in (
+            ('profile-list', ()), ('profile-detail', (self.profile.pk,)),
+            ('user-type-list', ()), ('user-type-detail', (self.user_type.pk,)),
+            ('user-role-list', ()), ('user-role-detail', (self.role.pk,)),
+        ):
+            with self.subTest(name=name):
+                response = self.assertSameResponse(name, args, authenticated=False, status=401)
+                self.assertEqual(response['WWW-Authenticate'], 'Token')
+
+    def test_responses_match_the_sync_views(self):
+        for name, args in (
+            ('profile-list', ()), ('profile-detail', (self.profile.pk,)),
+            ('user-type-list', ()), ('user-type-detail', (self.user_type.pk,)),
+            ('user-role-list', ()), ('user-role-detail', (self.role.pk,)),
+        ):
+            with self.subTest(name=name):
+                self.assertSameResponse(name, args)
+
+    def test_missing_pk_gets_404(self):
+        for name in ('profile-detail', 'user-type-detail', 'user-role-detail'):
+            with self.subTest(name=name):
+                self.assertSameResponse(name, (999999,), status=404)
+
+    def test_fieldsets(self):
+        for name, args in (('profile-list', ()), ('profile-detail', (self.profile.pk,))):
+            for params in ({'fields': 'id,user,user_roles'}, {'fields': 'user', 'expand': ''}, {'expand': 'user_type'}):
+                with self.subTest(name=name, **params):
+                    self.assertSameResponse(name, args, params)
+            for params in ({'fields': 'bogus'}, {'expand': 'bogus'}, {'fields': 'id,bogus', 'expand': 'phone_number'}):
+                with self.subTest(name=name, **params):
+                    response = self.assertSameResponse(name, args, params, status=400)
+                    self.assertEqual(set(response.json()), set(params))
+
+
+@override_settings(AUTH_THROTTLE={'ENABLED': False})
+class AsyncLoginTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='async-user', password='async-password')
+
+    def setUp(self):
+        self.addCleanup(password_hash_pool.shutdown)
+
+    def login(self, username, password):
+        return self.client.post(
+            reverse('async-login'), {'username': username, 'password': password}, content_type='application/json'
+        )
+
+    def test_password_is_checked_on_the_pool(self):
+        with mock.patch.object(password_hash_pool, 'run', wraps=password_hash_pool.run) as run:
+            response = self.login('async-user', 'async-password')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['user_id'], self.user.pk)
+        self.assertEqual([call.args[0].__name__ for call in run.call_args_list], ['_check_password'])
+
+    def test_rejections_go_through_the_backends(self):
+        failures = []
+
+        def record(sender, credentials, **kwargs):
+            failures.append(credentials)
+
+        user_login_failed.connect(record)
+        self.addCleanup(user_login_failed.disconnect, record)
+        self.assertEqual(self.login('async-user', 'wrong-password').status_code, 401)
+        self.assertEqual(self.login('nobody', 'wrong-password').status_code, 401)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.login('async-user', 'async-password').status_code, 401)
+
+        self.assertEqual([credentials['username'] for credentials in failures], ['async-user', 'nobody', 'async-user'])
+        self.assertNotIn('wrong-password', [credentials['password'] for credentials in failures])
+
+    def test_outdated_hash_is_upgraded(self):
+        User.objects.filter(pk=self.user.pk).update(password=make_password('async-password', hasher='pbkdf2_sha1'))
+        self.assertEqual(self.login('async-user', 'async-password').status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('pbkdf2_sha256$'))
+        self.assertTrue(self.user.check_password('async-password'))
+
+    @override_settings(PASSWORD_HASH_POOL={'WORKERS': 1, 'MAX_QUEUE': 0})
+    def test_full_queue_returns_503(self):
+        with mock.patch.object(password_hash_pool, 'pending', 1):
+            response = self.login('async-user', 'async-password')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+
+class AuthThrottleTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        throttle = override_settings(AUTH_THROTTLE={
+            'PATH': Path(directory.name) / 'throttle.sqlite3',
+            'RATES': {'login': {'ip': '10/min', 'username': '3/min'}, 'register': {'ip': '2/hour'}},
+        })
+        throttle.enable()
+        self.addCleanup(throttle.disable)
+        self.client = APIClient()
+
+    def login(self, username, **headers):
+        return self.client.post(
+            reverse('login'), {'username': username, 'password': 'wrong'}, format='json', headers=headers
+        )
+
+    def test_username_is_throttled_before_authenticate(self):
+        with mock.patch('api.views.authenticate', return_value=None) as authenticate:
+            self.assertEqual([self.login('victim').status_code for _ in range(4)], [401, 401, 401, 429])
+            self.assertEqual(authenticate.call_count, 3)
+            response = self.login('someone-else')
+        self.assertEqual(response.status_code, 401)
+
+    def test_ip_is_throttled_across_usernames(self):
+        with mock.patch('api.views.authenticate', return_value=None):
+            statuses = [self.login(f'user-{i}').status_code for i in range(11)]
+        self.assertEqual(statuses, [401] * 10 + [429])
+        response = self.login('user-0')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response.headers['Retry-After']), 0)
+
+    @override_settings(REST_FRAMEWORK={})
+    def test_forwarded_for_is_ignored_without_trusted_proxies(self):
+        with mock.patch('api.views.authenticate', return_value=None):
+            statuses = [
+                self.login(f'user-{i}', x_forwarded_for=f'198.51.100.{i}').status_code for i in range(11)
+            ]
+        self.assertEqual(statuses, [401] * 10 + [429])
+
+    @override_settings(REST_FRAMEWORK={'NUM_PROXIES': 1})
+    def test_trusted_proxy_address_is_used(self):
+        with mock.patch('api.views.authenticate', return_value=None):
+            statuses = [
+                self.login(f'user-{i}', x_forwarded_for=f'198.51.100.{i}, 203.0.113.7').status_code
+                for i in range(11)
+            ]
+            self.assertEqual(statuses, [401] * 10 + [429])
+            response = self.login('user-0', x_forwarded_for='203.0.113.8')
+        self.assertEqual(response.status_code, 401)
+
+    def test_register_is_throttled_per_ip(self):
+        statuses = [self.client.post(reverse('register'), {}, format='json').status_code for _ in range(3)]
+        self.assertEqual(statuses, [400, 400, 429])
+
+
+@override_settings(
+    SIGNED_TOKENS={'ENABLED': True}, AUTH_THROTTLE={'ENABLED': False}, REFERENCE_CACHE={'ALIAS': 'default'},
+)
+class SignedTokenTestCase(TestCase):
+    def setUp(self):
+        # Revocation entries of rolled back rows would outlive the test otherwise.
+        caches['default'].clear()
+        self.user = User.objects.create_user(username='bearer', password='secret-pass-1')
+        self.profile = Profile.objects.create(
+            user=self.user, user_type=UserType.objects.create(name='t', description='t'), phone_number='5551112233'
+        )
+        self.client = APIClient()
+        response = self.client.post(
+            reverse('login'), {'username': 'bearer', 'password': 'secret-pass-1'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.tokens = response.json()
+
+    def get_user_types(self, token):
+        return self.client.get(reverse('user-type-list'), headers={'Authorization': f'Bearer {token}'})
+
+    def test_login_issues_bearer_pair(self):
+        self.assertEqual(self.tokens['token_type'], 'Bearer')
+        self.assertIn('refresh', self.tokens)
+        self.assertEqual(self.get_user_types(self.tokens['token']).status_code, 200)
+        # Warm caches: verifying the token needs no query.
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_user_types(self.tokens['token']).status_code, 200)
+
+    def test_refresh_token_is_not_an_access_token(self):
+        self.assertEqual(self.get_user_types(self.tokens['refresh']).status_code, 401)
+        response = self.client.post(reverse('token-refresh'), {'refresh': self.tokens['token']}, format='json')
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post(reverse('token-refresh'), {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_user_types(response.json()['token']).status_code, 200)
+
+    def test_logout_revokes_issued_tokens(self):
+        response = self.client.post(
+            reverse('logout'), headers={'Authorization': f"Bearer {self.tokens['token']}"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_user_types(self.tokens['token']).status_code, 401)
+        response = self.client.post(reverse('token-refresh'), {'refresh': self.tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 401)
+        # Logging in again issues tokens at the new version.
+        response = self.client.post(
+            reverse('login'), {'username': 'bearer', 'password': 'secret-pass-1'}, format='json'
+        )
+        self.assertEqual(self.get_user_types(response.json()['token']).status_code, 200)
+
+    def login(self):
+        response = self.client.post(
+            reverse('login'), {'username': 'bearer', 'password': 'secret-pass-1'}, format='json'
+        )
+        return response.json()
+
+    def logout(self, tokens):
+        return self.client.post(reverse('logout'), headers={'Authorization': f"Bearer {tokens['token']}"})
+
+    def refresh(self, tokens):
+        return self.client.post(reverse('token-refresh'), {'refresh': tokens['refresh']}, format='json')
+
+    def test_version_survives_prune(self):
+        self.logout(self.tokens)
+        tokens = self.login()
+        # The revocation has outlived every token it rejects; pruning must
+        # still keep the row of a user who exists.
+        TokenRevocation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        gone = User.objects.create_user(username='gone')
+        revoke_user_tokens([gone.pk])
+        gone.delete()
+        TokenRevocation.objects.filter(user_id=gone.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        caches['default'].clear()
+        revoke_user_tokens([User.objects.create_user(username='other').pk])
+        self.assertEqual(TokenRevocation.objects.get(user_id=self.user.pk).min_version, 1)
+        self.assertFalse(TokenRevocation.objects.filter(user_id=gone.pk).exists())
+
+        relogin = self.login()
+        self.assertEqual(self.refresh(relogin).status_code, 200)
+        self.assertEqual(self.logout(relogin).status_code, 200)
+        self.assertEqual(self.refresh(tokens).status_code, 401)
+        self.assertEqual(self.refresh(relogin).status_code, 401)
+        self.assertEqual(self.get_user_types(relogin['token']).status_code, 401)
+
+    def test_revocation_is_looked_up_per_user(self):
+        self.get_user_types(self.tokens['token'])
+        other = User.objects.create_user(username='other')
+        revoke_user_tokens([other.pk])
+        # Another user's logout does not reload anything for this one.
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_user_types(self.tokens['token']).status_code, 200)
+
+    def test_deleted_user_is_revoked(self):
+        admin = User.objects.create_user(username='admin', password='x', is_staff=True)
+        self.client.force_authenticate(admin)
+        response = self.client.delete(reverse('profile-detail', args=[self.profile.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.get_user_types(self.tokens['token']).status_code, 401)
+
+
+class SQLiteConnectionTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'pragmas.sqlite3'
+
+    def tearDown(self):
+        if hasattr(connections._connections, 'pragmas'):
+            del connections['pragmas']
+
+    def connect(self, **options):
+        default = connections['default']
+        settings_dict = {**default.settings_dict, 'NAME': self.path, 'OPTIONS': {**default.settings_dict['OPTIONS'], **options}}
+        wrapper = type(default)(settings_dict, alias='pragmas')
+        connections['pragmas'] = wrapper
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def write_lock_is_free(self):
+        other = sqlite3.connect(self.path, timeout=0, isolation_level=None)
+        try:
+            other.execute('BEGIN IMMEDIATE')
+            other.execute('ROLLBACK')
+            return True
+        except sqlite3.OperationalError:
+            return False
+        finally:
+            other.close()
+
+    def test_pragmas_are_applied_to_new_connections(self):
+        wrapper = self.connect()
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -64000)
+        self.assertEqual(self.pragma(wrapper, 'temp_store'), 2)
+
+    def test_database_pragmas_are_only_applied_by_servers(self):
+        self.assertEqual(self.pragma(self.connect(), 'journal_mode'), 'delete')
+        connections['pragmas'].close()
+        with mock.patch('api.signals.database_pragmas_enabled', True):
+            self.assertEqual(self.pragma(self.connect(), 'journal_mode'), 'wal')
+
+    def test_immediate_transaction_mode_takes_the_write_lock_up_front(self):
+        wrapper = self.connect(transaction_mode='IMMEDIATE')
+        wrapper.ensure_connection()
+        with transaction.atomic(using='pragmas'):
+            self.assertFalse(self.write_lock_is_free())
+        self.assertTrue(self.write_lock_is_free())
+
+    def test_pooled_connections_are_returned_on_close(self):
+        wrapper = self.connect(pool={'max_size': 1})
+        self.addCleanup(_pools.pop, (os.getpid(), ('pragmas', str(self.path))))
+        wrapper.ensure_connection()
+        raw = wrapper.connection
+        self.assertFalse(wrapper.reused_connection)
+        wrapper.close()
+        self.assertEqual(wrapper.pool.stats()['idle'], 1)
+        wrapper.ensure_connection()
+        self.assertIs(wrapper.connection, raw)
+        self.assertTrue(wrapper.reused_connection)
+
+    def test_deferred_transactions_wait_for_the_first_write(self):
+        wrapper = self.connect(transaction_mode=None)
+        wrapper.ensure_connection()
+        with transaction.atomic(using='pragmas'):
+            self.assertTrue(self.write_lock_is_free())
+
+
+class ConnectionPoolTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'pool.sqlite3'
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.addCleanup(connection.close)
+        return connection
+
+    def test_released_connections_are_reused(self):
+        pool = ConnectionPool(max_size=2)
+        first, reused = pool.acquire(self.connect)
+        self.assertFalse(reused)
+        self.assertEqual(pool.stats()['in_use'], 1)
+        pool.release(first)
+        self.assertEqual(pool.acquire(self.connect), (first, True))
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['checkouts'], stats['in_use'], stats['idle']), (1, 2, 1, 0))
+
+    def test_release_rolls_back_open_transactions(self):
+        pool = ConnectionPool(max_size=1)
+        connection, _ = pool.acquire(self.connect)
+        connection.execute('CREATE TABLE item (id INTEGER)')
+        connection.commit()
+        connection.execute('INSERT INTO item VALUES (1)')
+        pool.release(connection)
+        connection, _ = pool.acquire(self.connect)
+        self.assertFalse(connection.in_transaction)
+        self.assertEqual(connection.execute('SELECT COUNT(*) FROM item').fetchone()[0], 0)
+
+    def test_connections_failing_the_health_check_are_replaced(self):
+        pool = ConnectionPool(max_size=1)
+        broken, _ = pool.acquire(self.connect)
+        pool.release(broken)
+        broken.close()
+        connection, reused = pool.acquire(self.connect)
+        self.assertIsNot(connection, broken)
+        self.assertFalse(reused)
+        stats = pool.stats()
+        self.assertEqual((stats['created'], stats['discarded'], stats['size']), (2, 1, 1))
+
+    def test_exhausted_pool_times_out(self):
+        pool = ConnectionPool(max_size=1, timeout=0.05)
+        pool.acquire(self.connect)
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(self.connect)
+        stats = pool.stats()
+        self.assertEqual((stats['waits'], stats['timeouts'], stats['created']), (1, 1, 1))
+        self.assertGreaterEqual(stats['wait_ms_total'], 50)
+
+    def test_waiting_acquire_gets_the_released_connection(self):
+        pool = ConnectionPool(max_size=1, timeout=5)
+        connection, _ = pool.acquire(self.connect)
+        timer = threading.Timer(0.05, pool.release, [connection])
+        timer.start()
+        self.addCleanup(timer.join)
+        self.assertEqual(pool.acquire(self.connect), (connection, True))
+        self.assertEqual(pool.stats()['waits'], 1)
+
+    def test_pool_stats_view_is_admin_only(self):
+        pool = get_pool(('pool-test', str(self.path)), 3, 1.0)
+        self.addCleanup(_pools.pop, (os.getpid(), ('pool-test', str(self.path))))
+        pool.release(pool.acquire(self.connect)[0])
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.assertEqual(client.get(reverse('db-pool-stats')).status_code, 403)
+
+        client.force_authenticate(self.admin)
+        response = client.get(reverse('db-pool-stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('default', response.data['connections'])
+        stats = response.data['pools'][f'pool-test:{self.path}']
+        self.assertEqual((stats['max_size'], stats['size'], stats['idle'], stats['checkouts']), (3, 1, 1, 1))
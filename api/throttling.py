@@ -0,0 +1,185 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from rest_framework.exceptions import Throttled
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+
+logger = logging.getLogger(__name__)
+
+AUTH_THROTTLE_DEFAULTS = {
+    'ENABLED': True,
+    # SQLite file shared by every worker process on the host.
+    'PATH': Path(settings.BASE_DIR) / '.throttle.sqlite3',
+    # Token buckets per scope and key: '<requests>/<s|m|h|d>' allows a burst of
+    # <requests> and refills at that rate. A missing key is not throttled.
+    'RATES': {
+        'login': {'ip': '30/min', 'username': '5/min'},
+        'register': {'ip': '10/hour'},
+    },
+    # Buckets idle this long are full again and are deleted.
+    'PRUNE_AFTER': 86400,
+}
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS throttle_bucket (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    allowed INTEGER NOT NULL
+) WITHOUT ROWID
+"""
+
+# Refills the bucket for the time since its last use and takes one token if
+# there is one, in a single statement so concurrent workers never race
+# between the read and the write. SET expressions see the old row.
+CONSUME_SQL = """
+INSERT INTO throttle_bucket (key, tokens, updated_at, allowed) VALUES (:key, :capacity - 1, :now, 1)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = MIN(:capacity, tokens + MAX(:now - updated_at, 0) * :rate)
+             - (MIN(:capacity, tokens + MAX(:now - updated_at, 0) * :rate) >= 1),
+    updated_at = :now,
+    allowed = MIN(:capacity, tokens + MAX(:now - updated_at, 0) * :rate) >= 1
+RETURNING tokens, allowed
+"""
+
+# Consumes between deletes of idle buckets, per process.
+PRUNE_INTERVAL = 1000
+
+
+def get_auth_throttle_settings():
+    return {**AUTH_THROTTLE_DEFAULTS, **getattr(settings, 'AUTH_THROTTLE', {})}
+
+
+def parse_rate(rate):
+    """'5/min' -> (5, 60), with the same syntax as DRF's throttle rates."""
+    num, period = rate.split('/')
+    return int(num), PERIODS[period[0]]
+
+
+class ThrottleStore:
+    """
+    Token buckets in a SQLite file in WAL mode. Every consume() is one
+    autocommit UPSERT, so the write lock is held for microseconds and all
+    workers on the host share the counts. Connections are per thread and
+    reopened after a fork.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._consumed = 0
+
+    def _connect(self, path):
+        connection = sqlite3.connect(path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        connection.execute('PRAGMA journal_mode = WAL')
+        # Counters may lose the last writes on power loss; that only resets them.
+        connection.execute('PRAGMA synchronous = OFF')
+        connection.execute(SCHEMA_SQL)
+        return connection
+
+    def connection(self):
+        path = str(get_auth_throttle_settings()['PATH'])
+        local = self._local
+        if getattr(local, 'key', None) != (os.getpid(), path):
+            local.connection = self._connect(path)
+            local.key = (os.getpid(), path)
+        return local.connection
+
+    def consume(self, key, capacity, period):
+        """
+        Takes one token from the bucket for key. Returns 0 when allowed, or
+        the seconds until a token is available.
+        """
+        now = time.time()
+        rate = capacity / period
+        connection = self.connection()
+        tokens, allowed = connection.execute(
+            CONSUME_SQL, {'key': key, 'capacity': capacity, 'now': now, 'rate': rate}
+        ).fetchone()
+        self._consumed += 1
+        if self._consumed % PRUNE_INTERVAL == 0:
+            connection.execute(
+                'DELETE FROM throttle_bucket WHERE updated_at < ?',
+                [now - get_auth_throttle_settings()['PRUNE_AFTER']],
+            )
+        return 0.0 if allowed else (1 - tokens) / rate
+
+    def clear(self):
+        self.connection().execute('DELETE FROM throttle_bucket')
+
+
+throttle_store = ThrottleStore()
+
+
+def _bucket_key(scope, kind, ident):
+    # Usernames and addresses are not stored in the clear.
+    digest = hashlib.blake2b(ident.encode(), digest_size=16).hexdigest()
+    return f'{scope}:{kind}:{digest}'
+
+
+def client_ip(request):
+    """
+    The address the per-IP buckets are keyed on: REMOTE_ADDR, or with
+    REST_FRAMEWORK['NUM_PROXIES'] set, the X-Forwarded-For entry the trusted
+    proxies appended. Without a proxy count the header is client input, and a
+    new value per request would get a new bucket each time.
+    """
+    if api_settings.NUM_PROXIES:
+        return BaseThrottle().get_ident(request)
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def auth_throttle_wait(request, scope, username=None):
+    """
+    Consumes a token from the per-IP and per-username buckets of scope.
+    Returns None if the request may go on, otherwise the seconds to wait.
+    Works on Django and DRF requests; the store failing lets requests through.
+    """
+    config = get_auth_throttle_settings()
+    rates = config['RATES'].get(scope, {}) if config['ENABLED'] else {}
+    idents = {'ip': client_ip(request)}
+    if isinstance(username, str) and username.strip():
+        idents['username'] = username.strip().lower()
+
+    wait = 0.0
+    try:
+        for kind, ident in idents.items():
+            if kind in rates:
+                wait = max(wait, throttle_store.consume(_bucket_key(scope, kind, ident), *parse_rate(rates[kind])))
+    except sqlite3.Error:
+        logger.exception('auth throttle store unavailable; request allowed')
+        return None
+    return wait or None
+
+
+class AuthThrottled(Throttled):
+    default_detail = 'Çok fazla deneme yapıldı, lütfen daha sonra tekrar deneyin.'
+    extra_detail_singular = extra_detail_plural = '{wait} saniye sonra tekrar deneyebilirsiniz.'
+
+
+class AuthRateThrottle(BaseThrottle):
+    """
+    Per-IP and per-username token buckets for the view's throttle_scope
+    ('login', 'register'). DRF checks throttles in APIView.initial(), so a
+    rejected request never reaches authenticate() or the password hasher.
+    """
+
+    def allow_request(self, request, view):
+        try:
+            username = request.data.get('username')
+        except AttributeError:
+            username = None
+        self._wait = auth_throttle_wait(request, view.throttle_scope, username)
+        return self._wait is None
+
+    def wait(self):
+        return self._wait
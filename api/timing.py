@@ -0,0 +1,77 @@
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from rest_framework import serializers
+
+
+class SerializationTiming:
+    """
+    Serialization time of one request, filled in by serializing(). Queries
+    that run while serializing (lazy relations, prefetches) are added to
+    db_duration so the caller can report them as db rather than serialize.
+    """
+
+    def __init__(self):
+        self.duration = 0.0
+        self.db_duration = 0.0
+        self.depth = 0
+
+    @property
+    def active(self):
+        return self.depth > 0
+
+
+_current = ContextVar('serialization_timing', default=None)
+
+
+def start_serialization_timing():
+    """Starts timing for the current request; returns the timing and a reset token."""
+    timing = SerializationTiming()
+    return timing, _current.set(timing)
+
+
+def stop_serialization_timing(token):
+    _current.reset(token)
+
+
+def current_serialization_timing():
+    return _current.get()
+
+
+@contextmanager
+def serializing():
+    """Adds the time spent in the block to the request's serialize segment; nesting is counted once."""
+    timing = _current.get()
+    if timing is None:
+        yield
+        return
+    timing.depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing.depth -= 1
+        if not timing.depth:
+            timing.duration += time.perf_counter() - started
+
+
+def _timed_data(fget):
+    @functools.wraps(fget)
+    def data(self):
+        with serializing():
+            return fget(self)
+    data._serialization_timed = True
+    return data
+
+
+def instrument_serializers():
+    """
+    Times Serializer.data and ListSerializer.data, where DRF runs
+    to_representation, so views need no changes. Safe to call repeatedly.
+    """
+    for cls in (serializers.Serializer, serializers.ListSerializer):
+        prop = cls.__dict__['data']
+        if not getattr(prop.fget, '_serialization_timed', False):
+            cls.data = property(_timed_data(prop.fget))
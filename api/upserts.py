@@ -0,0 +1,138 @@
+from collections import defaultdict
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from api.models import Profile
+from api.rolemasks import refresh_role_masks
+from api.search import index_profiles
+from api.signed_tokens import revoke_user_tokens, signed_tokens_enabled
+
+
+USER_UPDATE_FIELDS = ['email', 'first_name', 'last_name']
+PROFILE_UPDATE_FIELDS = ['phone_number', 'user_type', 'updated_at']
+
+
+class ProtectedAccounts(Exception):
+    """Raised before any write when rows target staff or superuser accounts."""
+
+    def __init__(self, usernames):
+        super().__init__(usernames)
+        self.usernames = usernames
+
+
+class ProfileUpserter:
+    """
+    Creates or updates users and profiles keyed by username. Users and profiles
+    are each written with one INSERT ... ON CONFLICT DO UPDATE statement
+    (bulk_create(update_conflicts=True)) and role links are diffed against the
+    stored ones, all in one transaction, so the query count does not grow with
+    the number of rows. Rows are the validated data of ProfileImportRowSerializer;
+    a blank password and password_hash keep the stored one. No model signals are sent; the role
+    masks, search index and token cache are updated here instead.
+
+    Staff and superuser accounts are never written. Existing users whose
+    password is replaced lose their authtokens and signed tokens.
+    """
+
+    def upsert(self, rows):
+        # Hashed before the transaction so the write lock is not held meanwhile.
+        passwords = [row['password_hash'] or make_password(row['password'] or None) for row in rows]
+        with transaction.atomic():
+            found = list(
+                User.objects.filter(username__in=[row['username'] for row in rows])
+                .values_list('username', 'pk', 'is_staff', 'is_superuser')
+            )
+            protected = sorted(username for username, _, is_staff, is_superuser in found if is_staff or is_superuser)
+            if protected:
+                raise ProtectedAccounts(protected)
+            existing = {username: pk for username, pk, _, _ in found}
+            password_reset = [
+                existing[row['username']] for row in rows
+                if (row['password'] or row['password_hash']) and row['username'] in existing
+            ]
+            users = self.upsert_users(rows, passwords)
+            profiles = self.upsert_profiles(users, rows)
+            changed = self.sync_role_links(profiles, rows)
+            if changed:
+                refresh_role_masks(changed)
+            index_profiles([profile.pk for profile in profiles])
+
+            user_ids = [user.pk for user in users]
+
+            transaction.on_commit(lambda: token_cache.invalidate_users(user_ids))
+            if password_reset:
+                self.end_sessions(password_reset)
+        return [
+            {'username': user.username, 'user_id': user.pk, 'profile_id': profile.pk}
+            for user, profile in zip(users, profiles)
+        ]
+
+    def end_sessions(self, user_ids):
+        Token.objects.filter(user_id__in=user_ids).delete()
+        if signed_tokens_enabled():
+            revoke_user_tokens(user_ids)
+
+    def upsert_users(self, rows, passwords):
+        # The stored password is only replaced for rows that carry one, and
+        # update_fields is per statement, so those rows get their own INSERT.
+        users = [
+            User(
+                username=row['username'],
+                email=row['email'],
+                first_name=row['first_name'],
+                last_name=row['last_name'],
+                password=password,
+            )
+            for row, password in zip(rows, passwords)
+        ]
+        with_password = [user for user, row in zip(users, rows) if row['password'] or row['password_hash']]
+        without_password = [user for user, row in zip(users, rows) if not (row['password'] or row['password_hash'])]
+        for batch, update_fields in (
+            (with_password, USER_UPDATE_FIELDS + ['password']),
+            (without_password, USER_UPDATE_FIELDS),
+        ):
+            if batch:
+                User.objects.bulk_create(
+                    batch, update_conflicts=True, unique_fields=['username'], update_fields=update_fields
+                )
+        return users
+
+    def upsert_profiles(self, users, rows):
+        return Profile.objects.bulk_create(
+            [
+                Profile(user=user, phone_number=row['phone_number'], user_type_id=row['user_type_id'])
+                for user, row in zip(users, rows)
+            ],
+            update_conflicts=True,
+            unique_fields=['user'],
+            update_fields=PROFILE_UPDATE_FIELDS,
+        )
+
+    def sync_role_links(self, profiles, rows):
+        """Adds and removes only the links that differ; returns the changed profile ids."""
+        Through = Profile.user_roles.through
+        stored = defaultdict(dict)
+        links = Through.objects.filter(profile_id__in=[profile.pk for profile in profiles])
+        for link_id, profile_id, role_id in links.values_list('id', 'profile_id', 'userrole_id'):
+            stored[profile_id][role_id] = link_id
+
+        to_add, to_remove, changed = [], [], set()
+        for profile, row in zip(profiles, rows):
+            current = stored[profile.pk]
+            wanted = set(row['user_role_ids'])
+            for role_id in wanted - current.keys():
+                to_add.append(Through(profile_id=profile.pk, userrole_id=role_id))
+                changed.add(profile.pk)
+            for role_id in current.keys() - wanted:
+                to_remove.append(current[role_id])
+                changed.add(profile.pk)
+
+        if to_remove:
+            Through.objects.filter(id__in=to_remove).delete()
+        if to_add:
+            Through.objects.bulk_create(to_add)
+        return sorted(changed)
@@ -1,19 +1,43 @@
 from django.urls import path
 from api.views import (
-    LoginView, RegisterView, 
-    ProfileView, ProfileDetailView,
+    LoginView, RegisterView, TokenRefreshView, LogoutView, AuthCacheStatsView, ProfileFragmentCacheStatsView, DatabasePoolStatsView,
+    ProfileView, ProfileDetailView, ProfileSearchView, ProfileBulkDeleteView, ProfileUpsertView, ProfileImportView, ProfileExportView,
     UserTypeView, UserTypeDetailView,
     UserRoleView, UserRoleDetailView
 )
+from api.async_views import (
+    AsyncLoginView, AsyncRegisterView,
+    AsyncProfileView, AsyncProfileDetailView,
+    AsyncUserTypeView, AsyncUserTypeDetailView,
+    AsyncUserRoleView, AsyncUserRoleDetailView
+)
 from django.conf import settings
 from django.conf.urls.static import static
 
 urlpatterns = [
     path('login/', LoginView.as_view(), name='login'),
     path('register/', RegisterView.as_view(), name='register'),
+    path('auth/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
+    path('auth/logout/', LogoutView.as_view(), name='logout'),
+    path('async/login/', AsyncLoginView.as_view(), name='async-login'),
+    path('async/register/', AsyncRegisterView.as_view(), name='async-register'),
+    path('async/profiles/', AsyncProfileView.as_view(), name='async-profile-list'),
+    path('async/profiles/<int:pk>/', AsyncProfileDetailView.as_view(), name='async-profile-detail'),
+    path('async/user-types/', AsyncUserTypeView.as_view(), name='async-user-type-list'),
+    path('async/user-types/<int:pk>/', AsyncUserTypeDetailView.as_view(), name='async-user-type-detail'),
+    path('async/user-roles/', AsyncUserRoleView.as_view(), name='async-user-role-list'),
+    path('async/user-roles/<int:pk>/', AsyncUserRoleDetailView.as_view(), name='async-user-role-detail'),
+    path('auth/cache-stats/', AuthCacheStatsView.as_view(), name='auth-cache-stats'),
+    path('profiles/cache-stats/', ProfileFragmentCacheStatsView.as_view(), name='profile-cache-stats'),
+    path('db/pool-stats/', DatabasePoolStatsView.as_view(), name='db-pool-stats'),
     
     # Profile URLs
     path('profiles/', ProfileView.as_view(), name='profile-list'),
+    path('profiles/search/', ProfileSearchView.as_view(), name='profile-search'),
+    path('profiles/bulk-delete/', ProfileBulkDeleteView.as_view(), name='profile-bulk-delete'),
+    path('profiles/upsert/', ProfileUpsertView.as_view(), name='profile-upsert'),
+    path('profiles/import/', ProfileImportView.as_view(), name='profile-import'),
+    path('profiles/export/', ProfileExportView.as_view(), name='profile-export'),
     path('profiles/<int:pk>/', ProfileDetailView.as_view(), name='profile-detail'),
     
     # User Type URLs
@@ -2,18 +2,88 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
 from api.models import UserType, UserRole, Profile
-from api.serializers import UserRoleSerializer, UserTypeSerializer, RegisterSerializer, ProfileSerializer, ProfileFormSerializer
-from rest_framework.pagination import PageNumberPagination
+from api.serializers import UserRoleSerializer, UserTypeSerializer, RegisterSerializer, ProfileSerializer, ProfileFormSerializer, parse_fieldset
+from api.pagination import get_profile_paginator, ProfileCursorPagination
+from api.filters import FILTER_PARAMS, ProfileFilter
+from api.search import search_profile_ids
+from api.readers import ProfileValuesReader
+from api.fragments import ProfileFragments, profile_fragment_cache
+from django.conf import settings
+from api.importers import IMPORT_FORMATS, NDJSON, ProfileImportRowSerializer, guess_format, import_profiles
+from api.upserts import ProfileUpserter, ProtectedAccounts
+from api.deleters import ProfileBulkDeleter
+from api.exporters import CONTENT_TYPES, EXPORT_FORMATS, export_profiles
+from django.http import StreamingHttpResponse
 from django.contrib.auth import authenticate
-from rest_framework.authtoken.models import Token
-from rest_framework.permissions import AllowAny, IsAuthenticated
-from drf_yasg.utils import swagger_auto_schema
-from drf_yasg import openapi
+from django.contrib.auth.models import User
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
+from api.authentication import token_cache
+from api.throttling import AuthRateThrottle, AuthThrottled
+from api.signed_tokens import (
+    REFRESH, InvalidToken, SignedToken, issue_credentials, issue_tokens, revoke_user_tokens,
+    signed_tokens_enabled, verify_token,
+)
+from api.backends.sqlite3.pool import all_pools
+from django.db import connections
+from api.cache import user_type_cache, user_role_cache
+from api.docs import openapi, swagger_auto_schema
 from rest_framework.parsers import MultiPartParser, FormParser
 
 
+FIELDSET_PARAMETERS = [
+    openapi.Parameter(
+        'fields', openapi.IN_QUERY,
+        description="Comma separated profile fields to return",
+        type=openapi.TYPE_STRING
+    ),
+    openapi.Parameter(
+        'expand', openapi.IN_QUERY,
+        description="Comma separated relations to nest (user, user_type, user_roles); "
+                    "others are returned as ids. Omit to nest all of them",
+        type=openapi.TYPE_STRING
+    ),
+]
+
+
+PROFILE_FILTER_PARAMETERS = [
+    openapi.Parameter('user_type', openapi.IN_QUERY, description="User type id", type=openapi.TYPE_INTEGER),
+    openapi.Parameter(
+        'user_roles', openapi.IN_QUERY,
+        description="Comma separated role ids; profiles with any of them",
+        type=openapi.TYPE_STRING
+    ),
+    openapi.Parameter(
+        'user_roles_all', openapi.IN_QUERY,
+        description="Comma separated role ids; profiles with all of them",
+        type=openapi.TYPE_STRING
+    ),
+    openapi.Parameter('email', openapi.IN_QUERY, description="Exact user email", type=openapi.TYPE_STRING),
+    openapi.Parameter('phone_number', openapi.IN_QUERY, description="Exact phone number", type=openapi.TYPE_STRING),
+] + [
+    openapi.Parameter(
+        f'{field}_{bound}', openapi.IN_QUERY,
+        description=f"ISO 8601 {bound} bound for {field}",
+        type=openapi.TYPE_STRING, format=openapi.FORMAT_DATETIME
+    )
+    for field in ('created_at', 'updated_at')
+    for bound in ('after', 'before')
+] + [
+    openapi.Parameter(
+        'ordering', openapi.IN_QUERY,
+        description="created_at, updated_at, or either prefixed with '-'",
+        type=openapi.TYPE_STRING,
+        enum=['created_at', '-created_at', 'updated_at', '-updated_at']
+    ),
+]
+
+
 class LoginView(APIView):
     permission_classes = [AllowAny]
+    throttle_classes = [AuthRateThrottle]
+    throttle_scope = 'login'
+
+    def throttled(self, request, wait):
+        raise AuthThrottled(wait)
 
     @swagger_auto_schema(
         request_body=openapi.Schema(
@@ -42,29 +112,87 @@ class LoginView(APIView):
                 'error': 'Geçersiz kullanıcı adı veya şifre'
             }, status=status.HTTP_401_UNAUTHORIZED)
             
-        token, _ = Token.objects.get_or_create(user=user)
+        credentials = issue_credentials(user)
         
         try:
-            profile = Profile.objects.select_related('user', 'user_type').prefetch_related('user_roles').get(user=user)
-            profile_serializer = ProfileSerializer(profile)
+            profile = ProfileSerializer.setup_eager_loading(Profile.objects.all(), prefetch=False).get(user=user)
             return Response({
-                'token': token.key,
+                **credentials,
                 'user_id': user.id,
                 'username': user.username,
-                'profile': profile_serializer.data
+                'profile': ProfileFragments().render_profile(profile)
             })
         except Profile.DoesNotExist:
             return Response({
-                'token': token.key,
+                **credentials,
                 'user_id': user.id,
                 'username': user.username,
                 'profile': None
             })
 
 
+class TokenRefreshView(APIView):
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    @swagger_auto_schema(
+        operation_description="Exchange a signed refresh token for a new access/refresh pair "
+                              "(only with SIGNED_TOKENS enabled)",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            required=['refresh'],
+            properties={'refresh': openapi.Schema(type=openapi.TYPE_STRING)}
+        ),
+        responses={200: 'Returns token, refresh, token_type and expires_in'}
+    )
+    def post(self, request):
+        if not signed_tokens_enabled():
+            return Response({
+                'error': 'İmzalı token kullanımı kapalı'
+            }, status=status.HTTP_404_NOT_FOUND)
+        refresh = request.data.get('refresh')
+        if not isinstance(refresh, str):
+            return Response({
+                'error': 'Lütfen refresh token giriniz'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            token = verify_token(refresh, REFRESH)
+            # The one lookup of the signed token flow: deactivated users and
+            # changed staff flags are picked up here.
+            user = User.objects.only('id', 'is_active', 'is_staff').get(pk=token.user_id, is_active=True)
+        except (InvalidToken, User.DoesNotExist):
+            return Response({
+                'error': 'Geçersiz veya süresi dolmuş refresh token'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+        return Response(issue_tokens(user))
+
+
+class LogoutView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Invalidate the credentials of this request: deletes the authtoken, "
+                              "or revokes every signed token of the user",
+        responses={200: 'Logged out'}
+    )
+    def post(self, request):
+        if isinstance(request.auth, SignedToken):
+            revoke_user_tokens([request.user.pk])
+        else:
+            request.auth.delete()
+        return Response({
+            'message': 'Çıkış yapıldı'
+        })
+
+
 class RegisterView(APIView):
     permission_classes = [AllowAny]
     serializer_class = RegisterSerializer
+    throttle_classes = [AuthRateThrottle]
+    throttle_scope = 'register'
+
+    def throttled(self, request, wait):
+        raise AuthThrottled(wait)
 
     @swagger_auto_schema(
         request_body=RegisterSerializer,
@@ -74,9 +202,8 @@ class RegisterView(APIView):
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            token, _ = Token.objects.get_or_create(user=user)
             return Response({
-                'token': token.key,
+                **issue_credentials(user),
                 'user_id': user.id,
                 'username': user.username,
                 'message': 'Kayıt başarılı'
@@ -84,21 +211,100 @@ class RegisterView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+class AuthCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        responses={200: 'Returns token cache counters for this worker'}
+    )
+    def get(self, request):
+        return Response(token_cache.stats())
+
+
+class ProfileFragmentCacheStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        responses={200: 'Returns profile fragment cache counters for this worker'}
+    )
+    def get(self, request):
+        return Response(profile_fragment_cache.stats())
+
+
+class DatabasePoolStatsView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        responses={200: 'Returns connection settings and pool counters for this worker'}
+    )
+    def get(self, request):
+        return Response({
+            'connections': {
+                connection.alias: {
+                    'conn_max_age': connection.settings_dict['CONN_MAX_AGE'],
+                    'health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+                    'pooled': bool(connection.settings_dict['OPTIONS'].get('pool')),
+                }
+                for connection in connections.all()
+            },
+            'pools': {
+                f'{alias}:{name}': pool.stats() for (alias, name), pool in all_pools().items()
+            },
+        })
+
+
 class ProfileView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ProfileSerializer
     parser_classes = (MultiPartParser, FormParser)
 
     @swagger_auto_schema(
+        manual_parameters=[
+            openapi.Parameter(
+                'pagination', openapi.IN_QUERY,
+                description="Pagination mode: 'page' (default) or 'cursor'",
+                type=openapi.TYPE_STRING,
+                enum=['page', 'cursor']
+            ),
+            openapi.Parameter(
+                'page_size', openapi.IN_QUERY,
+                description="Number of profiles per page",
+                type=openapi.TYPE_INTEGER
+            ),
+        ] + PROFILE_FILTER_PARAMETERS + FIELDSET_PARAMETERS,
         responses={200: ProfileSerializer(many=True)}
     )
     def get(self, request):
-        paginator = PageNumberPagination()
-        paginator.page_size = 10
-        profiles = Profile.objects.select_related('user', 'user_type').prefetch_related('user_roles').all()
+        fields, expand = parse_fieldset(request.query_params)
+        fast_path = getattr(settings, 'PROFILE_LIST_FAST_PATH', False)
+        if fast_path:
+            reader = ProfileValuesReader(fields, expand)
+            queryset = reader.get_queryset()
+        else:
+            queryset = Profile.objects.all()
+
+        filterset = ProfileFilter(request.query_params, queryset=queryset.order_by('created_at', 'id'))
+        if not filterset.is_valid():
+            return Response({
+                'error': 'Geçersiz filtre',
+                'details': filterset.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        paginator = get_profile_paginator(request)
+        ordering = filterset.get_ordering()
+        if ordering and isinstance(paginator, ProfileCursorPagination):
+            paginator.ordering = ordering
+
+        # Rows are rendered through the fragment cache; only the profiles
+        # changed since they were last rendered are serialized.
+        fragments = ProfileFragments(fields, expand)
+        if fast_path:
+            rows = paginator.paginate_queryset(filterset.qs, request)
+            return paginator.get_paginated_response(fragments.render_rows(rows, reader))
+
+        profiles = ProfileSerializer.setup_eager_loading(filterset.qs, fields, expand, prefetch=False)
         result_page = paginator.paginate_queryset(profiles, request)
-        serializer = self.serializer_class(result_page, many=True)
-        return paginator.get_paginated_response(serializer.data)
+        return paginator.get_paginated_response(fragments.render_profiles(result_page))
 
 
     @swagger_auto_schema(
@@ -120,19 +326,243 @@ class ProfileView(APIView):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 
+class ProfileSearchView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Ranked prefix search over name, username, email and phone number",
+        manual_parameters=[
+            openapi.Parameter(
+                'q', openapi.IN_QUERY,
+                description="Search words; each one matches as a prefix",
+                type=openapi.TYPE_STRING,
+                required=True
+            ),
+            openapi.Parameter('limit', openapi.IN_QUERY, description="Maximum results", type=openapi.TYPE_INTEGER),
+            openapi.Parameter('offset', openapi.IN_QUERY, description="Results to skip", type=openapi.TYPE_INTEGER),
+        ] + FIELDSET_PARAMETERS,
+        responses={200: ProfileSerializer(many=True)}
+    )
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response({
+                'error': 'Lütfen bir arama ifadesi giriniz'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', getattr(settings, 'PROFILE_PAGE_SIZE', 10)))
+            offset = int(request.query_params.get('offset', 0))
+        except ValueError:
+            return Response({
+                'error': 'limit ve offset tam sayı olmalıdır'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(max(limit, 1), getattr(settings, 'PROFILE_MAX_PAGE_SIZE', 100))
+        offset = max(offset, 0)
+
+        fields, expand = parse_fieldset(request.query_params)
+        ids = search_profile_ids(query, limit, offset)
+        profiles = ProfileSerializer.setup_eager_loading(Profile.objects.all(), fields, expand).in_bulk(ids)
+        ranked = [profiles[pk] for pk in ids if pk in profiles]
+        serializer = ProfileSerializer(ranked, many=True, fields=fields, expand=expand)
+        return Response({
+            'query': query,
+            'results': serializer.data
+        })
+
+
+class ProfileBulkDeleteView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Delete profiles and their users, tokens and role links by id list or "
+                              "by the profile list filters, in chunked transactions",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'ids': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER)),
+                'filter': openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    description="Same parameters as the profile list filters, e.g. {\"user_type\": 3}"
+                ),
+            }
+        ),
+        responses={200: 'Returns deleted row counts per table'}
+    )
+    def post(self, request):
+        ids = request.data.get('ids')
+        filters = request.data.get('filter')
+        if (ids is None) == (filters is None):
+            return Response({
+                'error': 'Lütfen ids veya filter alanlarından birini gönderiniz'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        deleter = ProfileBulkDeleter()
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(pk, int) and not isinstance(pk, bool) for pk in ids):
+                return Response({
+                    'error': 'ids bir tam sayı listesi olmalıdır'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            return Response(deleter.delete_ids(ids))
+
+        # An empty or unknown filter would match every profile.
+        if not isinstance(filters, dict) or set(filters) - set(FILTER_PARAMS):
+            return Response({
+                'error': 'Geçersiz filtre',
+                'details': {'filter': [f'İzin verilen alanlar: {", ".join(FILTER_PARAMS)}']}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        filters = {
+            key: ','.join(str(item) for item in value) if isinstance(value, list) else value
+            for key, value in filters.items()
+            if value not in (None, '', [])
+        }
+        if not filters:
+            return Response({
+                'error': 'Filtre boş olamaz'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        filterset = ProfileFilter(filters, queryset=Profile.objects.all())
+        if not filterset.is_valid():
+            return Response({
+                'error': 'Geçersiz filtre',
+                'details': filterset.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        return Response(deleter.delete_queryset(filterset.qs))
+
+
+class ProfileUpsertView(APIView):
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Create or update profiles keyed by username in one transaction. "
+                              "Accepts one profile or a list; every field is replaced, a blank "
+                              "password keeps the stored one. Staff accounts are rejected; a new "
+                              "password ends the user's sessions",
+        request_body=ProfileImportRowSerializer(many=True),
+        responses={200: 'Returns username, user_id and profile_id per row'}
+    )
+    def post(self, request):
+        many = isinstance(request.data, list)
+        rows = request.data if many else [request.data]
+        max_rows = getattr(settings, 'PROFILE_UPSERT_MAX_ROWS', 1000)
+        if not rows or len(rows) > max_rows:
+            return Response({
+                'error': f'Tek istekte 1 ile {max_rows} arasında profil gönderilebilir'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        context = {
+            'user_type_ids': user_type_cache.ids(),
+            'user_role_ids': user_role_cache.ids(),
+        }
+        serializer = ProfileImportRowSerializer(data=rows, many=True, context=context)
+        if not serializer.is_valid():
+            return Response({
+                'error': 'Geçersiz veri',
+                'details': serializer.errors if many else serializer.errors[0]
+            }, status=status.HTTP_400_BAD_REQUEST)
+        usernames = [row['username'] for row in serializer.validated_data]
+        if len(set(usernames)) != len(usernames):
+            return Response({
+                'error': 'Bir kullanıcı adı istekte birden fazla kez geçiyor'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        max_passwords = getattr(settings, 'PROFILE_UPSERT_MAX_PASSWORDS', 10)
+        if sum(1 for row in serializer.validated_data if row['password']) > max_passwords:
+            return Response({
+                'error': f'Tek istekte en fazla {max_passwords} profilin şifresi değiştirilebilir'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            results = ProfileUpserter().upsert(serializer.validated_data)
+        except ProtectedAccounts as exc:
+            return Response({
+                'error': 'Yönetici hesapları bu uç noktayla güncellenemez',
+                'usernames': exc.usernames
+            }, status=status.HTTP_403_FORBIDDEN)
+        return Response({'results': results} if many else results[0])
+
+
+class ProfileImportView(APIView):
+    permission_classes = [IsAuthenticated]
+    parser_classes = (MultiPartParser, FormParser)
+
+    @swagger_auto_schema(
+        operation_description="Bulk import profiles from an NDJSON or CSV file",
+        manual_parameters=[
+            openapi.Parameter(
+                'file', openapi.IN_FORM,
+                description="NDJSON or CSV file, one profile per row",
+                type=openapi.TYPE_FILE,
+                required=True
+            ),
+            openapi.Parameter(
+                'file_format', openapi.IN_FORM,
+                description="ndjson or csv (defaults to the file extension)",
+                type=openapi.TYPE_STRING,
+                enum=list(IMPORT_FORMATS)
+            ),
+        ],
+        responses={200: 'Returns created/failed counts and per-row errors'}
+    )
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({
+                'error': 'Lütfen bir dosya yükleyiniz'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        file_format = request.data.get('file_format') or guess_format(upload.name)
+        if file_format not in IMPORT_FORMATS:
+            return Response({
+                'error': 'Desteklenmeyen dosya formatı'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        report = import_profiles(upload.file, file_format)
+        return Response(report, status=status.HTTP_200_OK)
+
+
+class ProfileExportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Stream every profile as NDJSON or CSV",
+        manual_parameters=[
+            openapi.Parameter(
+                'file_format', openapi.IN_QUERY,
+                description="ndjson (default) or csv",
+                type=openapi.TYPE_STRING,
+                enum=list(EXPORT_FORMATS)
+            ),
+        ],
+        responses={200: 'Streams one profile per line'}
+    )
+    def get(self, request):
+        file_format = request.query_params.get('file_format', NDJSON)
+        if file_format not in EXPORT_FORMATS:
+            return Response({
+                'error': 'Desteklenmeyen dosya formatı'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        response = StreamingHttpResponse(
+            export_profiles(file_format),
+            content_type=f'{CONTENT_TYPES[file_format]}; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="profiles.{file_format}"'
+        return response
+
+
 class ProfileDetailView(APIView):
     permission_classes = [IsAuthenticated]
     serializer_class = ProfileSerializer
     parser_classes = (MultiPartParser, FormParser)
 
     @swagger_auto_schema(
+        manual_parameters=FIELDSET_PARAMETERS,
         responses={200: ProfileSerializer}
     )
     def get(self, request, pk):
+        fields, expand = parse_fieldset(request.query_params)
         try:
-            profile = Profile.objects.select_related('user', 'user_type').prefetch_related('user_roles').get(pk=pk)
-            serializer = self.serializer_class(profile)
-            return Response(serializer.data)
+            queryset = ProfileSerializer.setup_eager_loading(Profile.objects.all(), fields, expand, prefetch=False)
+            return Response(ProfileFragments(fields, expand).render_profile(queryset.get(pk=pk)))
         except Profile.DoesNotExist:
             return Response(
                 {'error': 'Profil bulunamadı'}, 
@@ -192,7 +622,7 @@ class UserTypeView(APIView):
     def get(self, request, pk=None):
         if pk:
             try:
-                user_type = UserType.objects.get(pk=pk)
+                user_type = user_type_cache.get(pk)
                 serializer = UserTypeSerializer(user_type)
                 return Response(serializer.data)
             except UserType.DoesNotExist:
@@ -200,7 +630,7 @@ class UserTypeView(APIView):
                     {'error': 'Kullanıcı tipi bulunamadı'},
                     status=status.HTTP_404_NOT_FOUND
                 )
-        user_types = UserType.objects.all()
+        user_types = user_type_cache.all()
         serializer = UserTypeSerializer(user_types, many=True)
         return Response(serializer.data)
 
@@ -280,7 +710,7 @@ class UserTypeDetailView(APIView):
     )
     def get(self, request, pk):
         try:
-            user_type = UserType.objects.get(pk=pk)
+            user_type = user_type_cache.get(pk)
             serializer = UserTypeSerializer(user_type)
             return Response(serializer.data)
         except UserType.DoesNotExist:
@@ -336,7 +766,7 @@ class UserRoleView(APIView):
     def get(self, request, pk=None):
         if pk:
             try:
-                user_role = UserRole.objects.get(pk=pk)
+                user_role = user_role_cache.get(pk)
                 serializer = UserRoleSerializer(user_role)
                 return Response(serializer.data)
             except UserRole.DoesNotExist:
@@ -344,7 +774,7 @@ class UserRoleView(APIView):
                     {'error': 'Kullanıcı rolü bulunamadı'},
                     status=status.HTTP_404_NOT_FOUND
                 )
-        user_roles = UserRole.objects.all()
+        user_roles = user_role_cache.all()
         serializer = UserRoleSerializer(user_roles, many=True)
         return Response(serializer.data)
 
@@ -424,7 +854,7 @@ class UserRoleDetailView(APIView):
     )
     def get(self, request, pk):
         try:
-            user_role = UserRole.objects.get(pk=pk)
+            user_role = user_role_cache.get(pk)
             serializer = UserRoleSerializer(user_role)
             return Response(serializer.data)
         except UserRole.DoesNotExist:
@@ -0,0 +1,263 @@
+"""
+Endpoint benchmarks: latency percentiles and SQL query counts per endpoint,
+checked against benchmarks/budgets.json and written to a JSON report.
+Every test here is marked 'benchmark' and skipped unless --bench is given.
+
+    pytest benchmarks --bench --bench-profiles 5000 --bench-iterations 50
+    pytest benchmarks --bench --bench-baseline benchmarks/results/<earlier run>.json
+"""
+import json
+import math
+import platform
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+DEFAULT_BUDGETS = BENCHMARKS_DIR / 'budgets.json'
+DEFAULT_OUTPUT_DIR = BENCHMARKS_DIR / 'results'
+
+PASSWORD = 'Bench1234bench.'
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('benchmarks')
+    group.addoption('--bench', action='store_true', help='Run the benchmarks instead of skipping them')
+    group.addoption('--bench-users', type=int, default=200, help='Users without a profile to seed')
+    group.addoption('--bench-profiles', type=int, default=500, help='Users with a profile to seed')
+    group.addoption('--bench-types', type=int, default=5, help='User types to seed')
+    group.addoption('--bench-roles', type=int, default=10, help='User roles to seed')
+    group.addoption('--bench-roles-per-profile', type=int, default=3)
+    group.addoption('--bench-iterations', type=int, default=20, help='Timed requests per endpoint')
+    group.addoption('--bench-startup-runs', type=int, default=3, help='Fresh worker processes to start')
+    group.addoption('--bench-budgets', default=str(DEFAULT_BUDGETS), help='Budget file')
+    group.addoption('--bench-output', default=None, help='Report path (default: benchmarks/results/<timestamp>.json)')
+    group.addoption('--bench-baseline', default=None, help='Earlier report to compare against')
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+class BenchmarkRecorder:
+    def __init__(self, config):
+        self.config = config
+        with open(config.getoption('--bench-budgets')) as file:
+            budgets = json.load(file)
+        self.tolerance = budgets.get('tolerance', 0.25)
+        self.budgets = budgets['endpoints']
+        self.startup_budgets = budgets.get('startup', {})
+        self.baseline = {}
+        baseline_path = config.getoption('--bench-baseline')
+        if baseline_path:
+            with open(baseline_path) as file:
+                self.baseline = json.load(file)['results']
+        self.results = {}
+
+    def iterations(self, name):
+        return self.budgets.get(name, {}).get('iterations', self.config.getoption('--bench-iterations'))
+
+    def measure(self, name, send, expected_status):
+        """
+        Calls send(i) once to warm up and then iterations(name) times, timing
+        each call and counting its queries. Returns the recorded result.
+        """
+        response = send(0)
+        assert response.status_code == expected_status, response.content
+
+        samples, queries = [], []
+        for i in range(1, self.iterations(name) + 1):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = send(i)
+                samples.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == expected_status, response.content
+            queries.append(len(context.captured_queries))
+
+        result = {
+            'iterations': len(samples),
+            'p50_ms': round(percentile(samples, 50), 3),
+            'p95_ms': round(percentile(samples, 95), 3),
+            'p99_ms': round(percentile(samples, 99), 3),
+            'mean_ms': round(sum(samples) / len(samples), 3),
+            'queries': max(queries),
+            'bytes': len(response.content),
+        }
+        self.results[name] = result
+        return result
+
+    def check(self, name, result):
+        problems = []
+        budget = self.budgets.get(name, {})
+        if 'queries' in budget and result['queries'] > budget['queries']:
+            problems.append(f"{result['queries']} queries > budget {budget['queries']}")
+        if 'p95_ms' in budget and result['p95_ms'] > budget['p95_ms']:
+            problems.append(f"p95 {result['p95_ms']}ms > budget {budget['p95_ms']}ms")
+
+        previous = self.baseline.get(name)
+        if previous:
+            if result['queries'] > previous['queries']:
+                problems.append(f"{result['queries']} queries > baseline {previous['queries']}")
+            limit = previous['p95_ms'] * (1 + self.tolerance)
+            if result['p95_ms'] > limit:
+                problems.append(f"p95 {result['p95_ms']}ms > baseline {previous['p95_ms']}ms +{self.tolerance:.0%}")
+        return problems
+
+    def check_startup(self, name, result):
+        problems = []
+        budget = self.startup_budgets.get(name, {})
+        for key in ('import_ms', 'boot_ms', 'first_request_ms'):
+            if key in budget and result[key] > budget[key]:
+                problems.append(f'{key} {result[key]} > budget {budget[key]}')
+        for module in budget.get('forbidden_modules', ()):
+            if module in result['loaded_packages']:
+                problems.append(f'{module} imported')
+        self.results[name] = result
+        return problems
+
+    def write(self):
+        if not self.results:
+            return None
+        output = self.config.getoption('--bench-output')
+        if output:
+            path = Path(output)
+        else:
+            stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+            path = DEFAULT_OUTPUT_DIR / f'{stamp}.json'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        report = {
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'seed': {
+                'users': self.config.getoption('--bench-users'),
+                'profiles': self.config.getoption('--bench-profiles'),
+                'types': self.config.getoption('--bench-types'),
+                'roles': self.config.getoption('--bench-roles'),
+                'roles_per_profile': self.config.getoption('--bench-roles-per-profile'),
+            },
+            'results': self.results,
+        }
+        path.write_text(json.dumps(report, indent=2, sort_keys=True))
+        return path
+
+
+def pytest_configure(config):
+    config._bench_recorder = None
+
+
+def pytest_collection_modifyitems(config, items):
+    skip = pytest.mark.skip(reason='benchmarks only run with --bench')
+    for item in items:
+        if BENCHMARKS_DIR not in item.path.parents:
+            continue
+        item.add_marker(pytest.mark.benchmark)
+        if not config.getoption('--bench'):
+            item.add_marker(skip)
+
+
+def pytest_sessionfinish(session):
+    recorder = session.config._bench_recorder
+    if recorder is not None:
+        path = recorder.write()
+        if path is not None:
+            print(f'\nbenchmark report written to {path}')
+
+
+@pytest.fixture(scope='session')
+def bench(pytestconfig):
+    if pytestconfig._bench_recorder is None:
+        pytestconfig._bench_recorder = BenchmarkRecorder(pytestconfig)
+    return pytestconfig._bench_recorder
+
+
+@pytest.fixture(scope='session')
+def bench_data(pytestconfig, django_db_setup, django_db_blocker):
+    """Seeds the test database once per session with the configured sizes."""
+    from django.contrib.auth.hashers import make_password
+    from django.contrib.auth.models import User
+    from rest_framework.authtoken.models import Token
+    from api.models import Profile, UserType, UserRole
+    from api.rolemasks import refresh_role_masks
+
+    options = pytestconfig.getoption
+    with django_db_blocker.unblock():
+        types = [
+            UserType.objects.create(name=f'type-{i}', description='benchmark type')
+            for i in range(options('--bench-types'))
+        ]
+        roles = [
+            UserRole.objects.create(name=f'role-{i}', description='benchmark role')
+            for i in range(options('--bench-roles'))
+        ]
+        password = make_password(PASSWORD)
+        profile_count = options('--bench-profiles')
+        users = User.objects.bulk_create([
+            User(username=f'bench-{i}', email=f'bench-{i}@example.com',
+                 first_name='Bench', last_name=str(i), password=password)
+            for i in range(profile_count + options('--bench-users'))
+        ])
+        profiles = Profile.objects.bulk_create([
+            Profile(user=user, user_type=types[i % len(types)], phone_number=f'555{i:07d}')
+            for i, user in enumerate(users[:profile_count])
+        ])
+        per_profile = min(options('--bench-roles-per-profile'), len(roles))
+        Through = Profile.user_roles.through
+        Through.objects.bulk_create([
+            Through(profile_id=profile.pk, userrole_id=roles[(i + j) % len(roles)].pk)
+            for i, profile in enumerate(profiles)
+            for j in range(per_profile)
+        ])
+        refresh_role_masks([profile.pk for profile in profiles])
+        admin = users[0]
+        token = Token.objects.create(user=admin)
+
+    return {
+        'types': types,
+        'roles': roles,
+        'profiles': profiles,
+        'admin': admin,
+        'token': token.key,
+        'password': PASSWORD,
+    }
+
+
+@pytest.fixture(scope='session', autouse=True)
+def auth_throttle_store(tmp_path_factory):
+    """
+    Keeps the auth throttles on, so their cost is part of the login and
+    register numbers, but on a fresh store and with rates the timed
+    iterations cannot reach.
+    """
+    from django.test import override_settings
+
+    with override_settings(AUTH_THROTTLE={
+        'PATH': tmp_path_factory.mktemp('throttle') / 'throttle.sqlite3',
+        'RATES': {'login': {'ip': '10000/min', 'username': '10000/min'}, 'register': {'ip': '10000/min'}},
+    }):
+        yield
+
+
+@pytest.fixture(autouse=True)
+def clear_process_caches():
+    # Rolled back test transactions never fire the invalidation signals.
+    from api.authentication import token_cache
+    from api.cache import user_type_cache, user_role_cache
+
+    for cache in (token_cache, user_type_cache, user_role_cache):
+        cache.clear()
+
+
+@pytest.fixture
+def api_client(bench_data):
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f"Token {bench_data['token']}")
+    return client
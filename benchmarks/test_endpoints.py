@@ -0,0 +1,118 @@
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.models import UserType, UserRole
+
+
+pytestmark = pytest.mark.django_db
+
+
+def run(bench, name, send, expected_status=200):
+    result = bench.measure(name, send, expected_status)
+    problems = bench.check(name, result)
+    assert not problems, f'{name}: ' + '; '.join(problems)
+
+
+def test_login(bench, bench_data):
+    client = APIClient()
+    data = {'username': bench_data['admin'].username, 'password': bench_data['password']}
+    run(bench, 'login', lambda i: client.post(reverse('login'), data, format='json'))
+
+
+def test_register(bench, bench_data):
+    client = APIClient()
+    password = bench_data['password']
+
+    def send(i):
+        return client.post(reverse('register'), {
+            'username': f'register-{i}',
+            'email': f'register-{i}@example.com',
+            'first_name': 'Register',
+            'last_name': str(i),
+            'password': password,
+            'password2': password,
+        }, format='json')
+
+    run(bench, 'register', send, expected_status=201)
+
+
+def test_profile_list(bench, api_client):
+    run(bench, 'profile-list', lambda i: api_client.get(reverse('profile-list'), {'page': i % 5 + 1}))
+
+
+def test_profile_detail(bench, api_client, bench_data):
+    profiles = bench_data['profiles']
+    run(bench, 'profile-detail', lambda i: api_client.get(
+        reverse('profile-detail', args=[profiles[i % len(profiles)].pk])
+    ))
+
+
+def test_profile_create(bench, api_client, bench_data):
+    def send(i):
+        return api_client.post(reverse('profile-list'), {
+            'username': f'created-{i}',
+            'email': f'created-{i}@example.com',
+            'first_name': 'Created',
+            'last_name': str(i),
+            'phone_number': '5550000000',
+            'user_type_id': bench_data['types'][0].pk,
+            'user_role_ids': [role.pk for role in bench_data['roles'][:2]],
+        }, format='multipart')
+
+    run(bench, 'profile-create', send, expected_status=201)
+
+
+def test_profile_update(bench, api_client, bench_data):
+    profile = bench_data['profiles'][1]
+
+    def send(i):
+        return api_client.put(reverse('profile-detail', args=[profile.pk]), {
+            'first_name': f'Updated {i}',
+            'phone_number': f'555{i:07d}',
+            'user_role_ids': [role.pk for role in bench_data['roles'][i % 3:i % 3 + 2]],
+        }, format='multipart')
+
+    run(bench, 'profile-update', send)
+
+
+def test_profile_delete(bench, api_client, bench_data):
+    # Profile 0 belongs to the authenticated user.
+    profiles = bench_data['profiles'][1:]
+    assert len(profiles) > bench.iterations('profile-delete')
+    run(bench, 'profile-delete', lambda i: api_client.delete(reverse('profile-detail', args=[profiles[i].pk])))
+
+
+@pytest.mark.parametrize('model, prefix', [(UserType, 'user-type'), (UserRole, 'user-role')])
+def test_reference_list(bench, api_client, model, prefix):
+    run(bench, f'{prefix}-list', lambda i: api_client.get(reverse(f'{prefix}-list')))
+
+
+@pytest.mark.parametrize('model, prefix', [(UserType, 'user-type'), (UserRole, 'user-role')])
+def test_reference_detail(bench, api_client, model, prefix):
+    pks = list(model.objects.values_list('pk', flat=True))
+    run(bench, f'{prefix}-detail', lambda i: api_client.get(reverse(f'{prefix}-detail', args=[pks[i % len(pks)]])))
+
+
+@pytest.mark.parametrize('model, prefix', [(UserType, 'user-type'), (UserRole, 'user-role')])
+def test_reference_create(bench, api_client, model, prefix):
+    run(bench, f'{prefix}-create', lambda i: api_client.post(
+        reverse(f'{prefix}-list'), {'name': f'created-{i}', 'description': 'benchmark'}, format='json'
+    ), expected_status=201)
+
+
+@pytest.mark.parametrize('model, prefix', [(UserType, 'user-type'), (UserRole, 'user-role')])
+def test_reference_update(bench, api_client, model, prefix):
+    pk = model.objects.values_list('pk', flat=True).first()
+    run(bench, f'{prefix}-update', lambda i: api_client.put(
+        reverse(f'{prefix}-detail', args=[pk]), {'name': f'updated-{i}', 'description': 'benchmark'}, format='json'
+    ))
+
+
+@pytest.mark.parametrize('model, prefix', [(UserType, 'user-type'), (UserRole, 'user-role')])
+def test_reference_delete(bench, api_client, model, prefix):
+    objects = [
+        model.objects.create(name=f'delete-{i}', description='benchmark')
+        for i in range(bench.iterations(f'{prefix}-delete') + 1)
+    ]
+    run(bench, f'{prefix}-delete', lambda i: api_client.delete(reverse(f'{prefix}-detail', args=[objects[i].pk])))
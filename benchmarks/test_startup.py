@@ -0,0 +1,75 @@
+"""
+Worker startup: module import time (python -X importtime), time to load the
+WSGI application and time to serve its first request, each measured in a
+fresh interpreter. The first request is an unauthenticated API call, so it
+runs URL resolution, middleware and DRF without touching the database.
+"""
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+import pytest
+from django.conf import settings
+
+
+WORKER_SCRIPT = """
+import io, json, sys, time
+started = time.perf_counter()
+from LearninWithDjangoRest.wsgi import application
+booted = time.perf_counter()
+statuses = []
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': '/api/user-types/', 'SERVER_NAME': 'localhost',
+    'SERVER_PORT': '80', 'HTTP_HOST': 'localhost', 'wsgi.input': io.BytesIO(),
+    'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+}
+b''.join(application(environ, lambda status, headers, *args: statuses.append(status)))
+print(json.dumps({
+    'boot_ms': (booted - started) * 1000,
+    'first_request_ms': (time.perf_counter() - booted) * 1000,
+    'status': statuses[0],
+    'loaded_packages': sorted({name.partition('.')[0] for name in sys.modules}),
+}))
+"""
+
+IMPORT_LINE_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$')
+
+
+def start_worker(api_docs):
+    env = {
+        **os.environ,
+        'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'LearninWithDjangoRest.settings'),
+        'API_DOCS': '1' if api_docs else '0',
+    }
+    completed = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', WORKER_SCRIPT],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    imports = []
+    for line in completed.stderr.splitlines():
+        match = IMPORT_LINE_RE.match(line)
+        # Top-level entries only; nested ones are part of their parent's time.
+        if match and not match.group(3):
+            imports.append((int(match.group(2)) / 1000, match.group(4)))
+    result['import_ms'] = sum(ms for ms, _ in imports)
+    result['heaviest_imports'] = [name for _, name in sorted(imports, reverse=True)[:10]]
+    return result
+
+
+@pytest.mark.parametrize('name, api_docs', [('startup', False), ('startup-docs', True)])
+def test_worker_startup(bench, pytestconfig, name, api_docs):
+    runs = [start_worker(api_docs) for _ in range(pytestconfig.getoption('--bench-startup-runs'))]
+    assert all(run['status'] == '401 Unauthorized' for run in runs), runs
+    result = {
+        key: round(statistics.median(run[key] for run in runs), 1)
+        for key in ('import_ms', 'boot_ms', 'first_request_ms')
+    }
+    result['runs'] = len(runs)
+    result['heaviest_imports'] = runs[-1]['heaviest_imports']
+    result['loaded_packages'] = runs[-1]['loaded_packages']
+    problems = bench.check_startup(name, result)
+    assert not problems, f'{name}: ' + '; '.join(problems)